@@ -0,0 +1 @@
+"""Throughput and latency benchmarks of time2relax."""
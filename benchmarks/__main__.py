@@ -0,0 +1,64 @@
+"""Run the benchmarks: ``python -m benchmarks``."""
+
+import argparse
+import json
+import sys
+
+from benchmarks import bench_client, bench_micro, runner  # noqa: F401  Register the benchmarks
+from benchmarks.stub import StubCouchDB
+
+
+def main(argv=None):
+    """Run the benchmarks, and write (or compare) the results."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument(
+        "-k", "--filter", action="append", help="Run benchmarks starting with this name"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Stub server latency, in seconds"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Rounds of each benchmark"
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiply the operations per round"
+    )
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="A previous JSON report to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The slowdown ratio reported as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    with StubCouchDB(latency=args.latency) as server:
+        context = {"url": server.url, "server": server}
+        results = runner.run(context, args.filter, args.repeat, args.scale)
+
+    report = runner.report(results, args.latency)
+    print(runner.format_table(results), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        regressions = runner.compare(runner.load(args.compare), results, args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['name']}: {r['slowdown']:.0%} slower "
+                f"({r['baseline'] * 1e6:.1f}us -> {r['median'] * 1e6:.1f}us)",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
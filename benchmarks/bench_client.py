@@ -0,0 +1,160 @@
+"""Benchmarks of CouchDB requests against the stub server."""
+
+import io
+import itertools
+
+from benchmarks.runner import benchmark
+from time2relax import CouchDB, CouchServer, GzipCompressor, dump
+from time2relax.models import DATABASES
+
+ROWS = 10000
+
+_ids = itertools.count()
+
+
+def _db(context, name, **kwargs):
+    db = CouchDB(f"{context['url']}/{name}", **kwargs)
+    db.info()
+    return db
+
+
+def _populated(context):
+    """Return a database with ``ROWS`` documents, created once."""
+    if "populated" not in context:
+        db = _db(context, "populated")
+        for i in range(0, ROWS, 1000):
+            db.bulk_docs([{"_id": f"{n:08}", "n": n} for n in range(i, i + 1000)])
+        context["populated"] = db
+    return context["populated"]
+
+
+@benchmark("insert.single", number=200)
+def insert_single(context):
+    db = _db(context, "insert")
+    return lambda: db.insert({"_id": f"s{next(_ids)}", "title": "Heroes"})
+
+
+@benchmark("insert.bulk_docs_100", number=20, items=100)
+def insert_bulk(context):
+    db = _db(context, "insert")
+
+    def run():
+        db.bulk_docs([{"_id": f"b{next(_ids)}", "title": "Heroes"} for _ in range(100)])
+
+    return run
+
+
+@benchmark("insert.bulk_docs_100_gzip", number=20, items=100)
+def insert_bulk_gzip(context):
+    db = _db(context, "insert", compression=GzipCompressor(threshold=1024, level=1))
+
+    def run():
+        db.bulk_docs([{"_id": f"g{next(_ids)}", "title": "Heroes"} for _ in range(100)])
+
+    return run
+
+
+@benchmark("get.single", number=200)
+def get_single(context):
+    db = _populated(context)
+    return lambda: db.get("00000042").json()
+
+
+@benchmark("all_docs.json", number=3, items=ROWS)
+def all_docs_json(context):
+    db = _populated(context)
+    return lambda: db.all_docs(params={"include_docs": True}).json()
+
+
+@benchmark("all_docs.orjson", number=3, items=ROWS)
+def all_docs_orjson(context):
+    db = CouchDB(_populated(context).url, codec="orjson")
+    return lambda: db.all_docs(params={"include_docs": True}).json()
+
+
+@benchmark("all_docs.iter", number=3, items=ROWS)
+def all_docs_iter(context):
+    db = _populated(context)
+    return lambda: sum(1 for _ in db.iter_all_docs(params={"include_docs": True}))
+
+
+@benchmark("all_docs.results", number=3, items=ROWS)
+def all_docs_results(context):
+    db = _populated(context)
+    return lambda: db.results.all_docs(params={"include_docs": True})
+
+
+@benchmark("view.by_n", number=3, items=ROWS)
+def view(context):
+    db = _populated(context)
+    return lambda: db.ddoc_view("bench", "by_n").json()
+
+
+@benchmark("dump.partitions_1", number=3, items=ROWS)
+def dump_partitions_1(context):
+    db = _populated(context)
+    return lambda: dump(db, io.BytesIO(), partitions=1, page_size=200)
+
+
+@benchmark("dump.partitions_4", number=3, items=ROWS)
+def dump_partitions_4(context):
+    db = _populated(context)
+    return lambda: dump(db, io.BytesIO(), partitions=4, page_size=200)
+
+
+@benchmark("attachment.upload_64k", number=50)
+def attachment_upload(context):
+    db = _db(context, "attachments")
+    data = b"x" * 65536
+
+    def run():
+        doc_id = f"a{next(_ids)}"
+        db.insert_att(doc_id, None, "blob", data, "application/octet-stream")
+
+    return run
+
+
+@benchmark("attachment.download_64k", number=50)
+def attachment_download(context):
+    db = _db(context, "attachments")
+    db.insert_att("download", None, "blob", b"x" * 65536, "application/octet-stream")
+    return lambda: db.get_att("download", "blob").content
+
+
+def _probe_server(context):
+    """Return a server whose session (and connection) every probe shares.
+
+    Only the existence probe differs between the probe benchmarks, not the
+    cost of a new session and connection.
+    """
+    if "probe_server" not in context:
+        _db(context, "probe")
+        server = CouchServer(context["url"])
+        server.db("probe", create_db=False).info()
+        context["probe_server"] = server
+    return context["probe_server"]
+
+
+@benchmark("probe.per_object", number=100)
+def probe_per_object(context):
+    server = _probe_server(context)
+
+    def run():
+        db = server.db("probe")
+        # Forget the database, as if every object checked it
+        DATABASES.discard(db.url)
+        db.info()
+
+    return run
+
+
+@benchmark("probe.registry", number=100)
+def probe_registry(context):
+    server = _probe_server(context)
+    return lambda: server.db("probe").info()
+
+
+@benchmark("probe.disabled", number=100)
+def probe_disabled(context):
+    server = _probe_server(context)
+    return lambda: server.db("probe", create_db=False).info()
@@ -0,0 +1,85 @@
+"""Micro-benchmarks of the pure-Python request path, without a server."""
+
+from benchmarks.runner import benchmark
+from time2relax import CouchDB, CouchServer, time2relax, utils
+
+BASE_URL = "http://127.0.0.1:5984/benchdb"
+
+VIEW_PARAMS = {
+    "startkey": ["2024", 1],
+    "endkey": ["2024", {}],
+    "include_docs": True,
+    "limit": 100,
+}
+
+
+@benchmark("micro.encode_document_id", number=100000)
+def encode_document_id(context):
+    return lambda: utils.encode_document_id("user:42+some id")
+
+
+@benchmark("micro.encode_document_id_uncached", number=100000)
+def encode_document_id_uncached(context):
+    return lambda: utils.encode_document_id.__wrapped__("user:42+some id")
+
+
+@benchmark("micro.encode_attachment_id", number=100000)
+def encode_attachment_id(context):
+    return lambda: utils.encode_attachment_id("photos/2024/cover image.jpg")
+
+
+@benchmark("micro.encode_attachment_id_uncached", number=100000)
+def encode_attachment_id_uncached(context):
+    return lambda: utils.encode_attachment_id.__wrapped__("photos/2024/cover image.jpg")
+
+
+@benchmark("micro.query_method_kwargs", number=100000)
+def query_method_kwargs(context):
+    return lambda: utils.query_method_kwargs(VIEW_PARAMS)
+
+
+@benchmark("micro.prepare_request", number=100000)
+def prepare_request(context):
+    return lambda: time2relax.prepare_request(
+        BASE_URL, "user%3A42", params={"conflicts": True}
+    )
+
+
+@benchmark("micro.prepare_request_base_url", number=100000)
+def prepare_request_base_url(context):
+    # The precomputed CouchDB.base_url takes the fast path
+    return lambda: time2relax.prepare_request(
+        f"{BASE_URL}/", "user%3A42", params={"limit": 1}
+    )
+
+
+@benchmark("micro.prepare_request_absolute", number=100000)
+def prepare_request_absolute(context):
+    return lambda: time2relax.prepare_request(
+        BASE_URL, "http://127.0.0.1:5984/_replicate"
+    )
+
+
+@benchmark("micro.build_get", number=100000)
+def build_get(context):
+    return lambda: time2relax.get("user:42+some id", params={"conflicts": True})
+
+
+@benchmark("micro.build_and_prepare_view", number=50000)
+def build_and_prepare_view(context):
+    def run():
+        _, path, kwargs = time2relax.ddoc_view("app", "by_date", params=VIEW_PARAMS)
+        time2relax.prepare_request(f"{BASE_URL}/", path, **kwargs)
+
+    return run
+
+
+@benchmark("micro.couchdb_object", number=2000)
+def couchdb_object(context):
+    return lambda: CouchDB(BASE_URL, create_db=False)
+
+
+@benchmark("micro.server_db_handle", number=20000)
+def server_db_handle(context):
+    server = CouchServer("http://127.0.0.1:5984")
+    return lambda: server.db("benchdb", create_db=False)
@@ -0,0 +1,155 @@
+"""The timing harness of the benchmarks."""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from importlib import metadata
+
+#: Registered benchmarks, in the order they are defined
+BENCHMARKS = []
+
+
+def benchmark(name, number=1, items=1):
+    """Register a benchmark function.
+
+    The function is called with the suite context, and returns the function
+    to time (called ``number`` times per round).
+
+    :param str name: The benchmark name, ``<group>.<case>``.
+    :param int number: (optional) The operations per round.
+    :param int items: (optional) The items (e.g. documents) in an operation.
+    """
+
+    def decorator(setup):
+        BENCHMARKS.append(
+            {"name": name, "number": number, "items": items, "setup": setup}
+        )
+        return setup
+
+    return decorator
+
+
+def run(context, names=None, repeat=5, scale=1.0):
+    """Run the benchmarks, and return their results.
+
+    :param dict context: The suite context, passed to every benchmark.
+    :param list names: (optional) Run only the benchmarks matching these prefixes.
+    :param int repeat: (optional) The rounds of each benchmark.
+    :param float scale: (optional) Multiply the operations per round.
+    :rtype: list
+    """
+    results = []
+
+    for bench in BENCHMARKS:
+        if names and not any(bench["name"].startswith(n) for n in names):
+            continue
+
+        func = bench["setup"](context)
+        number = max(1, int(bench["number"] * scale))
+        func()  # Warm up
+
+        rounds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            rounds.append((time.perf_counter() - start) / number)
+
+        median = statistics.median(rounds)
+        results.append(
+            {
+                "name": bench["name"],
+                "number": number,
+                "repeat": repeat,
+                "items": bench["items"],
+                "min": min(rounds),
+                "median": median,
+                "max": max(rounds),
+                "ops_per_sec": 1 / median,
+                "items_per_sec": bench["items"] / median,
+            }
+        )
+
+    return results
+
+
+def report(results, latency):
+    """Return the machine-readable report of a run.
+
+    :param list results: The benchmark results.
+    :param float latency: The stub server latency, in seconds.
+    :rtype: dict
+    """
+    return {
+        "driver": "time2relax",
+        "version": _get_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": sys.platform,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "latency": latency,
+        "unit": "seconds per operation",
+        "results": results,
+    }
+
+
+def compare(baseline, results, threshold=0.1):
+    """Return the benchmarks that are slower than a baseline report.
+
+    :param dict baseline: A previous report.
+    :param list results: The benchmark results.
+    :param float threshold: (optional) The slowdown ratio to report.
+    :rtype: list
+    """
+    before = {r["name"]: r["median"] for r in baseline.get("results", [])}
+    regressions = []
+
+    for result in results:
+        if result["name"] not in before:
+            continue
+        ratio = result["median"] / before[result["name"]] - 1
+        if ratio > threshold:
+            regressions.append(
+                {
+                    "name": result["name"],
+                    "baseline": before[result["name"]],
+                    "median": result["median"],
+                    "slowdown": ratio,
+                }
+            )
+
+    return regressions
+
+
+def format_table(results):
+    """Return the results as a text table.
+
+    :param list results: The benchmark results.
+    :rtype: str
+    """
+    lines = [f"{'benchmark':<36} {'median':>12} {'ops/s':>12} {'items/s':>12}"]
+    for r in results:
+        lines.append(
+            f"{r['name']:<36} {r['median'] * 1e6:>10.1f}us "
+            f"{r['ops_per_sec']:>12.0f} {r['items_per_sec']:>12.0f}"
+        )
+    return "\n".join(lines)
+
+
+def load(path):
+    """Return a report from a JSON file.
+
+    :param str path: The file path.
+    :rtype: dict
+    """
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _get_version():
+    try:
+        return metadata.version("time2relax")
+    except metadata.PackageNotFoundError:
+        return "unknown"
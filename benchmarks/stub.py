@@ -0,0 +1,285 @@
+"""An in-process stub CouchDB server for the benchmarks."""
+
+import gzip
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class StubCouchDB:
+    """A CouchDB look-alike that keeps its databases in memory.
+
+    It knows databases, documents, ``_bulk_docs``, ``_all_docs``, attachments
+    and views, and gzip request bodies. A view named ``by_<field>`` emits ``(doc[field], null)`` for
+    every document with that field. Every response is delayed by ``latency``
+    seconds.
+
+    Example::
+
+        >>> with StubCouchDB(latency=0.001) as server:
+        ...     db = CouchDB(f'{server.url}/benchdb')
+    """
+
+    def __init__(self, latency=0.0):
+        """Initialize the server.
+
+        :param float latency: (optional) Seconds to wait before each response.
+        """
+        self.latency = latency
+        self.databases = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+        handler = type("Handler", (_Handler,), {"stub": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = None
+
+    def __enter__(self):
+        """Start the server."""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop the server."""
+        self.stop()
+
+    def start(self):
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, do not wait for an ACK
+    disable_nagle_algorithm = True
+    stub = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method):
+        stub = self.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        url = urlsplit(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        with stub.lock:
+            stub.requests += 1
+            status, payload, headers = _route(stub, method, parts, query, body)
+
+        if isinstance(payload, (bytes, bytearray)):
+            data = bytes(payload)
+        else:
+            data = json.dumps(payload).encode()
+            headers.setdefault("Content-Type", "application/json")
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if method != "HEAD":
+            self.wfile.write(data)
+
+
+def _route(stub, method, parts, query, body):
+    name, rest = parts[0], parts[1:]
+    if not name:
+        return 200, {"couchdb": "Welcome", "version": "stub"}, {}
+
+    db = stub.databases.get(name)
+    if not rest:
+        if method == "PUT":
+            if db is not None:
+                return (
+                    412,
+                    _error("file_exists", "The database could not be created."),
+                    {},
+                )
+            stub.databases[name] = {}
+            return 201, {"ok": True}, {}
+        if db is None:
+            return 404, _error("not_found", "Database does not exist."), {}
+        if method == "DELETE":
+            del stub.databases[name]
+            return 200, {"ok": True}, {}
+        if method == "POST":
+            return _put_doc(db, None, _loads(body))
+        return 200, {"db_name": name, "doc_count": len(db)}, {}
+
+    if db is None:
+        return 404, _error("not_found", "Database does not exist."), {}
+
+    if rest == ["_bulk_docs"]:
+        docs = _loads(body).get("docs", [])
+        return 201, [_put_doc(db, None, doc)[1] for doc in docs], {}
+
+    if rest == ["_all_docs"]:
+        keys = _loads(body).get("keys") if body else None
+        return 200, _all_docs(db, query, keys), {}
+
+    if (len(rest) == 4) and (rest[0] == "_design") and (rest[2] == "_view"):
+        return 200, _view(db, rest[3], query), {}
+
+    # Document, and attachment, paths
+    if rest[0] in ("_design", "_local"):
+        doc_id, att = "/".join(rest[:2]), "/".join(rest[2:])
+    else:
+        doc_id, att = rest[0], "/".join(rest[1:])
+
+    if att:
+        return _attachment(db, method, doc_id, att, query, body)
+
+    if method == "PUT":
+        return _put_doc(db, doc_id, _loads(body))
+    if method == "DELETE":
+        return _put_doc(db, doc_id, {"_rev": query.get("rev"), "_deleted": True})
+
+    doc = db.get(doc_id)
+    if (doc is None) or doc.get("_deleted"):
+        return 404, _error("not_found", "missing"), {}
+    return 200, _strip(doc), {"ETag": f'"{doc["_rev"]}"'}
+
+
+def _all_docs(db, query, keys):
+    include_docs = query.get("include_docs") == "true"
+    if keys is None:
+        ids = sorted(i for i, d in db.items() if not d.get("_deleted"))
+        if "startkey" in query:
+            start = json.loads(query["startkey"])
+            ids = [i for i in ids if i >= start]
+        if "endkey" in query:
+            end = json.loads(query["endkey"])
+            if query.get("inclusive_end") == "false":
+                ids = [i for i in ids if i < end]
+            else:
+                ids = [i for i in ids if i <= end]
+    else:
+        ids = keys
+    if "skip" in query:
+        ids = ids[int(query["skip"]) :]
+    if "limit" in query:
+        ids = ids[: int(query["limit"])]
+
+    rows = []
+    for doc_id in ids:
+        doc = db.get(doc_id)
+        if doc is None:
+            rows.append({"key": doc_id, "error": "not_found"})
+            continue
+        row = {"id": doc_id, "key": doc_id, "value": {"rev": doc["_rev"]}}
+        if include_docs:
+            row["doc"] = _strip(doc)
+        rows.append(row)
+
+    return {"total_rows": len(db), "offset": 0, "rows": rows}
+
+
+def _attachment(db, method, doc_id, att, query, body):
+    doc = db.get(doc_id)
+    if method == "PUT":
+        if doc is None:
+            doc = db[doc_id] = {"_id": doc_id, "_rev": "0-0"}
+        elif doc["_rev"] != query.get("rev"):
+            return 409, _error("conflict", "Document update conflict."), {}
+        doc.setdefault("_attachments", {})[att] = body
+        doc["_rev"] = _next_rev(doc["_rev"])
+        return 201, {"ok": True, "id": doc_id, "rev": doc["_rev"]}, {}
+
+    if (doc is None) or (att not in doc.get("_attachments", {})):
+        return 404, _error("not_found", "missing"), {}
+    data = doc["_attachments"][att]
+    return 200, data, {"Content-Type": "application/octet-stream"}
+
+
+def _put_doc(db, doc_id, doc):
+    doc_id = doc_id or doc.get("_id") or uuid.uuid4().hex
+    current = db.get(doc_id)
+    if (current is not None) and (current["_rev"] != doc.get("_rev")):
+        return (
+            409,
+            {"id": doc_id, "error": "conflict", "reason": "Document update conflict."},
+            {},
+        )
+
+    doc = dict(doc, _id=doc_id)
+    doc["_rev"] = _next_rev(current["_rev"] if current else "0-0")
+    if current and ("_attachments" in current):
+        doc["_attachments"] = current["_attachments"]
+    db[doc_id] = doc
+    return (
+        201,
+        {"ok": True, "id": doc_id, "rev": doc["_rev"]},
+        {"ETag": f'"{doc["_rev"]}"'},
+    )
+
+
+def _view(db, view, query):
+    field = re.sub(r"^by_", "", view)
+    rows = sorted(
+        (
+            {"id": i, "key": d[field], "value": None}
+            for i, d in db.items()
+            if field in d
+        ),
+        key=lambda row: (row["key"], row["id"]),
+    )
+    if "limit" in query:
+        rows = rows[: int(query["limit"])]
+    return {"total_rows": len(rows), "offset": 0, "rows": rows}
+
+
+def _error(error, reason):
+    return {"error": error, "reason": reason}
+
+
+def _loads(body):
+    return json.loads(body) if body else {}
+
+
+def _next_rev(rev):
+    return f"{int(rev.split('-')[0]) + 1}-{uuid.uuid4().hex}"
+
+
+def _strip(doc):
+    doc = dict(doc)
+    if "_attachments" in doc:
+        doc["_attachments"] = {
+            name: {"stub": True, "length": len(data)}
+            for name, data in doc["_attachments"].items()
+        }
+    return doc
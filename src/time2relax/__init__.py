@@ -13,8 +13,17 @@ Example::
     <Response [201]>
 """
 
+from time2relax.aio import AsyncCouchDB  # noqa: F401
+from time2relax.bulk import BulkWriter  # noqa: F401
+from time2relax.cache import DocumentCache  # noqa: F401
+from time2relax.cluster import CouchCluster  # noqa: F401
+from time2relax.codec import JSONCodec, OrjsonCodec  # noqa: F401
+from time2relax.compression import GzipCompressor  # noqa: F401
+from time2relax.conflicts import ConflictSweeper  # noqa: F401
+from time2relax.dumper import dump  # noqa: F401
 from time2relax.exceptions import (  # noqa: F401
     BadRequest,
+    CircuitOpenError,
     Forbidden,
     HTTPError,
     MethodNotAllowed,
@@ -24,4 +33,18 @@ from time2relax.exceptions import (  # noqa: F401
     ServerError,
     Unauthorized,
 )
+from time2relax.feeds import ChangesFeed  # noqa: F401
+from time2relax.loader import BulkLoader, load  # noqa: F401
+from time2relax.mango import FindPaginator, QueryPlan  # noqa: F401
+from time2relax.metrics import MetricsCollector, RequestEvent  # noqa: F401
 from time2relax.models import CouchDB  # noqa: F401
+from time2relax.pagination import Paginator  # noqa: F401
+from time2relax.results import (  # noqa: F401
+    Document,
+    Results,
+    Row,
+    ViewResult,
+    WriteResult,
+)
+from time2relax.retry import CircuitBreaker, RetryPolicy  # noqa: F401
+from time2relax.server import CouchServer  # noqa: F401
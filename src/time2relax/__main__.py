@@ -0,0 +1,153 @@
+"""Command line tools: ``python -m time2relax``."""
+
+import argparse
+import json
+import sys
+import time
+
+from time2relax.dumper import dump
+from time2relax.loader import FORMATS, load
+from time2relax.models import CouchDB
+
+
+def main(argv=None):
+    """Run a command, and print its statistics."""
+    parser = argparse.ArgumentParser(prog="python -m time2relax", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_load = commands.add_parser(
+        "load", help="Load documents from an NDJSON or JSON array file"
+    )
+    parser_load.add_argument("url", help="The database URL")
+    parser_load.add_argument("source", help="The file to load, '-' for stdin")
+    parser_load.add_argument(
+        "--format", choices=FORMATS, default="auto", help="The file format"
+    )
+    parser_load.add_argument(
+        "--batch-size", type=int, default=1000, help="The most documents in a request"
+    )
+    parser_load.add_argument(
+        "--max-bytes",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="The most bytes in a request",
+    )
+    parser_load.add_argument(
+        "--concurrency", type=int, default=4, help="The requests in flight"
+    )
+    parser_load.add_argument(
+        "--rejects", help="Append the rejected documents to this file"
+    )
+    parser_load.add_argument(
+        "--checkpoint", help="Save the progress to this file, and resume from it"
+    )
+    parser_load.add_argument("--codec", help="The JSON codec, 'json' or 'orjson'")
+    parser_load.add_argument(
+        "--no-create-db", action="store_true", help="Do not create the database"
+    )
+    parser_load.set_defaults(func=_load)
+
+    parser_dump = commands.add_parser(
+        "dump", help="Dump documents to NDJSON, a range of ids per thread"
+    )
+    parser_dump.add_argument("url", help="The database URL")
+    parser_dump.add_argument(
+        "dest",
+        help="The file to write, '-' for stdout, with a '{partition}' for a file "
+        "per partition, and a '.gz' to gzip",
+    )
+    parser_dump.add_argument(
+        "--partitions", type=int, default=4, help="The id ranges, dumped in parallel"
+    )
+    parser_dump.add_argument(
+        "--split-point",
+        action="append",
+        dest="split_points",
+        help="An id that starts a range, instead of sampled ones (repeatable)",
+    )
+    parser_dump.add_argument(
+        "--page-size", type=int, default=1000, help="The documents in a request"
+    )
+    parser_dump.add_argument(
+        "--attachments", action="store_true", help="Include the attachments"
+    )
+    parser_dump.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser_dump.add_argument("--codec", help="The JSON codec, 'json' or 'orjson'")
+    parser_dump.set_defaults(func=_dump)
+
+    args = parser.parse_args(argv)
+    stats = args.func(args)
+    # Keep the statistics out of a dump to stdout
+    out = sys.stderr if getattr(args, "dest", None) == "-" else sys.stdout
+    json.dump(stats, out, indent=2)
+    print(file=out)
+    return 0
+
+
+def _dump(args):
+    """Run the ``dump`` command.
+
+    :param argparse.Namespace args: The command line arguments.
+    :rtype: dict
+    """
+    db = CouchDB(args.url, create_db=False, codec=args.codec)
+    dest = sys.stdout.buffer if args.dest == "-" else args.dest
+
+    with db.session:
+        return dump(
+            db,
+            dest,
+            partitions=args.partitions,
+            split_points=args.split_points,
+            page_size=args.page_size,
+            attachments=args.attachments,
+            compress=args.gzip or None,
+            progress=_Progress(),
+        )
+
+
+def _load(args):
+    """Run the ``load`` command.
+
+    :param argparse.Namespace args: The command line arguments.
+    :rtype: dict
+    """
+    db = CouchDB(args.url, create_db=not args.no_create_db, codec=args.codec)
+    source = sys.stdin.buffer if args.source == "-" else args.source
+
+    with db.session:
+        return load(
+            db,
+            source,
+            args.format,
+            batch_size=args.batch_size,
+            max_bytes=args.max_bytes,
+            concurrency=args.concurrency,
+            rejects=args.rejects,
+            checkpoint=args.checkpoint,
+            progress=_Progress(),
+        )
+
+
+class _Progress:
+    """Print the statistics of a command to stderr, at most once a second."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, stats):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        rejected = f", {stats['rejected']} rejected" if "rejected" in stats else ""
+        print(
+            f"{stats['docs']} docs{rejected}, "
+            f"{stats['docs_per_sec']:.0f} docs/s, {stats['mb_per_sec']:.2f} MB/s",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Transport adapters that power time2relax."""
+
+import threading
+
+from requests import Request, Session
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class _CountingPoolMixin:
+    """Count the connections a :class:`urllib3.HTTPConnectionPool` hands out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.num_in_use = 0
+        self.num_discarded = 0
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        with self._stats_lock:
+            self.num_in_use += 1
+        return conn
+
+    def _put_conn(self, conn):
+        with self._stats_lock:
+            self.num_in_use = max(self.num_in_use - 1, 0)
+            # The pool closes connections it has no room for
+            if (self.pool is not None) and self.pool.full():
+                self.num_discarded += 1
+        super()._put_conn(conn)
+
+    def stats(self):
+        """Return the pool statistics.
+
+        :rtype: dict
+        """
+        idle = 0
+        if self.pool is not None:
+            idle = sum(1 for c in list(self.pool.queue) if c is not None)
+
+        return {
+            "in_use": self.num_in_use,
+            "idle": idle,
+            "created": self.num_connections,
+            "discarded": self.num_discarded,
+        }
+
+
+class CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    """A :class:`urllib3.HTTPConnectionPool` that keeps statistics."""
+
+
+class CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    """A :class:`urllib3.HTTPSConnectionPool` that keeps statistics."""
+
+
+class PoolAdapter(HTTPAdapter):
+    """A :class:`requests.adapters.HTTPAdapter` with pool statistics and pre-warming.
+
+    Example::
+
+        >>> session = requests.Session()
+        >>> adapter = PoolAdapter(pool_maxsize=50)
+        >>> session.mount('http://', adapter)
+        >>> adapter.prewarm('http://localhost:5984', 10)
+        >>> adapter.pool_stats()
+        {'in_use': 0, 'idle': 10, 'created': 10, 'discarded': 0}
+    """
+
+    def __init__(
+        self,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        **kwargs,
+    ):
+        """Initialize the adapter.
+
+        :param int pool_connections: (optional) The number of host pools to cache.
+        :param int pool_maxsize: (optional) The connections to keep in each pool.
+        :param bool pool_block: (optional) Wait for a free connection when exhausted.
+        :param kwargs: (optional) Arguments that :class:`HTTPAdapter` takes.
+        """
+        super().__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            **kwargs,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Initialize a pool manager that creates counting pools."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def prewarm(self, url, n, verify=True):
+        """Open ``n`` connections to a host ahead of the first request.
+
+        :param str url: A URL on the host to connect to.
+        :param int n: The number of connections, at most the pool size.
+        :param verify: (optional) The TLS verification the requests will use.
+        """
+        # Use the same pool (key) that requests to the URL will use
+        request = Request("HEAD", url).prepare()
+        pool = self.get_connection_with_tls_context(request, verify)
+        conns = [pool._get_conn() for _ in range(min(n, self._pool_maxsize))]
+        try:
+            for conn in conns:
+                if conn.sock is None:
+                    conn.connect()
+        finally:
+            for conn in conns:
+                pool._put_conn(conn)
+
+    def pool_stats(self):
+        """Return the statistics of every host pool, added up.
+
+        :rtype: dict
+        """
+        totals = {"in_use": 0, "idle": 0, "created": 0, "discarded": 0}
+
+        pools = self.poolmanager.pools
+        with pools.lock:
+            values = list(pools._container.values())
+        for pool in values:
+            for key, val in pool.stats().items():
+                totals[key] += val
+
+        return totals
+
+
+def make_session(
+    pool_connections=DEFAULT_POOLSIZE,
+    pool_maxsize=DEFAULT_POOLSIZE,
+    pool_block=DEFAULT_POOLBLOCK,
+    keep_alive=True,
+):
+    """Return a JSON :class:`requests.Session`, and the :class:`PoolAdapter` it uses.
+
+    :param int pool_connections: (optional) The number of host pools to cache.
+    :param int pool_maxsize: (optional) The connections to keep in each pool.
+    :param bool pool_block: (optional) Wait for a free connection when exhausted.
+    :param bool keep_alive: (optional) Reuse connections between requests.
+    :rtype: (requests.Session, PoolAdapter)
+    """
+    session = Session()
+    # http://docs.couchdb.org/en/stable/api/basics.html#request-headers
+    session.headers["Accept"] = "application/json"
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+
+    adapter = PoolAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session, adapter
@@ -0,0 +1,189 @@
+"""Asyncio objects that power time2relax."""
+
+import asyncio
+
+from time2relax import exceptions, time2relax, utils
+from time2relax.codec import decode_response, get_codec
+from time2relax.models import DATABASES, BaseCouchDB
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncCouchDB(BaseCouchDB):
+    """Asyncio representation of a CouchDB database.
+
+    Every API method of :class:`time2relax.CouchDB` is available as a coroutine,
+    sent over a pooled :class:`httpx.AsyncClient`.
+
+    Example::
+
+        >>> import time2relax
+        >>> async with time2relax.AsyncCouchDB('http://localhost:5984/testdb') as db:
+        ...     await db.insert({'title': 'Ziggy Stardust'})
+        <Response [201 Created]>
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, url, create_db=True, client=None, limits=None, codec=None):
+        """Initialize the database object.
+
+        :param str url: The Database URL.
+        :param create_db: (optional) Create the database, ``True`` or ``"lazy"``.
+        :param httpx.AsyncClient client: (optional) A client to share between databases.
+        :param httpx.Limits limits: (optional) Connection pool limits of a new client.
+        :param codec: (optional) The JSON codec of request and response bodies.
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncCouchDB requires httpx: pip install 'time2relax[async]'"
+            )
+
+        super().__init__(url, create_db)
+
+        #: Default :class:`httpx.AsyncClient`
+        self.client = client
+        if self.client is None:
+            self.client = httpx.AsyncClient(limits=limits or httpx.Limits())
+
+        #: JSON codec
+        self.codec = get_codec(codec)
+
+        self._lock = None
+
+    async def __aenter__(self):
+        """Return self."""
+        return self
+
+    async def __aexit__(self, *args):
+        """Close the client."""
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the client and its connection pool."""
+        await self.client.aclose()
+
+    async def request(self, method, path, _init=True, **kwargs):
+        """Construct a :class:`httpx.Request` object and send it."""
+        # Check if the database exists, once for all concurrent requests
+        if _init and self._must_check():
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._must_check():
+                    try:
+                        await self.request("HEAD", "", _init=False)
+                    except exceptions.ResourceNotFound:
+                        await self._create()
+                    DATABASES.add(self.url)
+
+        try:
+            r = await request(
+                self.client, self.base_url, method, path, self.codec, **kwargs
+            )
+        except exceptions.ResourceNotFound as ex:
+            if not (_init and self._must_create(method, path, kwargs, ex)):
+                raise
+            # Create the database, and replay the request
+            await self._create()
+            r = await request(
+                self.client, self.base_url, method, path, self.codec, **kwargs
+            )
+
+        if (method == "DELETE") and (not path):
+            DATABASES.discard(self.url)
+
+        return r
+
+    async def _create(self):
+        """Create the database, if it does not exist."""
+        try:
+            await self.request("PUT", "", _init=False)
+        except exceptions.PreconditionFailed:
+            # Created by someone else in the meantime
+            pass
+        DATABASES.add(self.url)
+
+
+async def request(client, base_path, method, path, codec=None, **kwargs):
+    """Construct a :class:`httpx.Request` object and send it.
+
+    :param httpx.AsyncClient client:
+    :param str base_path:
+    :param str method: Method for the :class:`httpx.Request` object.
+    :param str path: (optional) The path to join with :attr:`AsyncCouchDB.url`.
+    :param codec: (optional) The JSON codec of the request and response bodies.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: httpx.Response
+    """
+    url, kwargs = time2relax.prepare_request(base_path, path, codec, **kwargs)
+
+    # http://docs.couchdb.org/en/stable/api/basics.html#request-headers
+    # Sent with every request, a shared client's headers are left alone
+    headers = dict(kwargs.get("headers") or {})
+    if not any(k.lower() == "accept" for k in headers):
+        headers["Accept"] = "application/json"
+    kwargs["headers"] = headers
+
+    r = await client.request(method, url, **httpx_kwargs(kwargs))
+    if codec is not None:
+        decode_response(codec, r)
+    # Raise exception on a bad status code, 304 answers a conditional request
+    if not ((200 <= r.status_code < 300) or (r.status_code == 304)):
+        utils.raise_http_exception(r)
+
+    return r
+
+
+def httpx_kwargs(kwargs):
+    """Return :meth:`requests.Session.request` arguments as httpx arguments.
+
+    Example::
+
+        >>> httpx_kwargs({'data': b'foo', 'allow_redirects': False})
+        {'content': b'foo', 'follow_redirects': False}
+
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :rtype: dict
+    """
+    kwargs = dict(kwargs)
+
+    # Responses are always read, there is nothing to stream
+    kwargs.pop("stream", None)
+
+    if "allow_redirects" in kwargs:
+        kwargs["follow_redirects"] = kwargs.pop("allow_redirects")
+
+    if isinstance(kwargs.get("params"), dict):
+        # requests drops None values, httpx sends them as empty strings
+        kwargs["params"] = {k: v for k, v in kwargs["params"].items() if v is not None}
+
+    # httpx only takes form fields as 'data', raw bodies go in 'content'
+    data = kwargs.get("data")
+    if (data is not None) and (not isinstance(data, dict)):
+        del kwargs["data"]
+        if hasattr(data, "read"):
+            # Stream a file, rather than read it all into memory
+            data = _aiter_file(data)
+        elif isinstance(data, str):
+            data = data.encode("utf-8")
+        kwargs["content"] = data
+
+    return kwargs
+
+
+async def _aiter_file(fp, chunk_size=65536):
+    """Yield the chunks of a file, read in a thread.
+
+    :param fp: The readable file-like object.
+    :param int chunk_size: (optional) The number of bytes to read at a time.
+    :rtype: async iterator
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, fp.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
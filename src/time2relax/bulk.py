@@ -0,0 +1,228 @@
+"""Batching objects that power time2relax."""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from time2relax.codec import JSONCodec
+
+
+class BulkWriter:
+    """Coalesce single document writes into :meth:`CouchDB.bulk_docs` requests.
+
+    Writes are buffered and sent by a background thread once ``max_docs``,
+    ``max_bytes`` or ``max_latency`` is reached. Every write returns a
+    :class:`concurrent.futures.Future` of its own ``_bulk_docs`` result.
+
+    Example::
+
+        >>> with BulkWriter(db) as writer:
+        ...     future = writer.insert({'_id': 'docid', 'title': 'Heroes'})
+        ...
+        >>> future.result()
+        {'ok': True, 'id': 'docid', 'rev': '1-7b80fc50b6af7a905f368670429a757e'}
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self, db, max_docs=1000, max_bytes=4 * 1024 * 1024, max_latency=0.1, **kwargs
+    ):
+        """Initialize the writer and start its flusher.
+
+        :param CouchDB db: The database to write to.
+        :param int max_docs: (optional) The most documents in a request.
+        :param int max_bytes: (optional) The most (JSON encoded) bytes in a request.
+        :param float max_latency: (optional) The most seconds a write is buffered.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.bulk_docs` takes.
+        """
+        self.db = db
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.kwargs = kwargs
+
+        self._cond = threading.Condition()
+        self._docs = []
+        self._futures = []
+        self._sizes = []
+        self._bytes = 0
+        self._since = None
+        self._flushing = False
+        self._closed = False
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"BulkWriter-{db.name}", daemon=True
+        )
+        self._thread.start()
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def __enter__(self):
+        """Return self."""
+        return self
+
+    def __exit__(self, *args):
+        """Flush the pending writes and stop the flusher."""
+        self.close()
+
+    def insert(self, doc):
+        """Create or update an existing document.
+
+        :param dict doc: The document to insert.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        # The encoded bytes, and a separator
+        size = len((getattr(self.db, "codec", None) or JSONCodec()).dumps(doc)) + 1
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BulkWriter is closed")
+            if not self._docs:
+                self._since = time.monotonic()
+            self._docs.append(doc)
+            self._futures.append(future)
+            self._sizes.append(size)
+            self._bytes += size
+            # Wake the flusher to start the latency timer, or to send a full batch
+            if (len(self._docs) == 1) or self._full():
+                self._cond.notify()
+
+        return future
+
+    def update(self, doc):
+        """Update an existing document, ``doc`` must have an ``_id`` and ``_rev``.
+
+        :param dict doc: The document to update.
+        :rtype: concurrent.futures.Future
+        """
+        if ("_id" not in doc) or ("_rev" not in doc):
+            raise ValueError("update() needs a document with an '_id' and '_rev'")
+
+        return self.insert(doc)
+
+    def remove(self, doc_id, doc_rev):
+        """Delete a document.
+
+        :param str doc_id: The document to remove.
+        :param str doc_rev: The document revision.
+        :rtype: concurrent.futures.Future
+        """
+        return self.insert({"_id": doc_id, "_rev": doc_rev, "_deleted": True})
+
+    def flush(self):
+        """Send the buffered writes now, and wait for their results."""
+        with self._cond:
+            futures = list(self._futures)
+            self._flushing = bool(futures)
+            self._cond.notify()
+
+        for future in futures:
+            if not future.cancelled():
+                future.exception()
+
+    def close(self):
+        """Flush the pending writes and stop the flusher."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        self._thread.join()
+
+    def _full(self):
+        return (len(self._docs) >= self.max_docs) or (self._bytes >= self.max_bytes)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._closed and (not self._docs):
+                        return
+                    timeout = None
+                    if self._docs:
+                        timeout = self._since + self.max_latency - time.monotonic()
+                    self._cond.wait(timeout)
+
+                docs, futures = self._take()
+
+            self._send(docs, futures)
+
+    def _take(self):
+        # Take (at most) a full batch, and leave the rest buffered. A document
+        # larger than max_bytes is sent in a batch of its own
+        n, size = 0, 0
+        for doc_size in self._sizes[: self.max_docs]:
+            if n and (size + doc_size > self.max_bytes):
+                break
+            n += 1
+            size += doc_size
+
+        docs, self._docs = self._docs[:n], self._docs[n:]
+        futures, self._futures = self._futures[:n], self._futures[n:]
+        self._sizes = self._sizes[n:]
+        self._bytes -= size
+        if not self._futures:
+            self._flushing = False
+
+        return docs, futures
+
+    def _due(self):
+        if not self._docs:
+            return False
+
+        return (
+            self._flushing
+            or self._closed
+            or self._full()
+            or (time.monotonic() - self._since >= self.max_latency)
+        )
+
+    def _send(self, docs, futures):
+        # Drop the writes that were cancelled while buffered
+        pending = [
+            (doc, future)
+            for doc, future in zip(docs, futures)
+            if future.set_running_or_notify_cancel()
+        ]
+        if not pending:
+            return
+
+        docs = [doc for doc, _ in pending]
+        kwargs = dict(self.kwargs)
+        if isinstance(kwargs.get("json"), dict):
+            # time2relax.bulk_docs adds the docs to (a copy of) the body
+            kwargs["json"] = dict(kwargs["json"])
+
+        try:
+            results = self.db.bulk_docs(docs, **kwargs).json()
+            results = _match_results(docs, results)
+        except Exception as ex:  # pylint: disable=broad-except
+            for _, future in pending:
+                future.set_exception(ex)
+            return
+
+        for (_, future), result in zip(pending, results):
+            future.set_result(result)
+
+
+def _match_results(docs, results):
+    """Return the ``_bulk_docs`` result of every document.
+
+    With ``new_edits=false``, CouchDB only returns the results of failed writes.
+
+    :param list docs: The documents sent.
+    :param list results: The ``_bulk_docs`` results.
+    :rtype: list
+    """
+    if len(results) == len(docs):
+        return results
+
+    failed = {result.get("id"): result for result in results}
+    return [
+        failed.get(
+            doc.get("_id"), {"ok": True, "id": doc.get("_id"), "rev": doc.get("_rev")}
+        )
+        for doc in docs
+    ]
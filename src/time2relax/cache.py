@@ -0,0 +1,135 @@
+"""Caching objects that power time2relax."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class DocumentCache:
+    """A bounded LRU cache of document responses and their ``ETag``.
+
+    Cached documents are revalidated with ``If-None-Match``, and served from
+    the cache on ``304 Not Modified``. With a ``ttl``, documents cached less
+    than ``ttl`` seconds ago are served without a request. Documents are keyed
+    on ``(database url, encoded document id)``, so one cache can be shared by
+    several databases.
+
+    Example::
+
+        >>> db = CouchDB('http://localhost:5984/testdb', cache=DocumentCache(1000))
+        >>> db.get('docid')
+        <Response [200]>
+        >>> db.get('docid')
+        <Response [200]>
+        >>> db.cache.stats()
+        {'hits': 0, 'misses': 1, 'revalidations': 1, 'size': 1}
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """Initialize the cache.
+
+        :param int maxsize: (optional) The most documents to keep.
+        :param float ttl: (optional) Seconds to serve a document without a request.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        #: Documents served without a request
+        self.hits = 0
+        #: Documents fetched in full
+        self.misses = 0
+        #: Documents served after a ``304 Not Modified``
+        self.revalidations = 0
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{len(self._entries)}/{self.maxsize}]>"
+
+    def __len__(self):
+        """Return len(self)."""
+        return len(self._entries)
+
+    def lookup(self, key):
+        """Return the cached ``(response, etag, fresh)`` of a document, or ``None``.
+
+        :param tuple key: The ``(database url, encoded document id)``.
+        :rtype: (requests.Response, str, bool)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+
+            response, etag, stored = entry
+            fresh = (self.ttl is not None) and (time.monotonic() - stored < self.ttl)
+            if fresh:
+                self.hits += 1
+
+        return response, etag, fresh
+
+    def store(self, key, response):
+        """Cache the response of a document, if it has an ``ETag``.
+
+        :param tuple key: The ``(database url, encoded document id)``.
+        :param requests.Response response: The document response.
+        """
+        etag = response.headers.get("ETag")
+
+        with self._lock:
+            self.misses += 1
+            if not etag:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (response, etag, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def revalidated(self, key, response, etag):
+        """Refresh a cached document that was not modified.
+
+        :param tuple key: The ``(database url, encoded document id)``.
+        :param requests.Response response: The cached document response.
+        :param str etag: The cached document ``ETag``.
+        """
+        with self._lock:
+            self.revalidations += 1
+            self._entries[key] = (response, etag, time.monotonic())
+            self._entries.move_to_end(key)
+
+    def invalidate(self, *keys):
+        """Remove documents from the cache.
+
+        :param tuple keys: The ``(database url, encoded document id)`` keys.
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self, url=None):
+        """Remove every document (of a database) from the cache.
+
+        :param str url: (optional) The database url, or ``None`` for every database.
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == url]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return the cache statistics.
+
+        :rtype: dict
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "size": len(self._entries),
+        }
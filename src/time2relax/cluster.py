@@ -0,0 +1,328 @@
+"""Cluster objects that power time2relax."""
+
+import random
+import threading
+import time
+from posixpath import join as urljoin
+
+import requests
+
+from time2relax import exceptions, retry, utils
+from time2relax.models import BaseCouchDB, CouchDB
+
+#: The read balancing strategies of :class:`CouchCluster`
+BALANCERS = ("least_outstanding", "latency")
+
+# Errors that a different node may not have
+_FAILOVER_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    exceptions.CircuitOpenError,
+)
+
+_FAILOVER_STATUSES = (502, 503, 504)
+
+
+class Node:
+    """A node of a cluster, with its own :class:`CouchDB` and connection pool."""
+
+    def __init__(self, db, alpha=0.2):
+        """Initialize the node.
+
+        :param CouchDB db: The database on this node.
+        :param float alpha: (optional) The weight of a new latency sample.
+        """
+        self.db = db
+        self.alpha = alpha
+
+        #: ``False`` after a failed request or health check
+        self.healthy = True
+
+        #: Requests sent to the node and not answered yet
+        self.outstanding = 0
+
+        #: Moving average of the request latency, in seconds
+        self.latency = None
+
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self._counters = {"requests": 0, "errors": 0}
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def available(self, now=None):
+        """Return ``True`` if the node is healthy, or due for another try.
+
+        :param float now: (optional) The :func:`time.monotonic` time.
+        :rtype: bool
+        """
+        return self.healthy or ((now or time.monotonic()) >= self._retry_at)
+
+    def mark_down(self, recovery_time):
+        """Skip the node for ``recovery_time`` seconds (or a passing health check).
+
+        :param float recovery_time: The seconds before the node is tried again.
+        """
+        with self._lock:
+            self.healthy = False
+            self._retry_at = time.monotonic() + recovery_time
+
+    def mark_up(self):
+        """Send requests to the node again."""
+        with self._lock:
+            self.healthy = True
+
+    def request(self, method, path, _init=True, **kwargs):
+        """Send a request to the node, and record its latency.
+
+        :param str method: Method for the :class:`requests.Request` object.
+        :param str path: The request path.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: requests.Response
+        """
+        with self._lock:
+            self.outstanding += 1
+            self._counters["requests"] += 1
+
+        start = time.perf_counter()
+        try:
+            r = self.db.request(method, path, _init=_init, **kwargs)
+        except Exception:
+            with self._lock:
+                self._counters["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.outstanding -= 1
+
+        with self._lock:
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += self.alpha * (elapsed - self.latency)
+        return r
+
+    def stats(self):
+        """Return the node statistics.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                healthy=self.healthy,
+                outstanding=self.outstanding,
+                latency=self.latency,
+            )
+        return stats
+
+
+class CouchCluster(BaseCouchDB):
+    """Representation of a CouchDB database, served by the nodes of a cluster.
+
+    Reads go to the node with the fewest outstanding requests (or to a node
+    picked by latency), writes to the first available node in ``urls``. A
+    node that fails is skipped until a ``/_up`` health check passes, and
+    idempotent requests are sent again to another node.
+
+    Example::
+
+        >>> cluster = CouchCluster([
+        ...     'http://node1:5984/testdb',
+        ...     'http://node2:5984/testdb',
+        ...     'http://node3:5984/testdb',
+        ... ])
+        >>> cluster.insert({'title': 'Ziggy Stardust'})
+        <Response [201]>
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        urls,
+        create_db=True,
+        balance="least_outstanding",
+        health_interval=10.0,
+        health_timeout=2.0,
+        recovery_time=30.0,
+        **kwargs,
+    ):
+        """Initialize the cluster object.
+
+        :param list urls: The database URL on every node, the first takes the writes.
+        :param create_db: (optional) Create the database, see :class:`CouchDB`.
+        :param str balance: (optional) How to pick a node for a read,
+            ``"least_outstanding"`` or ``"latency"``.
+        :param float health_interval: (optional) Seconds between two ``/_up``
+            checks of every node, ``None`` to turn them off.
+        :param float health_timeout: (optional) Seconds to wait for a ``/_up`` check.
+        :param float recovery_time: (optional) Seconds before a failed node is
+            tried again, without a passing health check.
+        :param kwargs: (optional) Arguments that :class:`CouchDB` takes, for every node.
+        """
+        urls = list(urls)
+        if not urls:
+            raise ValueError("A cluster needs at least one node")
+        if balance not in BALANCERS:
+            raise ValueError(
+                f"Unknown balance {balance!r}, expected one of {BALANCERS}"
+            )
+
+        # Every node has a session, so a connection pool, of its own
+        nodes = [Node(CouchDB(url, create_db=create_db, **kwargs)) for url in urls]
+        if len({node.db.name for node in nodes}) > 1:
+            raise ValueError("The nodes must serve the same database")
+
+        super().__init__(urls[0], create_db)
+
+        #: The nodes, in the order writes prefer them
+        self.nodes = nodes
+        self.balance = balance
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.recovery_time = recovery_time
+
+        self._stop = threading.Event()
+        self._checker = None
+        if health_interval:
+            self._checker = threading.Thread(target=self._check_forever, daemon=True)
+            self._checker.start()
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{len(self.nodes)} x {self.name}]>"
+
+    def __enter__(self):
+        """Return the cluster."""
+        return self
+
+    def __exit__(self, *args):
+        """Stop the health checks, and close the connections."""
+        self.close()
+
+    def check_health(self):
+        """Check the ``/_up`` endpoint of every node, and mark it up or down.
+
+        :rtype: dict
+        """
+        results = {}
+        for node in self.nodes:
+            try:
+                r = node.db.session.get(
+                    urljoin(node.db.host, "_up"), timeout=self.health_timeout
+                )
+                up = r.status_code == 200
+            except requests.exceptions.RequestException:
+                up = False
+
+            if up:
+                node.mark_up()
+            else:
+                node.mark_down(self.recovery_time)
+            results[node.db.url] = up
+
+        return results
+
+    def close(self):
+        """Stop the health checks, and close the connections of every node."""
+        self._stop.set()
+        if self._checker is not None:
+            self._checker.join()
+        for node in self.nodes:
+            node.db.session.close()
+
+    def request(self, method, path, _init=True, **kwargs):
+        """Send a request to a node, and to the next one if the node fails."""
+        nodes = self._choose(method, path)
+        failover = utils.is_replayable(kwargs) and retry.is_idempotent(
+            method, path, kwargs
+        )
+
+        for i, node in enumerate(nodes):
+            last = (not failover) or (i == len(nodes) - 1)
+            try:
+                return node.request(method, path, _init=_init, **kwargs)
+            except _FAILOVER_ERRORS:
+                node.mark_down(self.recovery_time)
+                if last:
+                    raise
+            except exceptions.HTTPError as ex:
+                response = ex.args[1] if len(ex.args) > 1 else None
+                if getattr(response, "status_code", None) not in _FAILOVER_STATUSES:
+                    raise
+                node.mark_down(self.recovery_time)
+                if last:
+                    raise
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def stats(self):
+        """Return the statistics of every node.
+
+        :rtype: dict
+        """
+        return {node.db.url: node.stats() for node in self.nodes}
+
+    def _check_forever(self):
+        """Check the health of every node, until :meth:`close` is called."""
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def _choose(self, method, path):
+        """Return the nodes to send a request to, in the order to try them.
+
+        :param str method: The request method.
+        :param str path: The request path.
+        :rtype: list
+        """
+        now = time.monotonic()
+        available = [n for n in self.nodes if n.available(now)]
+        down = [n for n in self.nodes if not n.available(now)]
+        # With every node down, try them anyway
+        if not available:
+            return down
+
+        if _is_read(method, path) and (len(available) > 1):
+            first = self._pick(available)
+            available.remove(first)
+            available.insert(0, first)
+
+        return available + down
+
+    def _pick(self, nodes):
+        """Return the node to send a read to.
+
+        :param list nodes: The available nodes.
+        :rtype: Node
+        """
+        if self.balance == "latency":
+            known = [n.latency for n in nodes if n.latency is not None]
+            # An unmeasured node gets the best latency, to be measured soon
+            default = min(known) if known else 1.0
+            weights = [
+                1 / max(default if n.latency is None else n.latency, 1e-6)
+                for n in nodes
+            ]
+            return random.choices(nodes, weights)[0]
+
+        # Break ties at random, not always to the first node
+        return min(nodes, key=lambda n: (n.outstanding, random.random()))
+
+
+def _is_read(method, path):
+    """Return ``True`` if a request only reads.
+
+    :param str method: The request method.
+    :param str path: The request path.
+    :rtype: bool
+    """
+    if method in ("GET", "HEAD"):
+        return True
+
+    parts = path.split("/")
+    return (method == "POST") and (
+        (parts[-1] in retry.READ_POSTS) or ("_view" in parts[:-1])
+    )
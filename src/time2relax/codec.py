@@ -0,0 +1,124 @@
+"""JSON codec objects that power time2relax."""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JSONCodec:
+    """Encode and decode JSON with the standard library."""
+
+    name = "json"
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.name}]>"
+
+    def dumps(self, obj):
+        """Return the JSON bytes of an object.
+
+        :param obj: The object to encode.
+        :rtype: bytes
+        """
+        return json.dumps(obj, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+    def loads(self, data):
+        """Return the object of JSON bytes (or text).
+
+        :param data: The JSON to decode.
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Encode and decode JSON with :mod:`orjson`."""
+
+    name = "orjson"
+
+    def __init__(self):
+        """Initialize the codec."""
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson: pip install orjson")
+
+    def dumps(self, obj):
+        """Return the JSON bytes of an object.
+
+        :param obj: The object to encode.
+        :rtype: bytes
+        """
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        """Return the object of JSON bytes (or text).
+
+        :param data: The JSON to decode.
+        """
+        return orjson.loads(data)
+
+
+CODECS = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def get_codec(codec):
+    """Return a codec object by name, or the codec object itself.
+
+    Example::
+
+        >>> get_codec('orjson')
+        <OrjsonCodec [orjson]>
+
+    :param codec: ``"json"``, ``"orjson"``, or any object with ``dumps`` and ``loads``.
+    :rtype: JSONCodec
+    """
+    if codec is None:
+        return None
+    if isinstance(codec, str):
+        try:
+            return CODECS[codec]()
+        except KeyError:
+            raise ValueError(f"Unknown JSON codec: {codec!r}") from None
+
+    if not (hasattr(codec, "dumps") and hasattr(codec, "loads")):
+        raise TypeError("A JSON codec needs 'dumps' and 'loads' methods")
+
+    return codec
+
+
+def decode_response(codec, response):
+    """Decode the ``json()`` of a response with a codec.
+
+    :param codec: The codec object.
+    :param requests.Response response: The response object.
+    """
+
+    def loads(**kwargs):  # pylint: disable=unused-argument
+        return codec.loads(response.content)
+
+    response.json = loads
+
+
+def encode_body(codec, kwargs):
+    """Replace the ``json`` argument of a request with pre-encoded bytes.
+
+    :param codec: The codec object.
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :rtype: dict
+    """
+    if kwargs.get("json") is None:
+        return kwargs
+
+    kwargs = dict(kwargs)
+    body = codec.dumps(kwargs.pop("json"))
+    kwargs["data"] = body.encode("utf-8") if isinstance(body, str) else body
+
+    headers = dict(kwargs.get("headers") or {})
+    headers.setdefault("Content-Type", "application/json")
+    kwargs["headers"] = headers
+
+    return kwargs
@@ -0,0 +1,155 @@
+"""Compression objects that power time2relax."""
+
+import threading
+import time
+import zlib
+
+from time2relax.codec import JSONCodec, encode_body
+
+#: Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json",)
+
+
+class GzipCompressor:
+    """Gzip JSON request bodies of at least ``threshold`` bytes.
+
+    Compressed bodies are sent with ``Content-Encoding: gzip``. The ratio of
+    the bodies, and the CPU time spent compressing them, are kept to tune the
+    ``threshold`` and ``level`` with.
+
+    Example::
+
+        >>> db = CouchDB('http://localhost:5984/testdb', compression=GzipCompressor())
+        >>> db.bulk_docs(docs)
+        <Response [201]>
+        >>> db.compression.stats()
+        {'compressed': 1, 'skipped': 0, 'bytes_in': 81920, 'bytes_out': 9012, ...}
+    """
+
+    def __init__(self, threshold=1024, level=6, types=COMPRESSIBLE_TYPES):
+        """Initialize the compressor.
+
+        :param int threshold: (optional) The least bytes of a body to compress.
+        :param int level: (optional) The compression level, from 1 (fastest) to 9.
+        :param tuple types: (optional) The content types to compress.
+        """
+        if not 0 <= level <= 9:
+            raise ValueError("level must be from 0 to 9")
+
+        self.threshold = threshold
+        self.level = level
+        self.types = types
+
+        self._codec = JSONCodec()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            (
+                "compressed",
+                "skipped",
+                "bytes_in",
+                "bytes_out",
+                "cpu_time",
+                "responses",
+                "response_bytes_in",
+                "response_bytes_out",
+            ),
+            0,
+        )
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.threshold}, {self.level}]>"
+
+    def compress(self, kwargs, codec=None):
+        """Return the request arguments, with a gzip body if it is large enough.
+
+        :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+        :param codec: (optional) The JSON codec to encode the ``json`` body with.
+        :rtype: dict
+        """
+        if kwargs.get("json") is not None:
+            kwargs = encode_body(codec or self._codec, kwargs)
+
+        data = kwargs.get("data")
+        if not isinstance(data, (bytes, str)):
+            return kwargs
+
+        headers = {k.lower(): v for k, v in (kwargs.get("headers") or {}).items()}
+        content_type = (headers.get("content-type") or "").split(";")[0].strip()
+        if ("content-encoding" in headers) or (content_type not in self.types):
+            return kwargs
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if len(data) < self.threshold:
+            self._count(skipped=1)
+            return kwargs
+
+        start = time.thread_time()
+        # A wbits of 31 writes a gzip header and trailer
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        body = compressor.compress(data) + compressor.flush()
+        cpu_time = time.thread_time() - start
+
+        self._count(
+            compressed=1, bytes_in=len(data), bytes_out=len(body), cpu_time=cpu_time
+        )
+
+        kwargs = dict(kwargs)
+        kwargs["data"] = body
+        kwargs["headers"] = dict(
+            kwargs.get("headers") or {}, **{"Content-Encoding": "gzip"}
+        )
+        return kwargs
+
+    def record(self, response, kwargs):
+        """Count the bytes of a compressed response.
+
+        The response is decompressed as it is read, so the compressed and
+        decompressed bodies are never both in memory. A streamed response is
+        not counted, it is not read yet.
+
+        :param requests.Response response: The response object.
+        :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+        """
+        encoding = response.headers.get("Content-Encoding") or ""
+        if kwargs.get("stream") or ("gzip" not in encoding):
+            return
+
+        size = len(response.content)
+        try:
+            # The bytes read off the wire, before decompression
+            wire = response.raw.tell()
+        except (AttributeError, OSError, TypeError):
+            return
+        if isinstance(wire, int):
+            self._count(responses=1, response_bytes_in=wire, response_bytes_out=size)
+
+    def stats(self):
+        """Return the compression statistics.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._counters)
+
+        stats["ratio"] = _ratio(stats["bytes_in"], stats["bytes_out"])
+        stats["response_ratio"] = _ratio(
+            stats["response_bytes_out"], stats["response_bytes_in"]
+        )
+        return stats
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, val in counts.items():
+                self._counters[key] += val
+
+
+def _ratio(size, compressed):
+    """Return how many times smaller a compressed body is, or ``None``.
+
+    :param int size: The bytes before compression.
+    :param int compressed: The bytes after compression.
+    :rtype: float
+    """
+    return (size / compressed) if compressed else None
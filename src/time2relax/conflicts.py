@@ -0,0 +1,227 @@
+"""Conflict objects that power time2relax."""
+
+import threading
+import time
+
+from time2relax import utils
+from time2relax.feeds import ChangesFeed
+from time2relax.pagination import Paginator
+
+#: The sources of conflicted documents of :class:`ConflictSweeper`
+SOURCES = ("all_docs", "changes", "view")
+
+
+class ConflictSweeper:
+    """Find conflicted documents in bulk, merge their leaf revisions, and clean up.
+
+    Conflicted documents are read a page at a time from ``_all_docs`` (or
+    ``_changes``) with ``conflicts=true``, or from a view. For every batch,
+    the losing revisions are fetched with a ``_bulk_get`` request and passed,
+    after the winning revision, to ``merge``. The merged document is written
+    over the winner, and the losers are deleted, in one ``_bulk_docs`` request.
+    ``concurrency`` batches are in flight at once.
+
+    Example::
+
+        >>> def merge(revs):
+        ...     winner = dict(revs[0])
+        ...     winner['tags'] = sorted({t for rev in revs for t in rev.get('tags', [])})
+        ...     return winner
+        ...
+        >>> ConflictSweeper(db, merge, concurrency=8).run()
+        {'conflicted': 1200, 'resolved': 1198, 'revisions_deleted': 1411, 'errors': 2, ...}
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        db,
+        merge=None,
+        source="all_docs",
+        ddoc_id=None,
+        func_id=None,
+        since=None,
+        batch_size=100,
+        page_size=1000,
+        concurrency=4,
+        progress=None,
+    ):
+        """Initialize the sweeper.
+
+        :param CouchDB db: The database to sweep.
+        :param function merge: (optional) Called with the leaf revisions of a
+            document, the winner first, returns the document to keep, or
+            ``None`` to leave it conflicted. Keeps the winner by default.
+        :param str source: (optional) Where to find the conflicted documents,
+            ``"all_docs"``, ``"changes"`` or ``"view"``.
+        :param str ddoc_id: (optional) The design document name of a view that
+            emits ``[doc._rev].concat(doc._conflicts)`` for conflicted documents.
+        :param str func_id: (optional) The view function name of the view.
+        :param since: (optional) The seq to read ``_changes`` after.
+        :param int batch_size: (optional) The conflicted documents in a batch.
+        :param int page_size: (optional) The number of rows in a read.
+        :param int concurrency: (optional) The batches in flight.
+        :param function progress: (optional) Called with the :meth:`stats` after
+            every batch.
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source {source!r}, expected one of {SOURCES}")
+        if (source == "view") and not (ddoc_id and func_id):
+            raise ValueError("A view source needs a ddoc_id and func_id")
+        if (batch_size < 1) or (concurrency < 1):
+            raise ValueError("batch_size and concurrency must be at least 1")
+
+        self.db = db
+        self.merge = merge or _keep_winner
+        self.source = source
+        self.ddoc_id = ddoc_id
+        self.func_id = func_id
+        self.since = since
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.progress = progress
+
+        self._lock = threading.Lock()
+        self._start = None
+        self._counters = dict.fromkeys(
+            ("conflicted", "resolved", "skipped", "revisions_deleted", "errors"), 0
+        )
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def __iter__(self):
+        """Yield the conflicted documents, as ``(doc_id, revs, winner)``.
+
+        The ``winner`` is the winning revision, or ``None`` when it is not read
+        (from a view).
+        """
+        if self.source == "view":
+            pages = Paginator(
+                self.db, self.ddoc_id, self.func_id, page_size=self.page_size
+            )
+            for row in pages.rows():
+                yield row["id"], list(row["value"]), None
+            return
+
+        params = {"conflicts": True}
+        if self.source == "changes":
+            rows = ChangesFeed(
+                self.db, since=self.since, include_docs=True, params=params
+            )
+        else:
+            params["include_docs"] = True
+            rows = Paginator(self.db, page_size=self.page_size, params=params).rows()
+
+        for row in rows:
+            doc = row.get("doc")
+            if doc and doc.get("_conflicts"):
+                winner = {k: v for k, v in doc.items() if k != "_conflicts"}
+                yield doc["_id"], [doc["_rev"]] + doc["_conflicts"], winner
+
+    def run(self):
+        """Resolve every conflicted document, and return the :meth:`stats`.
+
+        :rtype: dict
+        """
+        self._start = time.monotonic()
+        batches = utils.chunked(iter(self), self.batch_size)
+        for _ in utils.imap_concurrent(self._sweep, batches, self.concurrency):
+            if self.progress is not None:
+                self.progress(self.stats())
+
+        return self.stats()
+
+    def stats(self):
+        """Return the sweep statistics.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats["elapsed"] = (time.monotonic() - self._start) if self._start else 0.0
+        return stats
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, val in counts.items():
+                self._counters[key] += val
+
+    def _fetch(self, batch):
+        """Return the leaf revisions of a batch, by document id.
+
+        :param list batch: The ``(doc_id, revs, winner)`` of the documents.
+        :rtype: dict
+        """
+        leaves = {}
+        wanted = []
+        for doc_id, revs, winner in batch:
+            leaves[doc_id] = {}
+            if winner is not None:
+                leaves[doc_id][winner["_rev"]] = winner
+            wanted.extend(
+                {"id": doc_id, "rev": rev} for rev in revs if rev not in leaves[doc_id]
+            )
+
+        for result in self.db.bulk_get(wanted):
+            for item in result["docs"]:
+                doc = item.get("ok")
+                if doc is not None:
+                    leaves[doc["_id"]][doc["_rev"]] = doc
+
+        return leaves
+
+    def _sweep(self, batch):
+        """Merge, and clean up, the conflicted documents of a batch.
+
+        :param list batch: The ``(doc_id, revs, winner)`` of the documents.
+        """
+        leaves = self._fetch(batch)
+        docs = []
+        resolving = 0
+
+        for doc_id, revs, _ in batch:
+            # A revision that is missing was resolved since it was read
+            revs = [rev for rev in revs if rev in leaves[doc_id]]
+            if len(revs) < 2:
+                continue
+            merged = self.merge([leaves[doc_id][rev] for rev in revs])
+            if merged is None:
+                continue
+
+            # Write on the winning branch, delete the others
+            if merged != leaves[doc_id][revs[0]]:
+                docs.append(dict(merged, _id=doc_id, _rev=revs[0]))
+            docs.extend(
+                {"_id": doc_id, "_rev": rev, "_deleted": True} for rev in revs[1:]
+            )
+            resolving += 1
+
+        failed = set()
+        deleted = 0
+        if docs:
+            results = self.db.bulk_docs(docs).json()
+            for doc, result in zip(docs, results):
+                if "error" in result:
+                    failed.add(doc["_id"])
+                elif doc.get("_deleted"):
+                    deleted += 1
+
+        self._count(
+            conflicted=len(batch),
+            resolved=resolving - len(failed),
+            skipped=len(batch) - resolving,
+            revisions_deleted=deleted,
+            errors=len(failed),
+        )
+
+
+def _keep_winner(revs):
+    """Return the winning revision, the default merge of :class:`ConflictSweeper`.
+
+    :param list revs: The leaf revisions, the winner first.
+    :rtype: dict
+    """
+    return revs[0]
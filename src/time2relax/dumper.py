@@ -0,0 +1,209 @@
+"""Dumping objects that power time2relax."""
+
+import contextlib
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from time2relax import utils
+from time2relax.codec import JSONCodec
+from time2relax.pagination import Paginator
+
+#: The placeholder of the partition number, in the destination of :func:`dump`
+PARTITION = "{partition}"
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def dump(
+    db,
+    dest,
+    partitions=4,
+    split_points=None,
+    page_size=1000,
+    attachments=False,
+    compress=None,
+    progress=None,
+):
+    """Dump the documents of a database to NDJSON, a range of ids per thread.
+
+    The ``_all_docs`` ids are split into ranges, and every range is paged
+    through (with keyset pagination) from a thread of its own. Partitions are
+    written to a file each when ``dest`` has a ``{partition}`` placeholder,
+    else to one file, in id order.
+
+    Example::
+
+        >>> dump(db, 'backup.ndjson.gz', partitions=8)
+        {'docs': 50000, 'bytes': 10486321, 'partitions': 8, ..., 'docs_per_sec': 41666.7}
+        >>> dump(db, 'backup-{partition}.ndjson', split_points=['g', 'n', 't'])
+        {'docs': 50000, 'bytes': 11534336, 'partitions': 4, ..., 'docs_per_sec': 38461.5}
+
+    :param CouchDB db: The database to dump.
+    :param dest: A file path, or a binary file-like object (left open).
+    :param int partitions: (optional) The ranges (and threads), the split points
+        are sampled with :func:`sample_split_points`.
+    :param list split_points: (optional) The ids that start the second to last
+        ranges, instead of sampled ones.
+    :param int page_size: (optional) The number of documents in a request.
+    :param bool attachments: (optional) Include the attachments, base64 encoded.
+    :param bool compress: (optional) Gzip the output, by default if ``dest``
+        ends with ``.gz``.
+    :param function progress: (optional) Called with the statistics after every page.
+    :rtype: dict
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+
+    if split_points is None:
+        split_points = sample_split_points(db, partitions)
+    split_points = sorted(set(split_points))
+    bounds = [None] + split_points + [None]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+
+    is_path = isinstance(dest, (str, os.PathLike))
+    if compress is None:
+        compress = is_path and os.fspath(dest).endswith(".gz")
+
+    params = {"include_docs": True}
+    if attachments:
+        params["attachments"] = True
+
+    stats = _Stats(len(ranges), progress)
+    dumps = (getattr(db, "codec", None) or JSONCodec()).dumps
+
+    def write(args):
+        (start, end), path = args
+        with _open(path, compress) as fp:
+            _dump_range(db, fp, start, end, page_size, params, dumps, stats)
+
+    if is_path and (PARTITION in os.fspath(dest)):
+        paths = [
+            os.fspath(dest).replace(PARTITION, f"{i:04}") for i in range(len(ranges))
+        ]
+        list(utils.imap_concurrent(write, zip(ranges, paths), len(ranges)))
+        return stats.get()
+
+    if len(ranges) == 1:
+        write((ranges[0], dest))
+        return stats.get()
+
+    # Spool the partitions, and join them in order (gzip members join too)
+    parent = os.path.dirname(os.path.abspath(dest)) if is_path else None
+    with tempfile.TemporaryDirectory(dir=parent) as tmp:
+        paths = [os.path.join(tmp, f"{i:04}") for i in range(len(ranges))]
+        list(utils.imap_concurrent(write, zip(ranges, paths), len(ranges)))
+
+        with utils.open_writable(dest) as out:
+            for path in paths:
+                with open(path, "rb") as fp:
+                    shutil.copyfileobj(fp, out)
+
+    return stats.get()
+
+
+def sample_split_points(db, partitions, concurrency=4):
+    """Return the ids that split ``_all_docs`` into ranges of about equal size.
+
+    Every split point costs a ``limit=1`` request, ``skip``-ing to its offset.
+
+    Example::
+
+        >>> sample_split_points(db, 4)
+        ['4b2e...', '8f1c...', 'c3a0...']
+
+    :param CouchDB db: The database to split.
+    :param int partitions: The number of ranges.
+    :param int concurrency: (optional) The requests in flight.
+    :rtype: list
+    """
+    count = db.info().json()["doc_count"]
+    if (partitions < 2) or (count < partitions):
+        return []
+
+    def sample(i):
+        params = {"skip": i * count // partitions, "limit": 1}
+        rows = db.all_docs(params=params).json()["rows"]
+        return rows[0]["id"] if rows else None
+
+    points = utils.imap_concurrent(sample, range(1, partitions), concurrency)
+    # Documents deleted since the count was read may repeat (or lose) a point
+    return sorted({p for p in points if p is not None})
+
+
+class _Stats:
+    """The statistics of a dump, updated from many threads."""
+
+    def __init__(self, partitions, progress):
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._counters = {"docs": 0, "bytes": 0, "partitions": partitions}
+
+    def add(self, docs, size):
+        with self._lock:
+            self._counters["docs"] += docs
+            self._counters["bytes"] += size
+            if self.progress is not None:
+                self.progress(self.get())
+
+    def get(self):
+        stats = dict(self._counters)
+        elapsed = time.monotonic() - self._start
+        stats["elapsed"] = elapsed
+        stats["docs_per_sec"] = (stats["docs"] / elapsed) if elapsed else 0.0
+        stats["mb_per_sec"] = (stats["bytes"] / 1e6 / elapsed) if elapsed else 0.0
+        return stats
+
+
+# pylint: disable=too-many-arguments
+def _dump_range(db, fp, start, end, page_size, params, dumps, stats):
+    """Write the documents of an id range, as NDJSON.
+
+    :param CouchDB db: The database to dump.
+    :param fp: The binary file to write to.
+    :param str start: The first id of the range, or ``None``.
+    :param str end: The id after the range, or ``None``.
+    :param int page_size: The number of documents in a request.
+    :param dict params: The query parameters.
+    :param function dumps: Returns the JSON bytes of a document.
+    :param _Stats stats: The statistics to update.
+    """
+    params = dict(params)
+    if start is not None:
+        params["startkey"] = start
+    if end is not None:
+        params["endkey"] = end
+        params["inclusive_end"] = False
+
+    for rows in Paginator(db, page_size=page_size, params=params):
+        lines = [_encode(dumps(row["doc"])) + b"\n" for row in rows if row.get("doc")]
+        data = b"".join(lines)
+        fp.write(data)
+        stats.add(len(lines), len(data))
+
+
+def _encode(data):
+    """Return the bytes of a codec's JSON, which may be text.
+
+    :param data: The JSON bytes or text.
+    :rtype: bytes
+    """
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def _open(dest, compress):
+    """Return a context manager of a writable file, gzipped or not.
+
+    :param dest: A file path, or a binary file-like object (left open).
+    :param bool compress: Gzip what is written.
+    :rtype: contextlib.AbstractContextManager
+    """
+    if not compress:
+        return utils.open_writable(dest)
+    if isinstance(dest, (str, os.PathLike)):
+        return gzip.open(dest, "wb")
+
+    return contextlib.closing(gzip.GzipFile(fileobj=dest, mode="wb"))
@@ -1,6 +1,10 @@
 """A collection of time2relax exceptions."""
 
 
+class CircuitOpenError(Exception):
+    """A request failed fast, the host is unhealthy."""
+
+
 class HTTPError(Exception):
     """Representation of a HTTP error."""
 
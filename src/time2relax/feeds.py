@@ -0,0 +1,199 @@
+"""Changes feed objects that power time2relax."""
+
+import json
+import time
+
+import requests
+
+from time2relax import exceptions, time2relax, utils
+
+FEEDS = ("normal", "longpoll", "continuous")
+
+# Errors that end a feed connection, but not the feed
+_RECONNECT_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+
+class ChangesFeed:
+    """Follow the ``_changes`` feed of a database.
+
+    Changes are parsed as they arrive, and ``longpoll``/``continuous`` feeds
+    reconnect from the last seq. The seq of the last change consumed can be
+    checkpointed to a ``_local/`` document, to resume from it later.
+
+    Example::
+
+        >>> feed = ChangesFeed(db, feed='continuous', checkpoint_id='indexer')
+        >>> for change in feed:
+        ...     index(change['id'])
+        ...
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        db,
+        feed="normal",
+        since=None,
+        limit=None,
+        include_docs=False,
+        heartbeat=None,
+        reconnect=True,
+        retry_delay=1.0,
+        checkpoint_id=None,
+        checkpoint_every=100,
+        chunk_size=65536,
+        params=None,
+        **kwargs,
+    ):
+        """Initialize the feed.
+
+        :param CouchDB db: The database to follow.
+        :param str feed: (optional) One of ``normal``, ``longpoll`` or ``continuous``.
+        :param since: (optional) The seq to start after, or ``now``.
+        :param int limit: (optional) The most changes to read.
+        :param bool include_docs: (optional) Include the documents in the changes.
+        :param int heartbeat: (optional) Milliseconds between server heartbeats.
+        :param bool reconnect: (optional) Reconnect a dropped or ended feed.
+        :param float retry_delay: (optional) Seconds to wait before reconnecting.
+        :param str checkpoint_id: (optional) The ``_local/`` document to keep the seq in.
+        :param int checkpoint_every: (optional) Changes between two checkpoints.
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param dict params: (optional) Other ``_changes`` parameters, like ``filter``
+            and ``selector``.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        """
+        if feed not in FEEDS:
+            raise ValueError(f"feed must be one of {FEEDS}")
+
+        self.db = db
+        self.feed = feed
+        self.limit = limit
+        self.include_docs = include_docs
+        self.heartbeat = heartbeat
+        self.reconnect = reconnect
+        self.retry_delay = retry_delay
+        self.checkpoint_every = checkpoint_every
+        self.chunk_size = chunk_size
+        self.params = dict(params or {})
+        self.kwargs = kwargs
+
+        self.checkpoint_id = checkpoint_id
+        if checkpoint_id and (not checkpoint_id.startswith("_local/")):
+            self.checkpoint_id = f"_local/{checkpoint_id}"
+        self._checkpoint_rev = None
+
+        #: The seq of the last change consumed
+        self.last_seq = since
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}] {self.feed}>"
+
+    def __iter__(self):
+        """Yield the changes, as they arrive."""
+        if self.checkpoint_id and (self.last_seq is None):
+            self.last_seq = self.load_checkpoint()
+
+        count = 0
+        try:
+            while (self.limit is None) or (count < self.limit):
+                try:
+                    for change, seq in self._read(count):
+                        yield change
+                        # The change was consumed
+                        self.last_seq = seq
+                        count += 1
+                        if self.checkpoint_id and (count % self.checkpoint_every == 0):
+                            self.save_checkpoint()
+                        if (self.limit is not None) and (count >= self.limit):
+                            break
+                except _RECONNECT_ERRORS:
+                    if (not self.reconnect) or (self.feed == "normal"):
+                        raise
+                    time.sleep(self.retry_delay)
+                    continue
+
+                if (not self.reconnect) or (self.feed == "normal"):
+                    break
+        finally:
+            if self.checkpoint_id:
+                self.save_checkpoint()
+
+    def load_checkpoint(self):
+        """Return the checkpointed seq, or ``None``.
+
+        :rtype: str
+        """
+        try:
+            doc = self.db.get(self.checkpoint_id).json()
+        except exceptions.ResourceNotFound:
+            return None
+
+        self._checkpoint_rev = doc.get("_rev")
+        return doc.get("seq")
+
+    def save_checkpoint(self):
+        """Checkpoint the seq of the last change consumed."""
+        if self.last_seq is None:
+            return
+
+        doc = {"_id": self.checkpoint_id, "seq": self.last_seq}
+        if self._checkpoint_rev:
+            doc["_rev"] = self._checkpoint_rev
+
+        self._checkpoint_rev = self.db.insert(doc).json()["rev"]
+
+    def _read(self, count):
+        """Yield the changes of a single feed connection, with their seq.
+
+        :param int count: The number of changes consumed so far.
+        :rtype: iterator
+        """
+        params = dict(self.params)
+        params["feed"] = self.feed
+        if self.last_seq is not None:
+            params["since"] = self.last_seq
+        if self.limit is not None:
+            params["limit"] = self.limit - count
+        if self.include_docs:
+            params["include_docs"] = True
+        if self.heartbeat and (self.feed != "normal"):
+            params["heartbeat"] = self.heartbeat
+
+        m, p, k = time2relax.changes(params=params, **self.kwargs)
+        k["stream"] = True
+        r = self.db.request(m, p, **k)
+
+        loads = (getattr(self.db, "codec", None) or json).loads
+        trailer = {}
+
+        def read_trailer(text):
+            # The fields after the results, e.g. ',"last_seq":"5-g1A","pending":0}'
+            trailer.update(json.loads("{" + text.strip().lstrip(",")))
+
+        try:
+            if self.feed == "continuous":
+                for line in r.iter_lines(self.chunk_size):
+                    # Empty lines are heartbeats
+                    if not line:
+                        continue
+                    change = loads(line)
+                    if "seq" not in change:
+                        # {"last_seq": ...} ends the feed
+                        self.last_seq = change.get("last_seq", self.last_seq)
+                        return
+                    yield change, change["seq"]
+            else:
+                changes = utils.iter_rows(
+                    r, self.chunk_size, name="results", trailer=read_trailer
+                )
+                for change in changes:
+                    yield change, change["seq"]
+                # Resume after the changes the server filtered out, too
+                self.last_seq = trailer.get("last_seq", self.last_seq)
+        finally:
+            r.close()
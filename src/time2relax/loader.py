@@ -0,0 +1,372 @@
+"""Loading objects that power time2relax."""
+
+import contextlib
+import gzip
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from time2relax import exceptions, utils
+from time2relax.codec import JSONCodec
+
+#: The formats of :func:`iter_docs`
+FORMATS = ("auto", "ndjson", "json")
+
+
+class BulkLoader:
+    """Load a stream of documents with concurrent ``_bulk_docs`` requests.
+
+    Documents are batched by count and (JSON encoded) bytes, and ``concurrency``
+    batches are in flight at once. Documents that are rejected (e.g. conflicts)
+    are written to ``rejects``, and finished batches to ``checkpoint``, so an
+    interrupted load resumes without sending them again.
+
+    Example::
+
+        >>> loader = BulkLoader(db, concurrency=8, checkpoint='load.checkpoint')
+        >>> loader.run('docs.ndjson')
+        {'docs': 50000, 'rejected': 2, 'batches': 50, ..., 'docs_per_sec': 21034.2}
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        db,
+        batch_size=1000,
+        max_bytes=4 * 1024 * 1024,
+        concurrency=4,
+        rejects=None,
+        checkpoint=None,
+        progress=None,
+        **kwargs,
+    ):
+        """Initialize the loader.
+
+        :param CouchDB db: The database to load into.
+        :param int batch_size: (optional) The most documents in a request.
+        :param int max_bytes: (optional) The most (JSON encoded) bytes in a request.
+        :param int concurrency: (optional) The requests in flight.
+        :param rejects: (optional) A file path, or a binary file-like object, to
+            append the rejected documents to, as NDJSON.
+        :param str checkpoint: (optional) A file path to save the progress to.
+        :param function progress: (optional) Called with the :meth:`stats` after
+            every batch.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.bulk_docs` takes.
+        """
+        if (batch_size < 1) or (concurrency < 1):
+            raise ValueError("batch_size and concurrency must be at least 1")
+
+        self.db = db
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.rejects = rejects
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.kwargs = kwargs
+
+        self._counters = dict.fromkeys(
+            ("docs", "rejected", "skipped", "batches", "bytes"), 0
+        )
+        self._start = None
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def run(self, source, fmt="auto"):
+        """Load the documents of a source, and return the :meth:`stats`.
+
+        :param source: A file path, a binary file-like object, or an iterable
+            of documents.
+        :param str fmt: (optional) The file format, see :func:`iter_docs`.
+        :rtype: dict
+        """
+        state = self._read_checkpoint()
+        self._start = time.monotonic()
+
+        if isinstance(source, (str, os.PathLike)) or hasattr(source, "read"):
+            docs = iter_docs(source, fmt)
+        else:
+            docs = iter(source)
+
+        with _open_rejects(self.rejects) as fp:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                pending = {}
+                try:
+                    for index, batch in enumerate(self._batches(docs)):
+                        # Skip the batches the checkpoint has
+                        if (index < state["next"]) or (index in state["done"]):
+                            self._counters["skipped"] += len(batch[0])
+                            continue
+                        if len(pending) >= self.concurrency:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            self._collect(done, pending, state, fp)
+                        future = executor.submit(self._send, batch[0])
+                        pending[future] = (index,) + batch
+
+                    while pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        self._collect(done, pending, state, fp)
+                except BaseException:
+                    # Keep the batches that finished, the others are sent again
+                    for future in pending:
+                        future.cancel()
+                    done, _ = wait(pending)
+                    self._collect(done, pending, state, fp, errors=False)
+                    raise
+
+        return self.stats()
+
+    def stats(self):
+        """Return the load statistics.
+
+        :rtype: dict
+        """
+        stats = dict(self._counters)
+        elapsed = (time.monotonic() - self._start) if self._start else 0.0
+        stats["elapsed"] = elapsed
+        stats["docs_per_sec"] = (
+            (stats["docs"] + stats["rejected"]) / elapsed if elapsed else 0.0
+        )
+        stats["mb_per_sec"] = stats["bytes"] / 1e6 / elapsed if elapsed else 0.0
+        return stats
+
+    def _batches(self, docs):
+        """Yield the ``(docs, bytes)`` of every batch.
+
+        :param iterator docs: The documents.
+        :rtype: iterator
+        """
+        dumps = (getattr(self.db, "codec", None) or JSONCodec()).dumps
+        batch = []
+        size = 0
+
+        for doc in docs:
+            n = len(dumps(doc)) + 1
+            if batch and (
+                (len(batch) >= self.batch_size) or (size + n > self.max_bytes)
+            ):
+                yield batch, size
+                batch = []
+                size = 0
+            batch.append(doc)
+            size += n
+
+        if batch:
+            yield batch, size
+
+    # pylint: disable=too-many-arguments
+    def _collect(self, done, pending, state, fp, errors=True):
+        """Record the batches that finished, and save the checkpoint.
+
+        :param set done: The futures that finished.
+        :param dict pending: The ``(index, docs, bytes)`` of the pending futures.
+        :param dict state: The checkpoint state.
+        :param fp: The file to write the rejected documents to, or ``None``.
+        :param bool errors: (optional) Raise the error of a failed batch.
+        """
+        error = None
+        for future in sorted(done, key=lambda f: pending[f][0]):
+            index, docs, size = pending.pop(future)
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+
+            rejected = _get_rejected(docs, future.result())
+            if fp is not None:
+                for line in rejected:
+                    fp.write(json.dumps(line).encode("utf-8") + b"\n")
+                fp.flush()
+
+            self._counters["docs"] += len(docs) - len(rejected)
+            self._counters["rejected"] += len(rejected)
+            self._counters["batches"] += 1
+            self._counters["bytes"] += size
+
+            state["done"].add(index)
+            while state["next"] in state["done"]:
+                state["done"].remove(state["next"])
+                state["next"] += 1
+
+        self._write_checkpoint(state)
+        if self.progress is not None:
+            self.progress(self.stats())
+
+        if errors and (error is not None):
+            raise error
+
+    def _read_checkpoint(self):
+        """Return the checkpoint state, ``next`` batch and ``done`` batches after it.
+
+        :rtype: dict
+        """
+        state = {"next": 0, "done": set()}
+        if (not self.checkpoint) or (not os.path.exists(self.checkpoint)):
+            return state
+
+        with open(self.checkpoint, encoding="utf-8") as fp:
+            saved = json.load(fp)
+        if (saved.get("batch_size"), saved.get("max_bytes")) != (
+            self.batch_size,
+            self.max_bytes,
+        ):
+            raise ValueError(
+                "The checkpoint was saved with another batch_size or max_bytes"
+            )
+
+        state["next"] = saved["next"]
+        state["done"] = set(saved["done"])
+        return state
+
+    def _send(self, docs):
+        """Send a batch, and return the result of every document.
+
+        :param list docs: The documents.
+        :rtype: list
+        """
+        kwargs = dict(self.kwargs)
+        # bulk_docs() adds the docs to the body, do not share it between threads
+        if isinstance(kwargs.get("json"), dict):
+            kwargs["json"] = dict(kwargs["json"])
+
+        try:
+            return self.db.bulk_docs(docs, **kwargs).json()
+        except exceptions.HTTPError as ex:
+            response = ex.args[1] if len(ex.args) > 1 else None
+            status = getattr(response, "status_code", None)
+            # The server did not take the batch (bad or too large), reject it.
+            # Any other error (auth, missing database, server) stops the load
+            if status not in (400, 413):
+                raise
+            message = ex.args[0] if isinstance(ex.args[0], dict) else {}
+            error = {"error": message.get("error"), "reason": message.get("reason")}
+            return [dict(error, id=doc.get("_id")) for doc in docs]
+
+    def _write_checkpoint(self, state):
+        """Save the checkpoint state, replacing the previous one at once.
+
+        :param dict state: The checkpoint state.
+        """
+        if not self.checkpoint:
+            return
+
+        saved = {
+            "next": state["next"],
+            "done": sorted(state["done"]),
+            "batch_size": self.batch_size,
+            "max_bytes": self.max_bytes,
+        }
+        tmp = f"{self.checkpoint}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(saved, fp)
+        os.replace(tmp, self.checkpoint)
+
+
+def iter_docs(source, fmt="auto", chunk_size=1024 * 1024):
+    """Yield the documents of an NDJSON or JSON array file, as they are read.
+
+    Example::
+
+        >>> next(iter_docs('docs.ndjson'))
+        {'_id': 'docid', 'title': 'Heroes'}
+
+    :param source: A file path (``.gz`` files are decompressed), or a binary
+        file-like object.
+    :param str fmt: (optional) ``"ndjson"``, ``"json"`` (an array of documents),
+        or ``"auto"`` to tell them apart by the first character.
+    :param int chunk_size: (optional) The number of bytes to read at a time.
+    :rtype: iterator
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+    if isinstance(source, (str, os.PathLike)):
+        opener = gzip.open if os.fspath(source).endswith(".gz") else open
+        with opener(source, "rb") as fp:
+            yield from iter_docs(fp, fmt, chunk_size)
+        return
+
+    chunks = utils.iter_chunks(source, chunk_size)
+    if fmt == "auto":
+        # Peek at the first chunk that is not blank
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if head.strip():
+                break
+        fmt = "json" if head.lstrip().startswith(b"[") else "ndjson"
+        chunks = itertools.chain([head], chunks)
+
+    if fmt == "json":
+        yield from utils.iter_array(chunks, name="documents")
+        return
+
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buf.strip():
+        yield json.loads(buf)
+
+
+def load(db, source, fmt="auto", **kwargs):
+    """Load the documents of an NDJSON or JSON array file into a database.
+
+    Example::
+
+        >>> load(db, 'docs.ndjson', concurrency=8, rejects='rejects.ndjson')
+        {'docs': 50000, 'rejected': 2, 'batches': 50, ..., 'docs_per_sec': 21034.2}
+
+    :param CouchDB db: The database to load into.
+    :param source: A file path, a binary file-like object, or an iterable of documents.
+    :param str fmt: (optional) The file format, see :func:`iter_docs`.
+    :param kwargs: (optional) Arguments that :class:`BulkLoader` takes.
+    :rtype: dict
+    """
+    return BulkLoader(db, **kwargs).run(source, fmt)
+
+
+def _get_rejected(docs, results):
+    """Return the rejected documents of a batch, with their errors.
+
+    :param list docs: The documents sent.
+    :param list results: The ``_bulk_docs`` results.
+    :rtype: list
+    """
+    if len(results) == len(docs):
+        pairs = zip(docs, results)
+    else:
+        # With new_edits=false, only the errors are listed
+        by_id = {r.get("id"): r for r in results}
+        pairs = ((doc, by_id.get(doc.get("_id"), {})) for doc in docs)
+
+    return [
+        {
+            "id": result.get("id"),
+            "error": result["error"],
+            "reason": result.get("reason"),
+            "doc": doc,
+        }
+        for doc, result in pairs
+        if "error" in result
+    ]
+
+
+def _open_rejects(rejects):
+    """Return a context manager of the file to append rejected documents to.
+
+    :param rejects: A file path, a binary file-like object (left open), or ``None``.
+    :rtype: contextlib.AbstractContextManager
+    """
+    if isinstance(rejects, (str, os.PathLike)):
+        return open(rejects, "ab")
+
+    return contextlib.nullcontext(rejects)
@@ -0,0 +1,188 @@
+"""Mango query objects that power time2relax."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FindPaginator:
+    """Page through the documents of a Mango query, following ``bookmark``s.
+
+    Every page is requested with the ``bookmark`` of the previous one, so only
+    a page (and the next, when it is prefetched) is held in memory at a time.
+
+    Example::
+
+        >>> pages = FindPaginator(db, {'year': {'$gt': 2010}}, page_size=500)
+        >>> for docs in pages:
+        ...     save(docs, pages.bookmark)
+        ...
+        >>> pages = FindPaginator(db, selector, page_size=500, bookmark=saved)
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        db,
+        selector,
+        page_size=1000,
+        prefetch=True,
+        bookmark=None,
+        limit=None,
+        skip=None,
+        **kwargs,
+    ):
+        """Initialize the paginator.
+
+        :param CouchDB db: The database to query.
+        :param dict selector: The query selector.
+        :param int page_size: (optional) The number of documents in a page.
+        :param bool prefetch: (optional) Fetch the next page while one is consumed.
+        :param str bookmark: (optional) A :attr:`bookmark` to resume from.
+        :param int limit: (optional) The maximum number of documents to return.
+        :param int skip: (optional) The number of documents to skip.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.find` takes.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+
+        self.db = db
+        self.selector = selector
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.kwargs = kwargs
+
+        self._limit = limit
+        self._skip = skip
+        self._start = bookmark
+
+        #: Resume from the next unread page, ``None`` when there are no more
+        self.bookmark = bookmark
+
+        #: The last ``warning`` of the server, e.g. that no index matches the query
+        self.warning = None
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def __iter__(self):
+        """Yield the pages, as lists of documents."""
+        remaining = self._limit
+        # A bookmark already skipped the documents
+        skip = None if self._start else self._skip
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._fetch, self._start, skip, remaining)
+            while future is not None:
+                docs, bookmark = future.result()
+                if remaining is not None:
+                    remaining -= len(docs)
+                    if remaining <= 0:
+                        bookmark = None
+
+                future = None
+                if (bookmark is not None) and self.prefetch:
+                    future = executor.submit(self._fetch, bookmark, None, remaining)
+                self.bookmark = bookmark
+
+                if docs:
+                    yield docs
+
+                if (bookmark is not None) and (future is None):
+                    future = executor.submit(self._fetch, bookmark, None, remaining)
+
+    def docs(self):
+        """Yield the documents of every page.
+
+        :rtype: iterator
+        """
+        for page in self:
+            yield from page
+
+    def _fetch(self, bookmark, skip, remaining):
+        """Return a page of documents, and the bookmark of the next page.
+
+        :param str bookmark: The bookmark of the page, or ``None``.
+        :param int skip: The number of documents to skip, or ``None``.
+        :param int remaining: The documents left to read, or ``None``.
+        :rtype: (list, str)
+        """
+        size = self.page_size if remaining is None else min(self.page_size, remaining)
+
+        r = self.db.find(
+            self.selector, limit=size, skip=skip, bookmark=bookmark, **self.kwargs
+        )
+        result = r.json()
+        if "warning" in result:
+            self.warning = result["warning"]
+
+        docs = result["docs"]
+        if len(docs) < size:
+            return docs, None
+
+        return docs, result.get("bookmark")
+
+
+class QueryPlan:
+    """The ``_explain`` plan of a Mango query, with the reasons it is slow.
+
+    Example::
+
+        >>> plan = db.query_plan({'year': {'$gt': 2010}})
+        >>> plan.full_scan
+        True
+        >>> plan.warnings
+        ['No usable index, the query scans every document']
+    """
+
+    def __init__(self, plan):
+        """Initialize the query plan.
+
+        :param dict plan: The ``_explain`` response.
+        """
+        #: The ``_explain`` response
+        self.plan = plan
+
+        #: The index the query would use
+        self.index = plan.get("index") or {}
+
+        #: The reasons the query is slow, empty if it uses a matching index
+        self.warnings = self._get_warnings()
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.index.get('name')}]>"
+
+    @property
+    def full_scan(self):
+        """Return ``True`` if no index matches, and every document is scanned.
+
+        :rtype: bool
+        """
+        # The "special" index is _all_docs
+        return self.index.get("type") == "special"
+
+    def _get_warnings(self):
+        """Return the reasons the query is slow.
+
+        :rtype: list
+        """
+        warnings = []
+        if self.full_scan:
+            warnings.append("No usable index, the query scans every document")
+
+        use_index = (self.plan.get("opts") or {}).get("use_index")
+        if use_index:
+            if isinstance(use_index, str):
+                use_index = [use_index]
+            ddoc = use_index[0]
+            if not ddoc.startswith("_design/"):
+                ddoc = f"_design/{ddoc}"
+            name = use_index[1] if len(use_index) > 1 else None
+
+            used = (self.index.get("ddoc") == ddoc) and (
+                (name is None) or (self.index.get("name") == name)
+            )
+            if not used:
+                warnings.append(f"The index {'/'.join(use_index)} is not used")
+
+        return warnings
@@ -0,0 +1,348 @@
+"""Instrumentation objects that power time2relax."""
+
+import bisect
+import threading
+import time
+
+# Seconds, the Prometheus client defaults
+BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+HOOKS = ("before_send", "after_receive")
+
+# Path segments that are followed by a name
+_NAMED = {
+    "_design": "{ddoc}",
+    "_local": "{docid}",
+    "_list": "{func}",
+    "_show": "{func}",
+    "_update": "{func}",
+    "_view": "{func}",
+}
+
+
+class RequestEvent:
+    """What is known about a request, when a hook is called.
+
+    ``timings`` has the seconds spent in each phase: ``probe`` (checking that
+    the database exists), ``encode`` (the JSON body), ``prepare`` (the URL and
+    parameters) and ``network`` (sending the request and reading the response).
+    """
+
+    __slots__ = (
+        "method",
+        "path",
+        "status",
+        "bytes_out",
+        "bytes_in",
+        "retries",
+        "timings",
+        "error",
+        "start",
+        "elapsed",
+    )
+
+    def __init__(self, method, path):
+        """Initialize the event.
+
+        :param str method: The request method.
+        :param str path: The request path template, e.g. ``{docid}``.
+        """
+        self.method = method
+        self.path = path
+        self.status = None
+        self.bytes_out = None
+        self.bytes_in = None
+        self.retries = 0
+        self.timings = {}
+        self.error = None
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.method} {self.path} {self.status}]>"
+
+    def add_timing(self, phase, seconds):
+        """Add the seconds spent in a phase.
+
+        :param str phase: The phase name.
+        :param float seconds: The seconds spent.
+        """
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def record(self, response, kwargs):
+        """Record the status and sizes of a response.
+
+        :param response: The response object.
+        :param dict kwargs: The request arguments.
+        """
+        self.status = response.status_code
+
+        body = getattr(getattr(response, "request", None), "body", None)
+        if isinstance(body, (bytes, str)):
+            self.bytes_out = len(body)
+
+        if kwargs.get("stream"):
+            length = response.headers.get("Content-Length")
+            self.bytes_in = int(length) if length else None
+        else:
+            self.bytes_in = len(response.content)
+
+
+class Histogram:
+    """A fixed-bucket histogram, with estimated quantiles."""
+
+    def __init__(self, buckets=BUCKETS):
+        """Initialize the histogram.
+
+        :param tuple buckets: (optional) The sorted bucket upper bounds.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.count}]>"
+
+    def observe(self, value):
+        """Add a value.
+
+        :param float value: The value to add.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Return an estimate of a quantile, interpolated in its bucket.
+
+        Example::
+
+            >>> h = Histogram((1, 2))
+            >>> for value in (0.5, 1.5, 1.5, 1.5):
+            ...     h.observe(value)
+            >>> h.quantile(0.5)
+            1.3333333333333333
+
+        :param float q: The quantile, between 0 and 1.
+        :rtype: float
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    # Beyond the last bucket, the largest bound is the estimate
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+
+        return self.buckets[-1]  # pragma: no cover
+
+
+class MetricsCollector:
+    """Per-endpoint latency histograms and throughput counters.
+
+    Register the collector as an ``after_receive`` hook; requests are grouped
+    by method and path template.
+
+    Example::
+
+        >>> collector = MetricsCollector()
+        >>> db = CouchDB('http://localhost:5984/testdb', hooks={'after_receive': [collector]})
+        >>> db.get('docid')
+        <Response [200]>
+        >>> collector.to_dict()['GET {docid}']['p50']
+        0.0042
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """Initialize the collector.
+
+        :param tuple buckets: (optional) The latency bucket upper bounds, in seconds.
+        """
+        self.buckets = buckets
+        self.start = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{len(self._endpoints)}]>"
+
+    def __call__(self, event):
+        """Record a request.
+
+        :param RequestEvent event: The request event.
+        """
+        key = (event.method, event.path)
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = {
+                    "latency": Histogram(self.buckets),
+                    "statuses": {},
+                    "errors": 0,
+                    "retries": 0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                }
+            endpoint["latency"].observe(event.elapsed or 0.0)
+            status = str(event.status) if event.status else "error"
+            endpoint["statuses"][status] = endpoint["statuses"].get(status, 0) + 1
+            endpoint["errors"] += event.status is None
+            endpoint["retries"] += event.retries
+            endpoint["bytes_in"] += event.bytes_in or 0
+            endpoint["bytes_out"] += event.bytes_out or 0
+
+    def reset(self):
+        """Remove every recorded request."""
+        with self._lock:
+            self._endpoints.clear()
+            self.start = time.monotonic()
+
+    def to_dict(self):
+        """Return the metrics of every endpoint.
+
+        :rtype: dict
+        """
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        metrics = {}
+
+        with self._lock:
+            for (method, path), endpoint in sorted(self._endpoints.items()):
+                latency = endpoint["latency"]
+                metrics[f"{method} {path}"] = {
+                    "count": latency.count,
+                    "rate": latency.count / elapsed,
+                    "mean": latency.sum / latency.count,
+                    "p50": latency.quantile(0.5),
+                    "p95": latency.quantile(0.95),
+                    "p99": latency.quantile(0.99),
+                    "statuses": dict(endpoint["statuses"]),
+                    "errors": endpoint["errors"],
+                    "retries": endpoint["retries"],
+                    "bytes_in": endpoint["bytes_in"],
+                    "bytes_out": endpoint["bytes_out"],
+                }
+
+        return metrics
+
+    def to_prometheus(self, prefix="time2relax"):
+        """Return the metrics in the Prometheus text format.
+
+        :param str prefix: (optional) The metric name prefix.
+        :rtype: str
+        """
+        # Every metric is a TYPE line, followed by all of its samples
+        with self._lock:
+            endpoints = [
+                (f'method="{method}",path="{_escape(path)}"', endpoint)
+                for (method, path), endpoint in sorted(self._endpoints.items())
+            ]
+
+            name = f"{prefix}_request_duration_seconds"
+            lines = [f"# TYPE {name} histogram"]
+            for labels, endpoint in endpoints:
+                latency = endpoint["latency"]
+                cumulative = 0
+                for bound, count in zip(latency.buckets + ("+Inf",), latency.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {latency.sum}")
+                lines.append(f"{name}_count{{{labels}}} {latency.count}")
+
+            name = f"{prefix}_requests_total"
+            lines.append(f"# TYPE {name} counter")
+            for labels, endpoint in endpoints:
+                for status, count in sorted(endpoint["statuses"].items()):
+                    lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+
+            for suffix, key in (
+                ("request_retries_total", "retries"),
+                ("request_bytes_total", "bytes_out"),
+                ("response_bytes_total", "bytes_in"),
+            ):
+                name = f"{prefix}_{suffix}"
+                lines.append(f"# TYPE {name} counter")
+                for labels, endpoint in endpoints:
+                    lines.append(f"{name}{{{labels}}} {endpoint[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+def dispatch_hook(hooks, name, event):
+    """Call the hooks registered under a name with an event.
+
+    :param dict hooks: The hooks, e.g. ``{'after_receive': [func]}``.
+    :param str name: ``before_send`` or ``after_receive``.
+    :param RequestEvent event: The request event.
+    """
+    for hook in hooks.get(name) or ():
+        hook(event)
+
+
+def path_template(path):
+    """Return a request path, with the names of documents (and functions) replaced.
+
+    Example::
+
+        >>> path_template('_design/app/_view/by_date')
+        '_design/{ddoc}/_view/{func}'
+        >>> path_template('docid/photo.jpg')
+        '{docid}/{attname}'
+
+    :param str path: The request path.
+    :rtype: str
+    """
+    if "://" in path:
+        # Absolute URLs, e.g. the server '_replicate'
+        path = path.split("://", 1)[1].partition("/")[2]
+    if not path:
+        return "/"
+
+    template = []
+    name = None
+    for part in path.split("/"):
+        if name is not None:
+            template.append(name)
+            name = None
+        elif part in _NAMED:
+            template.append(part)
+            name = _NAMED[part]
+        elif part.startswith("_"):
+            template.append(part)
+        else:
+            # A document, or the attachment of a document
+            doc = any(t in ("{docid}", "{ddoc}") for t in template)
+            template.append("{attname}" if doc else "{docid}")
+            if doc:
+                break
+
+    return "/".join(template)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
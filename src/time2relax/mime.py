@@ -0,0 +1,225 @@
+"""MIME multipart methods that power time2relax."""
+
+import json
+import uuid
+from email.message import Message
+
+from time2relax import utils
+
+
+class RelatedBody:
+    """A ``multipart/related`` body of a document and its attachments.
+
+    The body has a known length, so it is sent with a ``Content-Length``, but
+    the attachments are read a chunk at a time as it is sent.
+    """
+
+    def __init__(self, doc, attachments, chunk_size=1024 * 1024):
+        """Initialize the body.
+
+        :param dict doc: The document.
+        :param dict attachments: The ``{name: (content_type, data)}`` to attach,
+            where data is anything :func:`utils.iter_chunks` takes.
+        :param int chunk_size: (optional) The number of bytes to send at a time.
+        """
+        #: The multipart boundary
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+
+        doc = dict(doc)
+        stubs = dict(doc.get("_attachments") or {})
+        sizes = {}
+        for name, (att_type, data) in attachments.items():
+            size = utils.get_size(data)
+            if size is None:
+                # The length of every attachment has to be known up front
+                data = b"".join(utils.iter_chunks(data, chunk_size))
+                size = len(data)
+            sizes[name] = (att_type, data, size)
+            stubs[name] = {"follows": True, "content_type": att_type, "length": size}
+        doc["_attachments"] = stubs
+
+        # The attachments follow in the order of the document
+        self._parts = [
+            (
+                b"Content-Type: application/json\r\n\r\n",
+                json.dumps(doc).encode("utf-8"),
+                None,
+            )
+        ]
+        for name, stub in stubs.items():
+            if name not in sizes:
+                continue
+            att_type, data, size = sizes[name]
+            headers = (
+                f"Content-Type: {att_type}\r\n"
+                f'Content-Disposition: attachment; filename="{name}"\r\n\r\n'
+            )
+            self._parts.append((headers.encode("utf-8"), data, size))
+
+    @property
+    def content_type(self):
+        """Return the ``Content-Type`` header value of the body."""
+        return f'multipart/related; boundary="{self.boundary}"'
+
+    def __len__(self):
+        """Return the length of the body in bytes."""
+        delimiter = len(self.boundary) + 6  # "--" + boundary + CRLF, and a CRLF
+        length = len(self.boundary) + 4  # "--" + boundary + "--"
+        for headers, data, size in self._parts:
+            length += delimiter + len(headers) + (len(data) if size is None else size)
+        return length
+
+    def __iter__(self):
+        """Yield the body, a chunk at a time."""
+        boundary = self.boundary.encode("latin-1")
+        for headers, data, size in self._parts:
+            yield b"--" + boundary + b"\r\n" + headers
+            if size is None:
+                yield data
+            else:
+                yield from utils.iter_chunks(data, self.chunk_size)
+            yield b"\r\n"
+        yield b"--" + boundary + b"--"
+
+
+def get_boundary(content_type):
+    """Return the boundary of a multipart content type.
+
+    Example::
+
+        >>> get_boundary('multipart/mixed; boundary="abc123"')
+        'abc123'
+
+    :param str content_type: The ``Content-Type`` header value.
+    :rtype: str
+    """
+    message = Message()
+    message["Content-Type"] = content_type
+
+    boundary = message.get_param("boundary")
+    if not boundary:
+        raise ValueError(f"No multipart boundary in {content_type!r}")
+
+    return boundary
+
+
+def iter_parts(chunks, boundary):
+    """Yield the ``(headers, body)`` of every part of a multipart body, as read.
+
+    Only the unparsed part of the body is buffered, so memory is bounded by the
+    largest part rather than by the size of the body.
+
+    :param chunks: The body, as an iterable of bytes.
+    :param str boundary: The multipart boundary.
+    :rtype: iterator
+    """
+    # A leading CRLF makes the first delimiter look like the others
+    delimiter = b"\r\n--" + boundary.encode("latin-1")
+    buf = bytearray(b"\r\n")
+    chunks = iter(chunks)
+    in_part = False
+    searched = 0
+
+    while True:
+        idx = buf.find(delimiter, searched)
+        if idx == -1:
+            # The delimiter may straddle two chunks
+            searched = max(len(buf) - len(delimiter) + 1, 0)
+            _read(chunks, buf)
+            continue
+
+        if in_part:
+            yield _parse_part(bytes(buf[:idx]))
+        del buf[: idx + len(delimiter)]
+        searched = 0
+
+        # "--" closes the body, otherwise the part headers start after a CRLF
+        while len(buf) < 2 or (b"\r\n" not in buf and not buf.startswith(b"--")):
+            _read(chunks, buf)
+        if buf.startswith(b"--"):
+            return
+        del buf[: buf.index(b"\r\n") + 2]
+        in_part = True
+
+
+def parse_related(body, content_type):
+    """Return the document of a ``multipart/related`` body, with its attachments.
+
+    The attachments that follow the document get their raw bytes as ``data``.
+
+    :param body: The ``multipart/related`` body, as bytes or an iterable of bytes.
+    :param str content_type: The ``Content-Type`` header value.
+    :rtype: dict
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = [body]
+    parts = iter_parts(body, get_boundary(content_type))
+
+    try:
+        _, doc_body = next(parts)
+    except StopIteration:
+        raise ValueError("Empty multipart/related body") from None
+    doc = json.loads(doc_body)
+
+    attachments = doc.setdefault("_attachments", {})
+    # Attachments without a filename follow in the order of the document
+    following = iter([k for k, v in attachments.items() if v.get("follows")])
+    for headers, data in parts:
+        name = _get_filename(headers.get("content-disposition")) or next(
+            following, None
+        )
+        if name is None:
+            raise ValueError("An attachment in the multipart/related body has no name")
+        attachment = attachments.setdefault(name, {})
+        attachment.pop("follows", None)
+        attachment["data"] = data
+
+    return doc
+
+
+def _get_filename(disposition):
+    """Return the filename of a ``Content-Disposition`` header value, or ``None``.
+
+    :param str disposition: The ``Content-Disposition`` header value.
+    :rtype: str
+    """
+    if not disposition:
+        return None
+
+    message = Message()
+    message["Content-Disposition"] = disposition
+    return message.get_param("filename", header="content-disposition")
+
+
+def _parse_part(raw):
+    """Return the ``(headers, body)`` of a raw part.
+
+    :param bytes raw: The part, headers included.
+    :rtype: (dict, bytes)
+    """
+    if raw.startswith(b"\r\n"):
+        # A part without headers
+        head, body = b"", raw[2:]
+    else:
+        head, _, body = raw.partition(b"\r\n\r\n")
+
+    headers = {}
+    for line in head.decode("latin-1").split("\r\n"):
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+
+    return headers, body
+
+
+def _read(chunks, buf):
+    """Read the next chunk into a buffer.
+
+    :param iterator chunks: The body, as an iterator of bytes.
+    :param bytearray buf: The buffer.
+    """
+    chunk = next(chunks, None)
+    if chunk is None:
+        raise ValueError("Unexpected end of the multipart body")
+    buf += chunk
@@ -1,35 +1,102 @@
 """Primary objects that power time2relax."""
 
+import json
+import os
+import threading
+import time
 from posixpath import join as urljoin
 
-from requests import Request, Session
+from requests import Request
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
+
+from time2relax import (
+    adapters,
+    bulk,
+    conflicts,
+    exceptions,
+    feeds,
+    mango,
+    metrics,
+    mime,
+    pagination,
+    time2relax,
+    utils,
+)
+from time2relax.codec import get_codec
+from time2relax.compression import GzipCompressor
+from time2relax.results import Results
+
+
+class DatabaseRegistry:
+    """A thread-safe set of database URLs that are known to exist."""
+
+    def __init__(self):
+        """Initialize the registry."""
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._urls = set()
 
-from time2relax import exceptions, time2relax, utils
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{len(self._urls)}]>"
 
+    def __contains__(self, url):
+        """Return ``url in self``."""
+        return url in self._urls
 
-class CouchDB:
-    """Representation of a CouchDB database.
+    def add(self, url):
+        """Record that a database exists.
 
-    Provides URL-parameter encoding, modeled Exceptions, and database initialization.
+        :param str url: The Database URL.
+        """
+        with self._lock:
+            self._urls.add(url)
 
-    Example::
+    def discard(self, url):
+        """Forget a database, e.g. when it is deleted.
 
-        >>> import time2relax
-        >>> db = time2relax.CouchDB('http://localhost:5984/testdb')
-        >>> db.insert({'title': 'Ziggy Stardust'})
-        <Response [201]>
-    """
+        :param str url: The Database URL.
+        """
+        with self._lock:
+            self._urls.discard(url)
+
+    def clear(self):
+        """Forget every database."""
+        with self._lock:
+            self._urls.clear()
 
-    _created = False
+    def lock(self, url):
+        """Return the lock that serializes the checks of a database.
 
-    def __init__(self, url, create_db=True):
+        :param str url: The Database URL.
+        :rtype: threading.Lock
+        """
+        with self._lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+
+#: Databases that exist, shared by every :class:`CouchDB` object in the process
+DATABASES = DatabaseRegistry()
+
+
+class BaseCouchDB:
+    """Transport-agnostic representation of a CouchDB database.
+
+    Subclasses provide :meth:`request`, which sends the ``(method, path, kwargs)``
+    tuples built by :mod:`time2relax.time2relax`.
+    """
+
+    def __init__(self, url, create_db=True, _validate=True):
         """Initialize the database object.
 
         :param str url: The Database URL.
-        :param bool create_db: (optional) Create the database.
+        :param create_db: (optional) Create the database, ``True`` to check
+            once per process, or ``"lazy"`` to wait for a request to find it missing.
+        :param bool _validate: (internal)
         """
         # Raise exception on an invalid URL
-        Request("HEAD", url).prepare()
+        if _validate:
+            Request("HEAD", url).prepare()
 
         #: Database host
         self.host = utils.get_database_host(url)
@@ -41,14 +108,12 @@ class CouchDB:
         # FIXME: Converts "test.db/a/b/index.html?e=f" to "test.db/index.html"
         self.url = urljoin(self.host, self.name)
 
+        #: Database URL with a trailing slash, to append request paths to
+        self.base_url = f"{self.url.rstrip('/')}/"
+
         #: Database initialization
         self.create_db = create_db
 
-        #: Default :class:`requests.Session`
-        self.session = Session()
-        # http://docs.couchdb.org/en/stable/api/basics.html#request-headers
-        self.session.headers["Accept"] = "application/json"
-
     def __repr__(self):
         """Return repr(self)."""
         return f"<{self.__class__.__name__} [{self.url}]>"
@@ -65,6 +130,10 @@ class CouchDB:
     def compact(self, **kwargs):
         """Trigger a compaction operation."""
 
+    @utils.relax(time2relax.create_index)
+    def create_index(self, fields, ddoc=None, name=None, index_type="json", **kwargs):
+        """Create a Mango index."""
+
     @utils.relax(time2relax.ddoc_list)
     def ddoc_list(self, ddoc_id, func_id, view_id, other_id=None, **kwargs):
         """Apply a list function against a view."""
@@ -77,12 +146,45 @@ class CouchDB:
     def ddoc_view(self, ddoc_id, func_id, **kwargs):
         """Execute a view function."""
 
+    @utils.relax(time2relax.delete_index)
+    def delete_index(self, ddoc, name, index_type="json", **kwargs):
+        """Delete a Mango index."""
+
     @utils.relax(time2relax.destroy)
     def destroy(self, **kwargs):
         """Delete the database."""
         m, p, k = time2relax.destroy(**kwargs)
         return self.request(m, p, _init=False, **k)
 
+    @utils.relax(time2relax.explain)
+    # pylint: disable=too-many-arguments
+    def explain(
+        self,
+        selector,
+        fields=None,
+        sort=None,
+        limit=None,
+        skip=None,
+        use_index=None,
+        **kwargs,
+    ):
+        """Return the index (and options) a Mango query would use."""
+
+    @utils.relax(time2relax.find)
+    # pylint: disable=too-many-arguments
+    def find(
+        self,
+        selector,
+        fields=None,
+        sort=None,
+        limit=None,
+        skip=None,
+        use_index=None,
+        bookmark=None,
+        **kwargs,
+    ):
+        """Find documents with a Mango query."""
+
     @utils.relax(time2relax.get)
     def get(self, doc_id, **kwargs):
         """Retrieve a document."""
@@ -91,6 +193,10 @@ class CouchDB:
     def get_att(self, doc_id, att_id, **kwargs):
         """Retrieve an attachment."""
 
+    @utils.relax(time2relax.get_related)
+    def get_related(self, doc_id, **kwargs):
+        """Retrieve a document with its attachments, as ``multipart/related``."""
+
     @utils.relax(time2relax.info)
     def info(self, **kwargs):
         """Get information about the database."""
@@ -104,6 +210,14 @@ class CouchDB:
     def insert_att(self, doc_id, doc_rev, att_id, att, att_type, **kwargs):
         """Create or update an existing attachment."""
 
+    @utils.relax(time2relax.insert_related)
+    def insert_related(self, doc, attachments, **kwargs):
+        """Create or update a document with its attachments, in a single request."""
+
+    @utils.relax(time2relax.list_indexes)
+    def list_indexes(self, **kwargs):
+        """List the Mango indexes of the database."""
+
     @utils.relax(time2relax.remove)
     def remove(self, doc_id, doc_rev, **kwargs):
         """Delete a document."""
@@ -117,14 +231,702 @@ class CouchDB:
         m, p, k = time2relax.replicate_to(self.url, target, **kwargs)
         return self.request(m, p, _init=False, **k)
 
+    def request(self, method, path, _init=True, **kwargs):
+        """Send a request to the database."""
+        raise NotImplementedError
+
+    def _must_check(self):
+        """Return ``True`` if the database must be checked before a request.
+
+        :rtype: bool
+        """
+        return (self.create_db is True) and (self.url not in DATABASES)
+
+    def _must_create(self, method, path, kwargs, ex):
+        """Return ``True`` if a request found the database missing, and can be replayed.
+
+        :param str method: The request method.
+        :param str path: The request path.
+        :param dict kwargs: The request arguments.
+        :param exceptions.ResourceNotFound ex: The HTTP error.
+        :rtype: bool
+        """
+        # A missing database is not created to be deleted
+        if (self.create_db != "lazy") or ((method == "DELETE") and (not path)):
+            return False
+
+        return utils.is_missing_database(ex) and utils.is_replayable(kwargs)
+
+
+class CouchDB(BaseCouchDB):
+    """Representation of a CouchDB database.
+
+    Provides URL-parameter encoding, modeled Exceptions, and database initialization.
+
+    Example::
+
+        >>> import time2relax
+        >>> db = time2relax.CouchDB('http://localhost:5984/testdb')
+        >>> db.insert({'title': 'Ziggy Stardust'})
+        <Response [201]>
+    """
+
+    _has_bulk_get = None
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        url,
+        create_db=True,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        keep_alive=True,
+        prewarm=0,
+        cache=None,
+        retry=None,
+        codec=None,
+        hooks=None,
+        compression=None,
+        server=None,
+    ):
+        """Initialize the database object.
+
+        :param str url: The Database URL.
+        :param bool create_db: (optional) Create the database.
+        :param int pool_connections: (optional) The number of host pools to cache.
+        :param int pool_maxsize: (optional) The connections to keep in each pool.
+        :param bool pool_block: (optional) Wait for a free connection when exhausted.
+        :param bool keep_alive: (optional) Reuse connections between requests.
+        :param int prewarm: (optional) The connections to open ahead of time.
+        :param cache.DocumentCache cache: (optional) A cache for :meth:`get`.
+        :param retry.RetryPolicy retry: (optional) Retry requests that fail.
+        :param codec: (optional) The JSON codec of request and response bodies,
+            ``"json"``, ``"orjson"``, or any object with ``dumps`` and ``loads``.
+        :param dict hooks: (optional) Functions called with a :class:`metrics.RequestEvent`,
+            e.g. ``{'before_send': [func], 'after_receive': [func]}``.
+        :param compression: (optional) A :class:`compression.GzipCompressor` of
+            request bodies, or ``True`` for the default one.
+        :param server.CouchServer server: (optional) The server to share the session
+            (and pool), retry policy, codec, hooks and compression of,
+            see :meth:`CouchServer.db`.
+        """
+        # The server validated its URL, and encoded the name
+        super().__init__(url, create_db, _validate=server is None)
+
+        #: Document cache
+        self.cache = cache
+
+        #: Methods that return decoded result objects
+        self.results = Results(self)
+
+        if server is None:
+            session, adapter = adapters.make_session(
+                pool_connections, pool_maxsize, pool_block, keep_alive
+            )
+            hooks = {name: list((hooks or {}).get(name, [])) for name in metrics.HOOKS}
+        else:
+            session, adapter = server.session, server.adapter
+            retry = retry or server.retry
+            codec = codec or server.codec
+            compression = compression or server.compression
+            # Share the hooks of the server, so they are not copied per database
+            if hooks is None:
+                hooks = server.hooks
+            else:
+                hooks = {name: list(hooks.get(name, [])) for name in metrics.HOOKS}
+
+        #: Retry policy
+        self.retry = retry
+
+        #: JSON codec
+        self.codec = get_codec(codec)
+
+        #: Request hooks
+        self.hooks = hooks
+
+        #: Request body compression
+        self.compression = GzipCompressor() if compression is True else compression
+
+        #: Default :class:`requests.Session`
+        self.session = session
+
+        #: Default :class:`adapters.PoolAdapter`
+        self.adapter = adapter
+
+        if prewarm and (server is None):
+            # The pool is keyed on the (environment) TLS settings requests will use
+            settings = self.session.merge_environment_settings(
+                self.url, {}, None, None, None
+            )
+            self.adapter.prewarm(self.url, prewarm, verify=settings["verify"])
+
+    # pylint: disable=too-many-arguments
+    def bulk_get(
+        self,
+        docs,
+        multipart=False,
+        fallback=True,
+        concurrency=4,
+        chunk_size=65536,
+        **kwargs,
+    ):
+        """Fetch multiple documents (and revisions), and yield the results as read.
+
+        Every result is a ``{'id': ..., 'docs': [{'ok': doc} | {'error': error}]}``.
+        With ``multipart``, the response is ``multipart/mixed``, so attachments
+        (``params={'attachments': True}``) are raw bytes instead of base64. If
+        the server has no ``_bulk_get``, the documents are fetched with
+        ``concurrency`` :meth:`get` requests.
+
+        :param list docs: The sequence of ``{'id': ..., 'rev': ...}`` to fetch.
+        :param bool multipart: (optional) Ask for a ``multipart/mixed`` response.
+        :param bool fallback: (optional) Use :meth:`get` without ``_bulk_get``.
+        :param int concurrency: (optional) The number of fallback requests in flight.
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: iterator
+        """
+        if self._has_bulk_get is False:
+            yield from self._bulk_get_fallback(docs, concurrency, **kwargs)
+            return
+
+        m, p, k = time2relax.bulk_get(docs, **kwargs)
+        k["stream"] = True
+        if multipart:
+            k["headers"] = dict(k.get("headers") or {}, Accept="multipart/mixed")
+
+        try:
+            r = self.request(m, p, **k)
+        except (
+            exceptions.BadRequest,
+            exceptions.MethodNotAllowed,
+            exceptions.ResourceNotFound,
+        ) as ex:
+            # CouchDB < 2.0 has no _bulk_get
+            if not fallback or not utils.is_missing_endpoint(ex):
+                raise
+            # A 400 or 404 may come from a proxy in front, so ask again next time
+            if isinstance(ex, exceptions.MethodNotAllowed):
+                self._has_bulk_get = False
+            yield from self._bulk_get_fallback(docs, concurrency, **kwargs)
+            return
+        self._has_bulk_get = True
+
+        try:
+            content_type = r.headers.get("Content-Type", "")
+            if not content_type.startswith("multipart/"):
+                yield from utils.iter_rows(r, chunk_size, name="results")
+                return
+
+            chunks = r.iter_content(chunk_size)
+            boundary = mime.get_boundary(content_type)
+            for headers, body in mime.iter_parts(chunks, boundary):
+                part_type = headers.get("content-type", "")
+                if part_type.startswith("multipart/related"):
+                    doc = mime.parse_related(body, part_type)
+                    yield {"id": doc["_id"], "docs": [{"ok": doc}]}
+                    continue
+                doc = (self.codec or json).loads(body)
+                if "error" in doc:
+                    yield {"id": doc.get("id"), "docs": [{"error": doc}]}
+                else:
+                    yield {"id": doc["_id"], "docs": [{"ok": doc}]}
+        finally:
+            r.close()
+
+    def bulk_writer(self, **kwargs):
+        """Return a :class:`bulk.BulkWriter` that batches writes to the database.
+
+        :param kwargs: (optional) Arguments that :class:`bulk.BulkWriter` takes.
+        :rtype: bulk.BulkWriter
+        """
+        return bulk.BulkWriter(self, **kwargs)
+
+    def changes(self, **kwargs):
+        """Return a :class:`feeds.ChangesFeed` that follows the database changes.
+
+        :param kwargs: (optional) Arguments that :class:`feeds.ChangesFeed` takes.
+        :rtype: feeds.ChangesFeed
+        """
+        return feeds.ChangesFeed(self, **kwargs)
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def download_att(
+        self,
+        doc_id,
+        att_id,
+        dest,
+        chunk_size=1024 * 1024,
+        byte_range=None,
+        segments=1,
+        progress=None,
+        **kwargs,
+    ):
+        """Retrieve an attachment into a file, a chunk at a time.
+
+        :param str doc_id: The attachment document.
+        :param str att_id: The attachment to retrieve.
+        :param dest: The file path, or writable file-like object, to write to.
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param tuple byte_range: (optional) The ``(first, last)`` bytes to retrieve.
+        :param int segments: (optional) The number of ranges to retrieve in parallel,
+            into a file path.
+        :param function progress: (optional) Called with ``(done, total, elapsed)``.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :return: The number of bytes written.
+        :rtype: int
+        """
+        m, p, k = time2relax.get_att(doc_id, att_id, **kwargs)
+        headers = dict(k.pop("headers", None) or {})
+
+        size = None
+        if (
+            (segments > 1)
+            and (byte_range is None)
+            and isinstance(dest, (str, os.PathLike))
+        ):
+            # The server must support ranges of the (uncompressed) attachment
+            h = dict(headers, **{"Accept-Encoding": "identity"})
+            r = self.request("HEAD", p, headers=h, **k)
+            if (r.headers.get("Accept-Ranges") == "bytes") and (
+                "Content-Length" in r.headers
+            ):
+                size = int(r.headers["Content-Length"])
+
+        if not size:
+            if byte_range is not None:
+                headers["Accept-Encoding"] = "identity"
+                headers["Range"] = "bytes={}-{}".format(*byte_range)
+            r = self.request(m, p, headers=headers, stream=True, **k)
+            total = r.headers.get("Content-Length")
+            total = int(total) if total else None
+            try:
+                # A 200 is the whole attachment, not the range asked for
+                if (byte_range is not None) and (r.status_code != 206):
+                    raise exceptions.HTTPError("Range request not satisfied", r)
+                with utils.open_writable(dest) as fp:
+                    return _write_chunks(
+                        fp, r.iter_content(chunk_size), progress, total
+                    )
+            finally:
+                r.close()
+
+        with open(dest, "wb") as fp:
+            fp.truncate(size)
+
+        step = -(-size // segments)
+        ranges = [(i, min(i + step, size) - 1) for i in range(0, size, step)]
+        lock = threading.Lock()
+        done = [0, time.monotonic()]
+
+        def report(n):
+            if progress is not None:
+                with lock:
+                    done[0] += n
+                    progress(done[0], size, time.monotonic() - done[1])
+
+        def fetch(byte_range):
+            h = dict(headers, **{"Accept-Encoding": "identity"})
+            h["Range"] = "bytes={}-{}".format(*byte_range)
+            r = self.request(m, p, headers=h, stream=True, **k)
+            try:
+                if r.status_code != 206:
+                    raise exceptions.HTTPError("Range request not satisfied", r)
+                with open(dest, "r+b") as fp:
+                    fp.seek(byte_range[0])
+                    for chunk in r.iter_content(chunk_size):
+                        fp.write(chunk)
+                        report(len(chunk))
+            finally:
+                r.close()
+
+        for _ in utils.imap_concurrent(fetch, ranges, segments):
+            pass
+
+        return size
+
+    def get(self, doc_id, **kwargs):
+        """Retrieve a document, from the :attr:`cache` if it has not been modified."""
+        # Only plain reads are cached, options like 'rev' change the body
+        if (self.cache is None) or kwargs:
+            return super().get(doc_id, **kwargs)
+
+        key = (self.url, utils.encode_document_id(doc_id))
+        entry = self.cache.lookup(key)
+        if entry is None:
+            r = super().get(doc_id)
+            self.cache.store(key, r)
+            return r
+
+        response, etag, fresh = entry
+        if fresh:
+            return response
+
+        r = super().get(doc_id, headers={"If-None-Match": etag})
+        if r.status_code == 304:
+            self.cache.revalidated(key, response, etag)
+            return response
+
+        self.cache.store(key, r)
+        return r
+
+    def get_many(self, ids, chunk_size=1000, concurrency=4, **kwargs):
+        """Retrieve many documents, and yield their rows in the order of ``ids``.
+
+        The ids are fetched in ``_all_docs?include_docs=true`` chunks, with
+        ``concurrency`` requests in flight. Missing documents have an
+        ``error`` row, and deleted ones a ``value.deleted`` row.
+
+        :param ids: The documents to retrieve.
+        :param int chunk_size: (optional) The number of ids in a request.
+        :param int concurrency: (optional) The number of requests in flight.
+        :param kwargs: (optional) Arguments that :meth:`all_docs` takes.
+        :rtype: iterator
+        """
+        params = dict(kwargs.pop("params", None) or {})
+        params["include_docs"] = True
+
+        def fetch(keys):
+            r = self.all_docs(params=dict(params, keys=keys), **kwargs)
+            return r.json()["rows"]
+
+        for rows in utils.imap_concurrent(
+            fetch, utils.chunked(ids, chunk_size), concurrency
+        ):
+            yield from rows
+
+    def iter_all_docs(self, chunk_size=65536, **kwargs):
+        """Fetch multiple documents, and yield the rows as they are read.
+
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param kwargs: (optional) Arguments that :meth:`all_docs` takes.
+        :rtype: iterator
+        """
+        m, p, k = time2relax.all_docs(**kwargs)
+        yield from self._iter_rows(m, p, chunk_size, **k)
+
+    def iter_view(self, ddoc_id, func_id, chunk_size=65536, **kwargs):
+        """Execute a view function, and yield the rows as they are read.
+
+        :param str ddoc_id: The design document name.
+        :param str func_id: The view function name.
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param kwargs: (optional) Arguments that :meth:`ddoc_view` takes.
+        :rtype: iterator
+        """
+        m, p, k = time2relax.ddoc_view(ddoc_id, func_id, **kwargs)
+        yield from self._iter_rows(m, p, chunk_size, **k)
+
+    def paginate_all_docs(self, **kwargs):
+        """Return a :class:`pagination.Paginator` over multiple documents.
+
+        :param kwargs: (optional) Arguments that :class:`pagination.Paginator` takes.
+        :rtype: pagination.Paginator
+        """
+        return pagination.Paginator(self, **kwargs)
+
+    def paginate_find(self, selector, **kwargs):
+        """Return a :class:`mango.FindPaginator` over a Mango query.
+
+        :param dict selector: The query selector.
+        :param kwargs: (optional) Arguments that :class:`mango.FindPaginator` takes.
+        :rtype: mango.FindPaginator
+        """
+        return mango.FindPaginator(self, selector, **kwargs)
+
+    def paginate_view(self, ddoc_id, func_id, **kwargs):
+        """Return a :class:`pagination.Paginator` over a view function.
+
+        :param str ddoc_id: The design document name.
+        :param str func_id: The view function name.
+        :param kwargs: (optional) Arguments that :class:`pagination.Paginator` takes.
+        :rtype: pagination.Paginator
+        """
+        return pagination.Paginator(self, ddoc_id, func_id, **kwargs)
+
+    def pool_stats(self):
+        """Return the connection pool statistics.
+
+        :rtype: dict
+        """
+        return self.adapter.pool_stats()
+
+    def query_plan(self, selector, **kwargs):
+        """Return the :class:`mango.QueryPlan` of a Mango query.
+
+        :param dict selector: The query selector.
+        :param kwargs: (optional) Arguments that :meth:`explain` takes.
+        :rtype: mango.QueryPlan
+        """
+        return mango.QueryPlan(self.explain(selector, **kwargs).json())
+
     def request(self, method, path, _init=True, **kwargs):
         """Construct a :class:`requests.Request` object and send it."""
-        # Check if the database exists
-        if _init and self.create_db and (not self._created):
+        if not (self.hooks["before_send"] or self.hooks["after_receive"]):
+            return self._request(method, path, _init, kwargs, None)
+
+        event = metrics.RequestEvent(method, metrics.path_template(path))
+        try:
+            return self._request(method, path, _init, kwargs, event)
+        except Exception as ex:
+            event.error = ex
+            raise
+        finally:
+            event.elapsed = time.perf_counter() - event.start
+            metrics.dispatch_hook(self.hooks, "after_receive", event)
+
+    # pylint: disable=too-many-arguments
+    def read_related(self, doc_id, chunk_size=65536, **kwargs):
+        """Retrieve a document with the raw bytes of its attachments.
+
+        The ``multipart/related`` response is parsed as it is read, so the
+        attachments are never base64 encoded (or decoded).
+
+        :param str doc_id: The document to retrieve.
+        :param int chunk_size: (optional) The number of bytes to read at a time.
+        :param kwargs: (optional) Arguments that :meth:`get_related` takes.
+        :rtype: dict
+        """
+        r = self.get_related(doc_id, stream=True, **kwargs)
+        try:
+            content_type = r.headers.get("Content-Type", "")
+            # Documents without attachments are sent as JSON
+            if not content_type.startswith("multipart/related"):
+                return r.json()
+            return mime.parse_related(r.iter_content(chunk_size), content_type)
+        finally:
+            r.close()
+
+    def sweep_conflicts(self, merge=None, **kwargs):
+        """Resolve the conflicted documents, and return the sweep statistics.
+
+        :param function merge: (optional) Called with the leaf revisions of a
+            document, see :class:`conflicts.ConflictSweeper`.
+        :param kwargs: (optional) Arguments that :class:`conflicts.ConflictSweeper` takes.
+        :rtype: dict
+        """
+        return conflicts.ConflictSweeper(self, merge, **kwargs).run()
+
+    def upload_att(
+        self,
+        doc_id,
+        doc_rev,
+        att_id,
+        att,
+        att_type,
+        chunk_size=1024 * 1024,
+        progress=None,
+        **kwargs,
+    ):
+        """Create or update an attachment, a chunk at a time.
+
+        The body is sent with chunked transfer encoding, so only a chunk of it is
+        in memory at a time.
+
+        :param str doc_id: The attachment document.
+        :param doc_rev: (optional) The document revision.
+        :param str att_id: The attachment name.
+        :param att: Bytes, a memory-map, a file path or object, or an iterable of bytes.
+        :param str att_type: The attachment MIME type.
+        :param int chunk_size: (optional) The number of bytes to send at a time.
+        :param function progress: (optional) Called with ``(done, total, elapsed)``.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: requests.Response
+        """
+        total = utils.get_size(att)
+        chunks = utils.iter_chunks(att, chunk_size)
+        if progress is not None:
+            chunks = utils.iter_progress(chunks, progress, total)
+
+        return self.insert_att(doc_id, doc_rev, att_id, chunks, att_type, **kwargs)
+
+    def _bulk_get_fallback(self, docs, concurrency, **kwargs):
+        """Fetch multiple documents with concurrent :meth:`get` requests.
+
+        :param list docs: The sequence of ``{'id': ..., 'rev': ...}`` to fetch.
+        :param int concurrency: The number of requests in flight.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: iterator
+        """
+        kwargs.pop("json", None)
+
+        def fetch(doc):
+            params = dict(kwargs.get("params") or {})
+            if doc.get("rev"):
+                params["rev"] = doc["rev"]
             try:
-                self.request("HEAD", "", _init=False)
-            except exceptions.ResourceNotFound:
-                self.request("PUT", "", _init=False)
-            self._created = True
+                r = self.get(doc["id"], **dict(kwargs, params=params))
+            except exceptions.HTTPError as ex:
+                error = ex.args[0] if isinstance(ex.args[0], dict) else {}
+                error = dict(error, id=doc["id"], rev=doc.get("rev"))
+                return {"id": doc["id"], "docs": [{"error": error}]}
+            return {"id": doc["id"], "docs": [{"ok": r.json()}]}
+
+        yield from utils.imap_concurrent(fetch, docs, concurrency)
+
+    def _create(self):
+        """Create the database, if it does not exist."""
+        try:
+            self.request("PUT", "", _init=False)
+        except exceptions.PreconditionFailed:
+            # Created by someone else in the meantime
+            pass
+        DATABASES.add(self.url)
+
+    def _invalidate(self, path, kwargs):
+        """Remove the documents a write request changes from the :attr:`cache`.
+
+        :param str path: The request path.
+        :param dict kwargs: The request arguments.
+        """
+        if not path:
+            if isinstance(kwargs.get("json"), dict) and ("_id" in kwargs["json"]):
+                doc_id = utils.encode_document_id(kwargs["json"]["_id"])
+                self.cache.invalidate((self.url, doc_id))
+            elif kwargs.get("json") is None:
+                # The database itself was deleted (or created)
+                self.cache.clear(self.url)
+            return
+
+        if path == "_bulk_docs":
+            docs = kwargs["json"].get("docs", [])
+            keys = [
+                (self.url, utils.encode_document_id(d["_id"]))
+                for d in docs
+                if "_id" in d
+            ]
+            self.cache.invalidate(*keys)
+            return
+
+        # Document (and attachment) paths, e.g. "docid/att" or "_design/ddoc"
+        parts = path.split("/")
+        if parts[0] in ("_design", "_local"):
+            self.cache.invalidate((self.url, "/".join(parts[:2])))
+        elif not parts[0].startswith("_"):
+            self.cache.invalidate((self.url, parts[0]))
+
+    def _iter_rows(self, method, path, chunk_size, **kwargs):
+        kwargs["stream"] = True
+        r = self.request(method, path, **kwargs)
+        try:
+            yield from utils.iter_rows(r, chunk_size)
+        finally:
+            r.close()
+
+    # pylint: disable=too-many-arguments
+    def _request(self, method, path, _init, kwargs, event):
+        """Send a request to the database, and record it in an event.
+
+        :param str method: The request method.
+        :param str path: The request path.
+        :param bool _init: Check if the database exists.
+        :param dict kwargs: The request arguments.
+        :param metrics.RequestEvent event: The event to record the request in, or ``None``.
+        :rtype: requests.Response
+        """
+        # Check if the database exists, once per process
+        if _init and self._must_check():
+            start = time.perf_counter()
+            with DATABASES.lock(self.url):
+                if self._must_check():
+                    try:
+                        self.request("HEAD", "", _init=False)
+                    except exceptions.ResourceNotFound:
+                        self._create()
+                    DATABASES.add(self.url)
+            if event is not None:
+                event.add_timing("probe", time.perf_counter() - start)
+
+        if event is not None:
+            metrics.dispatch_hook(self.hooks, "before_send", event)
+
+        writes = (self.cache is not None) and (method not in ("GET", "HEAD"))
+        if writes:
+            self._invalidate(path, kwargs)
+
+        try:
+            r = self._send(method, path, kwargs, event)
+        except exceptions.ResourceNotFound as ex:
+            if not (_init and self._must_create(method, path, kwargs, ex)):
+                raise
+            # Create the database, and replay the request
+            self._create()
+            r = self._send(method, path, kwargs, event)
+        finally:
+            # A get() while the write was in flight may have cached the old body
+            if writes:
+                self._invalidate(path, kwargs)
+
+        if (method == "DELETE") and (not path):
+            DATABASES.discard(self.url)
+
+        return r
+
+    def _send(self, method, path, kwargs, event=None):
+        """Send a request, with the :attr:`retry` policy and :attr:`compression`.
+
+        :param str method: The request method.
+        :param str path: The request path.
+        :param dict kwargs: The request arguments.
+        :param metrics.RequestEvent event: (optional) The event to record the request in.
+        :rtype: requests.Response
+        """
+        args = (self.session, self.base_url, method, path)
+        options = {"_codec": self.codec, "_event": event}
+        # The retry policy sees the uncompressed body, the request is compressed
+        # once (on the first attempt)
+        sent = []
+
+        def send():
+            if not sent:
+                sent.append(self._compress(kwargs, event))
+            elif event is not None:
+                event.retries = len(sent)
+                sent.append(sent[0])
+            return time2relax.request(*args, **options, **sent[0])
+
+        if self.retry is None:
+            r = send()
+        else:
+            r = self.retry.call(self.host, method, path, kwargs, send)
+
+        if self.compression is not None:
+            self.compression.record(r, sent[0])
+        return r
+
+    def _compress(self, kwargs, event=None):
+        """Return the request arguments, with the body compressed if it is worth it.
+
+        :param dict kwargs: The request arguments.
+        :param metrics.RequestEvent event: (optional) The event to record the time in.
+        :rtype: dict
+        """
+        if self.compression is None:
+            return kwargs
+
+        start = time.perf_counter()
+        kwargs = self.compression.compress(kwargs, self.codec)
+        if event is not None:
+            event.add_timing("compress", time.perf_counter() - start)
+        return kwargs
+
+
+def _write_chunks(fp, chunks, progress=None, total=None):
+    """Write chunks of bytes to a file, and return the number of bytes written.
+
+    :param fp: The writable file-like object.
+    :param chunks: The iterable of bytes.
+    :param function progress: (optional) Called with ``(done, total, elapsed)``.
+    :param int total: (optional) The total number of bytes.
+    :rtype: int
+    """
+    if progress is not None:
+        chunks = utils.iter_progress(chunks, progress, total)
+
+    done = 0
+    for chunk in chunks:
+        fp.write(chunk)
+        done += len(chunk)
 
-        return time2relax.request(self.session, self.url, method, path, **kwargs)
+    return done
@@ -0,0 +1,216 @@
+"""Pagination objects that power time2relax."""
+
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Paginator:
+    """Page through ``_all_docs`` or a view with keyset (``startkey``) pagination.
+
+    Every page is requested from the ``(startkey, startkey_docid)`` of the row
+    that follows the previous page, so deep pages cost as much as the first,
+    duplicate view keys are not skipped, and ``descending=true`` just works.
+
+    Example::
+
+        >>> pages = Paginator(db, page_size=500)
+        >>> for rows in pages:
+        ...     save(rows, pages.cursor)
+        ...
+        >>> pages = Paginator(db, page_size=500, cursor=saved_cursor)
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        db,
+        ddoc_id=None,
+        func_id=None,
+        page_size=1000,
+        prefetch=True,
+        cursor=None,
+        params=None,
+        **kwargs,
+    ):
+        """Initialize the paginator.
+
+        :param CouchDB db: The database to page through.
+        :param str ddoc_id: (optional) The design document name of a view.
+        :param str func_id: (optional) The view function name of a view.
+        :param int page_size: (optional) The number of rows in a page.
+        :param bool prefetch: (optional) Fetch the next page while one is consumed.
+        :param str cursor: (optional) A :attr:`cursor` to resume from.
+        :param dict params: (optional) The query parameters, ``limit`` caps the rows
+            and ``skip`` applies to the first page.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+
+        params = dict(params or {})
+        if "keys" in params:
+            raise ValueError("Paginator can not page through 'keys'")
+
+        # Use a single spelling of the keyset parameters
+        if "start_key" in params:
+            params["startkey"] = params.pop("start_key")
+        if "start_key_doc_id" in params:
+            params["startkey_docid"] = params.pop("start_key_doc_id")
+
+        self.db = db
+        self.ddoc_id = ddoc_id
+        self.func_id = func_id
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.kwargs = kwargs
+
+        self._limit = params.pop("limit", None)
+        self._skip = params.pop("skip", None)
+        self._params = params
+        self._start = _start_of(params)
+        if cursor:
+            # The cursor is past the skipped rows, and knows the rows left
+            self._start, remaining = _decode(cursor)
+            self._skip = None
+            if remaining is not None:
+                self._limit = remaining
+
+        #: Resume from the next unread page, ``None`` when there are no more
+        self.cursor = cursor
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def __iter__(self):
+        """Yield the pages, as lists of rows."""
+        remaining = self._limit
+        start = self._start
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._fetch, start, remaining, self._skip)
+            while future is not None:
+                rows, start = future.result()
+                if remaining is not None:
+                    remaining -= len(rows)
+                    if remaining <= 0:
+                        start = None
+
+                future = None
+                if start is not None:
+                    if self.prefetch:
+                        future = executor.submit(self._fetch, start, remaining)
+                    self.cursor = encode_cursor(start, remaining)
+                else:
+                    self.cursor = None
+
+                if rows:
+                    yield rows
+
+                if (start is not None) and (future is None):
+                    future = executor.submit(self._fetch, start, remaining)
+
+    def rows(self):
+        """Yield the rows of every page.
+
+        :rtype: iterator
+        """
+        for page in self:
+            yield from page
+
+    def _fetch(self, start, remaining, skip=None):
+        """Return a page of rows, and the start of the next page.
+
+        :param tuple start: The ``(startkey, startkey_docid)`` of the page.
+        :param int remaining: The rows left to read, or ``None``.
+        :param int skip: (optional) The rows to skip, only on the first page.
+        :rtype: (list, tuple)
+        """
+        size = self.page_size if remaining is None else min(self.page_size, remaining)
+
+        params = dict(self._params)
+        params.pop("startkey", None)
+        params.pop("startkey_docid", None)
+        if start:
+            params["startkey"] = start[0]
+            if start[1] is not None:
+                params["startkey_docid"] = start[1]
+        if skip:
+            params["skip"] = skip
+        # Ask for one more row to find the start of the next page
+        params["limit"] = size + 1
+
+        if self.ddoc_id:
+            r = self.db.ddoc_view(
+                self.ddoc_id, self.func_id, params=params, **self.kwargs
+            )
+        else:
+            r = self.db.all_docs(params=params, **self.kwargs)
+
+        rows = r.json()["rows"]
+        if len(rows) <= size:
+            return rows, None
+
+        following = rows[size]
+        return rows[:size], (following["key"], following.get("id"))
+
+
+def encode_cursor(start, remaining=None):
+    """Return an opaque cursor for a page start.
+
+    Example::
+
+        >>> encode_cursor(['2024', 'docid'])
+        'WyIyMDI0IiwgImRvY2lkIl0='
+
+    :param tuple start: The ``(startkey, startkey_docid)`` of the page.
+    :param int remaining: (optional) The rows left to read, of a ``limit``.
+    :rtype: str
+    """
+    value = list(start) if remaining is None else [*start, remaining]
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode()
+
+
+def decode_cursor(cursor):
+    """Return the page start of an opaque cursor.
+
+    Example::
+
+        >>> decode_cursor('WyIyMDI0IiwgImRvY2lkIl0=')
+        ('2024', 'docid')
+
+    :param str cursor: The cursor to decode.
+    :rtype: tuple
+    """
+    return _decode(cursor)[0]
+
+
+def _decode(cursor):
+    """Return the page start of an opaque cursor, and the rows left to read.
+
+    :param str cursor: The cursor to decode.
+    :rtype: (tuple, int)
+    """
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key, doc_id, *rest = value
+        remaining = rest[0] if rest else None
+        if (len(rest) > 1) or not (remaining is None or isinstance(remaining, int)):
+            raise ValueError(value)
+    except (TypeError, ValueError) as ex:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from ex
+
+    return (key, doc_id), remaining
+
+
+def _start_of(params):
+    """Return the page start that the query parameters ask for.
+
+    :param dict params: The query parameters.
+    :rtype: tuple
+    """
+    if "startkey" not in params:
+        return None
+
+    return params["startkey"], params.get("startkey_docid")
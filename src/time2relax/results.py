@@ -0,0 +1,228 @@
+"""Result objects that power time2relax."""
+
+import json
+
+from time2relax import utils
+
+
+class Document(dict):
+    """A decoded document, with the ``ETag`` and status of its response."""
+
+    __slots__ = ("etag", "status")
+
+    def __init__(self, doc, etag=None, status=None):
+        """Initialize the document.
+
+        :param dict doc: The decoded document.
+        :param str etag: (optional) The response ``ETag``.
+        :param int status: (optional) The response status code.
+        """
+        super().__init__(doc)
+        self.etag = etag
+        self.status = status
+
+
+class Row:
+    """A row of a view, or of ``_all_docs``."""
+
+    __slots__ = ("id", "key", "value", "doc", "error")
+
+    # pylint: disable=too-many-arguments,redefined-builtin
+    def __init__(self, id=None, key=None, value=None, doc=None, error=None):
+        """Initialize the row."""
+        self.id = id
+        self.key = key
+        self.value = value
+        self.doc = doc
+        self.error = error
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.id}]>"
+
+    def __eq__(self, other):
+        """Return self == other."""
+        if not isinstance(other, Row):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+
+class ViewResult:
+    """The decoded rows of a view, or of ``_all_docs``."""
+
+    __slots__ = ("total_rows", "offset", "rows", "etag", "status")
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, total_rows, offset, rows, etag=None, status=None):
+        """Initialize the view result.
+
+        :param int total_rows: The rows in the view.
+        :param int offset: The offset of the first row.
+        :param list rows: The :class:`Row` objects.
+        :param str etag: (optional) The response ``ETag``.
+        :param int status: (optional) The response status code.
+        """
+        self.total_rows = total_rows
+        self.offset = offset
+        self.rows = rows
+        self.etag = etag
+        self.status = status
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{len(self.rows)}/{self.total_rows}]>"
+
+    def __len__(self):
+        """Return len(self)."""
+        return len(self.rows)
+
+    def __iter__(self):
+        """Return iter(self)."""
+        return iter(self.rows)
+
+
+class WriteResult:
+    """The result of a document write."""
+
+    __slots__ = ("id", "rev", "ok", "error", "reason", "etag", "status")
+
+    # pylint: disable=too-many-arguments,redefined-builtin
+    def __init__(
+        self, id, rev=None, ok=False, error=None, reason=None, etag=None, status=None
+    ):
+        """Initialize the write result."""
+        self.id = id
+        self.rev = rev
+        self.ok = ok
+        self.error = error
+        self.reason = reason
+        self.etag = etag
+        self.status = status
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.id} {self.rev or self.error}]>"
+
+
+class Results:
+    """Database methods that return decoded result objects, not responses.
+
+    Bodies are decoded once, with the :attr:`CouchDB.codec`, and only the
+    ``ETag`` and status of a response are kept. The rows of a view are the
+    exception: they are read as they arrive, with the standard library
+    streaming parser (:func:`utils.iter_rows`), and each row becomes a
+    :class:`Row` at once.
+
+    Example::
+
+        >>> db.results.insert({'_id': 'docid'})
+        <WriteResult [docid 1-967a00dff5e02add41819138abb3284d]>
+        >>> db.results.all_docs().rows
+        [<Row [docid]>]
+    """
+
+    def __init__(self, db):
+        """Initialize the result methods.
+
+        :param CouchDB db: The database object.
+        """
+        self.db = db
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.db.url}]>"
+
+    def all_docs(self, **kwargs):
+        """Fetch multiple documents.
+
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.all_docs` takes.
+        :rtype: ViewResult
+        """
+        return self._view_result(self.db.all_docs, **kwargs)
+
+    def bulk_docs(self, docs, **kwargs):
+        """Create, update or delete multiple documents.
+
+        :param list docs: The sequence of documents to write.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.bulk_docs` takes.
+        :rtype: list
+        """
+        r = self.db.bulk_docs(docs, **kwargs)
+        return [_write_result(result) for result in self._loads(r)]
+
+    def ddoc_view(self, ddoc_id, func_id, **kwargs):
+        """Execute a view function.
+
+        :param str ddoc_id: The design document name.
+        :param str func_id: The view function name.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.ddoc_view` takes.
+        :rtype: ViewResult
+        """
+        return self._view_result(self.db.ddoc_view, ddoc_id, func_id, **kwargs)
+
+    def get(self, doc_id, **kwargs):
+        """Retrieve a document.
+
+        :param str doc_id: The document to retrieve.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.get` takes.
+        :rtype: Document
+        """
+        r = self.db.get(doc_id, **kwargs)
+        return Document(self._loads(r), r.headers.get("ETag"), r.status_code)
+
+    def insert(self, doc, **kwargs):
+        """Create or update an existing document.
+
+        :param dict doc: The document to write.
+        :param kwargs: (optional) Arguments that :meth:`CouchDB.insert` takes.
+        :rtype: WriteResult
+        """
+        r = self.db.insert(doc, **kwargs)
+        result = _write_result(self._loads(r))
+        result.etag = r.headers.get("ETag")
+        result.status = r.status_code
+        return result
+
+    def _loads(self, response):
+        return (self.db.codec or json).loads(response.content)
+
+    def _view_result(self, method, *args, **kwargs):
+        # The fields before the rows, e.g. '{"total_rows":2,"offset":0,'
+        head = {}
+
+        def header(text):
+            head.update(json.loads(text.rstrip(", \t\r\n") + "}"))
+
+        kwargs["stream"] = True
+        r = method(*args, **kwargs)
+        try:
+            rows = [
+                Row(
+                    row.get("id"),
+                    row.get("key"),
+                    row.get("value"),
+                    row.get("doc"),
+                    row.get("error"),
+                )
+                for row in utils.iter_rows(r, header=header)
+            ]
+        finally:
+            r.close()
+
+        return ViewResult(
+            head.get("total_rows"),
+            head.get("offset"),
+            rows,
+            r.headers.get("ETag"),
+            r.status_code,
+        )
+
+
+def _write_result(result):
+    return WriteResult(
+        result.get("id"),
+        result.get("rev"),
+        result.get("ok", False),
+        result.get("error"),
+        result.get("reason"),
+    )
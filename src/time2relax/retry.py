@@ -0,0 +1,288 @@
+"""Retry objects that power time2relax."""
+
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+from time2relax import exceptions, utils
+
+# POST requests that only read
+READ_POSTS = ("_all_docs", "_bulk_get", "_changes", "_explain", "_find")
+
+# Errors of the connection, retried when the request is idempotent
+_CONNECTION_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+class CircuitBreaker:
+    """Fail fast while a host is unhealthy.
+
+    The circuit opens after ``failure_threshold`` consecutive failures. After
+    ``recovery_time`` seconds, a single trial request is let through (half
+    open): a success closes the circuit, a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_time=30.0):
+        """Initialize the circuit breaker.
+
+        :param int failure_threshold: (optional) Failures in a row that open it.
+        :param float recovery_time: (optional) Seconds before a trial request.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = None
+        self._trial = False
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.state}]>"
+
+    @property
+    def state(self):
+        """Return the state of the circuit."""
+        if self._opened is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened < self.recovery_time:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        """Return ``True`` if a request may be sent.
+
+        :rtype: bool
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if (state == self.HALF_OPEN) and (not self._trial):
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        """Record a request that succeeded."""
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = False
+
+    def record_failure(self):
+        """Record a request that failed."""
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._failures >= self.failure_threshold):
+                self._opened = time.monotonic()
+            self._trial = False
+
+
+class RetryPolicy:
+    """Retry idempotent requests with decorrelated-jitter backoff.
+
+    Connection errors, 429 and 5xx responses are retried, honoring a
+    ``Retry-After`` header. A :class:`CircuitBreaker` per host fails requests
+    fast while the host is unhealthy.
+
+    Example::
+
+        >>> policy = RetryPolicy(max_retries=5, cap=10)
+        >>> db = CouchDB('http://localhost:5984/testdb', retry=policy)
+        >>> policy.stats()
+        {'requests': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'breakers': {}}
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        max_retries=3,
+        base=0.1,
+        cap=10.0,
+        statuses=(429, 500, 502, 503, 504),
+        failure_threshold=5,
+        recovery_time=30.0,
+        idempotent=None,
+    ):
+        """Initialize the retry policy.
+
+        :param int max_retries: (optional) The most retries of a request.
+        :param float base: (optional) The least seconds between two tries.
+        :param float cap: (optional) The most seconds between two tries.
+        :param tuple statuses: (optional) The HTTP status codes to retry.
+        :param int failure_threshold: (optional) Failures in a row that open a circuit.
+        :param float recovery_time: (optional) Seconds before a trial request.
+        :param function idempotent: (optional) Called with ``(method, path, kwargs)``,
+            return ``True`` if the request is safe to retry.
+        """
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.statuses = statuses
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.idempotent = idempotent or is_idempotent
+
+        #: Called to wait between two tries
+        self.sleep = time.sleep
+
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.max_retries}]>"
+
+    def breaker(self, host):
+        """Return the circuit breaker of a host.
+
+        :param str host: The database host.
+        :rtype: CircuitBreaker
+        """
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_time
+                )
+            return self._breakers[host]
+
+    def call(self, host, method, path, kwargs, send):
+        """Send a request, and retry it if it fails.
+
+        :param str host: The database host.
+        :param str method: Method for the :class:`requests.Request` object.
+        :param str path: The request path.
+        :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+        :param function send: Called to send the request.
+        :rtype: requests.Response
+        """
+        breaker = self.breaker(host)
+        retries = self.max_retries if self._retryable(method, path, kwargs) else 0
+        delay = self.base
+
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                self._count("rejected")
+                raise exceptions.CircuitOpenError(f"The circuit of {host} is open")
+
+            self._count("requests")
+            try:
+                r = send()
+            except _CONNECTION_ERRORS:
+                breaker.record_failure()
+                self._count("failures")
+                if attempt == retries:
+                    raise
+                wait = None
+            except exceptions.HTTPError as ex:
+                response = ex.args[1] if len(ex.args) > 1 else None
+                status = getattr(response, "status_code", None)
+                if status is not None and status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if (status not in self.statuses) or (attempt == retries):
+                    raise
+                self._count("failures")
+                wait = get_retry_after(response)
+            except BaseException:
+                # Any other error ends a trial too, or the circuit stays half open
+                breaker.record_failure()
+                raise
+            else:
+                breaker.record_success()
+                return r
+
+            delay = min(self.cap, random.uniform(self.base, delay * 3))
+            self._count("retries")
+            self.sleep(delay if wait is None else min(max(wait, delay), self.cap))
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def stats(self):
+        """Return the retry statistics, and the state of every circuit.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            breakers = dict(self._breakers)
+
+        stats["breakers"] = {host: b.state for host, b in breakers.items()}
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _retryable(self, method, path, kwargs):
+        return utils.is_replayable(kwargs) and self.idempotent(method, path, kwargs)
+
+
+def get_retry_after(response):
+    """Return the seconds of a ``Retry-After`` header, or ``None``.
+
+    :param requests.Response response: The response object.
+    :rtype: float
+    """
+    value = getattr(response, "headers", {}).get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+def is_idempotent(method, path, kwargs):
+    """Return ``True`` if a request is safe to retry.
+
+    Example::
+
+        >>> is_idempotent('POST', '', {'json': {'title': 'Heroes'}})
+        False
+        >>> is_idempotent('POST', '_all_docs', {'json': {'keys': ['a']}})
+        True
+
+    :param str method: Method for the :class:`requests.Request` object.
+    :param str path: The request path.
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :rtype: bool
+    """
+    if method in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE"):
+        return True
+    if method != "POST":
+        return False
+
+    parts = path.split("/")
+    if (parts[-1] in READ_POSTS) or ("_view" in parts[:-1]):
+        return True
+
+    # Documents with an '_id' are not duplicated by a retry
+    if parts[-1] == "_bulk_docs":
+        body = kwargs.get("json")
+        if not isinstance(body, dict) or not isinstance(body.get("docs"), list):
+            return False
+        return all(isinstance(doc, dict) and ("_id" in doc) for doc in body["docs"])
+
+    return False
@@ -0,0 +1,282 @@
+"""Server objects that power time2relax."""
+
+from requests import Request
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
+
+from time2relax import adapters, exceptions, metrics, time2relax, utils
+from time2relax.codec import get_codec
+from time2relax.compression import GzipCompressor
+from time2relax.models import DATABASES, CouchDB
+
+
+class CouchServer:
+    """Representation of a CouchDB server, and the databases on it.
+
+    The server owns a single session (and connection pool), and the databases
+    of :meth:`db` share it, so thousands of databases cost one pool.
+
+    Example::
+
+        >>> server = CouchServer('http://localhost:5984', auth=('admin', 'secret'))
+        >>> db = server.db('tenant-42')
+        >>> db.insert({'title': 'Ziggy Stardust'})
+        <Response [201]>
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        url,
+        auth=None,
+        create_db=True,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        keep_alive=True,
+        retry=None,
+        codec=None,
+        hooks=None,
+        compression=None,
+    ):
+        """Initialize the server object.
+
+        :param str url: The server URL.
+        :param auth: (optional) The authentication of the session, e.g. ``(user, pass)``.
+        :param create_db: (optional) The ``create_db`` of the databases, see :class:`CouchDB`.
+        :param int pool_connections: (optional) The number of host pools to cache.
+        :param int pool_maxsize: (optional) The connections to keep in each pool.
+        :param bool pool_block: (optional) Wait for a free connection when exhausted.
+        :param bool keep_alive: (optional) Reuse connections between requests.
+        :param retry.RetryPolicy retry: (optional) Retry requests that fail.
+        :param codec: (optional) The JSON codec of request and response bodies,
+            ``"json"``, ``"orjson"``, or any object with ``dumps`` and ``loads``.
+        :param dict hooks: (optional) Functions called with a :class:`metrics.RequestEvent`,
+            e.g. ``{'before_send': [func], 'after_receive': [func]}``.
+        :param compression: (optional) A :class:`compression.GzipCompressor` of the
+            request bodies of the databases, or ``True`` for the default one.
+        """
+        # Raise exception on an invalid URL
+        Request("HEAD", url).prepare()
+
+        #: Server URL
+        self.url = utils.get_database_host(url)
+
+        #: Server URL with a trailing slash, to append request paths to
+        self.base_url = f"{self.url}/"
+
+        #: Database initialization, of the databases of :meth:`db`
+        self.create_db = create_db
+
+        #: Retry policy
+        self.retry = retry
+
+        #: JSON codec
+        self.codec = get_codec(codec)
+
+        #: Request hooks
+        self.hooks = {name: list((hooks or {}).get(name, [])) for name in metrics.HOOKS}
+
+        #: Request body compression, of the databases of :meth:`db`
+        self.compression = GzipCompressor() if compression is True else compression
+
+        #: Default :class:`requests.Session`, and its :class:`adapters.PoolAdapter`
+        self.session, self.adapter = adapters.make_session(
+            pool_connections, pool_maxsize, pool_block, keep_alive
+        )
+        if auth is not None:
+            self.session.auth = auth
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<{self.__class__.__name__} [{self.url}]>"
+
+    def __enter__(self):
+        """Return the server."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the connections."""
+        self.close()
+
+    def all_dbs(self, **kwargs):
+        """List the databases on the server.
+
+        http://docs.couchdb.org/en/stable/api/server/common.html#all-dbs
+
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: requests.Response
+        """
+        method, _kwargs = utils.query_method_kwargs(kwargs.pop("params", None))
+        kwargs.update(_kwargs)
+        return self.request(method, "_all_dbs", **kwargs)
+
+    def close(self):
+        """Close the connections of the session."""
+        self.session.close()
+
+    def create_dbs(self, names, concurrency=8, exist_ok=True):
+        """Create many databases, with ``concurrency`` requests at once.
+
+        :param list names: The database names.
+        :param int concurrency: (optional) The requests in flight.
+        :param bool exist_ok: (optional) Do not fail on a database that exists.
+        :return: The errors, by database name.
+        :rtype: dict
+        """
+
+        def create(name):
+            path = utils.encode_uri_component(name)
+            try:
+                self.request("PUT", path)
+            except exceptions.PreconditionFailed as ex:
+                if not exist_ok:
+                    return name, ex
+            except exceptions.HTTPError as ex:
+                return name, ex
+            DATABASES.add(self.base_url + path)
+            return name, None
+
+        return self._errors(create, names, concurrency)
+
+    def db(self, name, **kwargs):
+        """Return a database on the server, sharing its session and settings.
+
+        :param str name: The database name.
+        :param kwargs: (optional) Arguments that :class:`CouchDB` takes.
+        :rtype: CouchDB
+        """
+        kwargs.setdefault("create_db", self.create_db)
+        url = f"{self.url}/{utils.encode_uri_component(name)}"
+        return CouchDB(url, server=self, **kwargs)
+
+    def dbs_info(self, names, chunk_size=100, concurrency=4):
+        """Fetch the information of many databases, and yield it in order.
+
+        Every result is a ``{'key': name, 'info': {...}}``, or a
+        ``{'key': name, 'error': 'not_found'}``.
+
+        http://docs.couchdb.org/en/stable/api/server/common.html#dbs-info
+
+        :param list names: The database names.
+        :param int chunk_size: (optional) The names in a request, at most the
+            server's ``max_db_number_for_dbs_info_req`` (100 by default).
+        :param int concurrency: (optional) The requests in flight.
+        :rtype: iterator
+        """
+
+        def fetch(keys):
+            return self.request("POST", "_dbs_info", json={"keys": keys}).json()
+
+        for results in utils.imap_concurrent(
+            fetch, utils.chunked(names, chunk_size), concurrency
+        ):
+            yield from results
+
+    def delete_dbs(self, names, concurrency=8, missing_ok=True):
+        """Delete many databases, with ``concurrency`` requests at once.
+
+        :param list names: The database names.
+        :param int concurrency: (optional) The requests in flight.
+        :param bool missing_ok: (optional) Do not fail on a database that is missing.
+        :return: The errors, by database name.
+        :rtype: dict
+        """
+
+        def delete(name):
+            path = utils.encode_uri_component(name)
+            try:
+                self.request("DELETE", path)
+            except exceptions.ResourceNotFound as ex:
+                if not missing_ok:
+                    return name, ex
+            except exceptions.HTTPError as ex:
+                return name, ex
+            DATABASES.discard(self.base_url + path)
+            return name, None
+
+        return self._errors(delete, names, concurrency)
+
+    def info(self, **kwargs):
+        """Get information about the server.
+
+        http://docs.couchdb.org/en/stable/api/server/common.html#get--
+
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: requests.Response
+        """
+        return self.request("GET", "", **kwargs)
+
+    def iter_all_dbs(self, page_size=1000, params=None, **kwargs):
+        """List the databases on the server, and yield the names a page at a time.
+
+        :param int page_size: (optional) The number of names in a page.
+        :param dict params: (optional) The query parameters, e.g. ``startkey``.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: iterator
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+
+        params = dict(params or {})
+        remaining = params.pop("limit", None)
+
+        while (remaining is None) or (remaining > 0):
+            size = page_size if remaining is None else min(page_size, remaining)
+            # Ask for one more name to find the start of the next page
+            names = self.all_dbs(params=dict(params, limit=size + 1), **kwargs).json()
+            yield from names[:size]
+
+            if len(names) <= size:
+                return
+            params["startkey"] = names[size]
+            if remaining is not None:
+                remaining -= size
+
+    def pool_stats(self):
+        """Return the connection pool statistics.
+
+        :rtype: dict
+        """
+        return self.adapter.pool_stats()
+
+    def request(self, method, path, **kwargs):
+        """Send a request to the server.
+
+        :param str method: Method for the :class:`requests.Request` object.
+        :param str path: The path to join with :attr:`url`.
+        :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+        :rtype: requests.Response
+        """
+        hooks = None
+        if self.hooks["before_send"] or self.hooks["after_receive"]:
+            hooks = self.hooks
+
+        def send():
+            return time2relax.request(
+                self.session,
+                self.base_url,
+                method,
+                path,
+                _codec=self.codec,
+                _hooks=hooks,
+                **kwargs,
+            )
+
+        if self.retry is None:
+            return send()
+
+        return self.retry.call(self.url, method, path, kwargs, send)
+
+    def _errors(self, func, names, concurrency):
+        """Call a function with every name, and return the errors it returns.
+
+        :param function func: Called with a name, returns ``(name, error)``.
+        :param list names: The database names.
+        :param int concurrency: The calls in flight.
+        :rtype: dict
+        """
+        return {
+            name: error
+            for name, error in utils.imap_concurrent(func, names, concurrency)
+            if error is not None
+        }
@@ -1,11 +1,13 @@
 """Primary methods that power time2relax."""
 
 import json
+import time
 from posixpath import join as urljoin
 
 from requests import compat
 
-from time2relax import utils  # pylint: disable=import-self
+from time2relax import metrics, mime, utils  # pylint: disable=import-self
+from time2relax.codec import decode_response, encode_body
 
 _LIST = "_list"
 _SHOW = "_show"
@@ -50,6 +52,52 @@ def bulk_docs(docs, **kwargs):
     return "POST", "_bulk_docs", kwargs
 
 
+def bulk_get(docs, **kwargs):
+    """Fetch multiple documents (and revisions) in a single request.
+
+    http://docs.couchdb.org/en/stable/api/database/bulk-api.html#post--db-_bulk_get
+
+    :param list docs: The sequence of ``{'id': ..., 'rev': ...}`` to fetch.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    if ("json" not in kwargs) or (not isinstance(kwargs["json"], dict)):
+        kwargs["json"] = {}
+
+    kwargs["json"]["docs"] = docs
+
+    return "POST", "_bulk_get", kwargs
+
+
+def changes(**kwargs):
+    """Fetch the changes made to documents in the database.
+
+    - http://docs.couchdb.org/en/stable/api/database/changes.html#get--db-_changes
+    - http://docs.couchdb.org/en/stable/api/database/changes.html#post--db-_changes
+
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    params = kwargs.get("params")
+    if (not isinstance(params, dict)) or (
+        ("selector" not in params) and ("doc_ids" not in params)
+    ):
+        return "GET", "_changes", kwargs
+
+    # Filters that take a JSON body need a POST request
+    params = dict(params)
+    if ("json" not in kwargs) or (not isinstance(kwargs["json"], dict)):
+        kwargs["json"] = {}
+
+    for key, _filter in (("selector", "_selector"), ("doc_ids", "_doc_ids")):
+        if key in params:
+            kwargs["json"][key] = params.pop(key)
+            params.setdefault("filter", _filter)
+    kwargs["params"] = params
+
+    return "POST", "_changes", kwargs
+
+
 def compact(**kwargs):
     """Trigger a compaction operation.
 
@@ -66,6 +114,32 @@ def compact(**kwargs):
     return "POST", "_compact", kwargs
 
 
+def create_index(fields, ddoc=None, name=None, index_type="json", **kwargs):
+    """Create a Mango index.
+
+    http://docs.couchdb.org/en/stable/api/database/find.html#post--db-_index
+
+    :param list fields: The fields to index, e.g. ``['year', {'title': 'desc'}]``.
+    :param str ddoc: (optional) The design document to create the index in.
+    :param str name: (optional) The index name.
+    :param str index_type: (optional) The index type, ``'json'`` or ``'text'``.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    if ("json" not in kwargs) or (not isinstance(kwargs["json"], dict)):
+        kwargs["json"] = {}
+
+    index = kwargs["json"].setdefault("index", {})
+    index["fields"] = fields
+    kwargs["json"]["type"] = index_type
+    if ddoc is not None:
+        kwargs["json"]["ddoc"] = ddoc
+    if name is not None:
+        kwargs["json"]["name"] = name
+
+    return "POST", "_index", kwargs
+
+
 def ddoc_list(ddoc_id, func_id, view_id, other_id=None, **kwargs):
     """Apply a list function against a view.
 
@@ -124,6 +198,30 @@ def ddoc_view(ddoc_id, func_id, **kwargs):
     return _ddoc(method, ddoc_id, _VIEW, func_id, **kwargs)
 
 
+def delete_index(ddoc, name, index_type="json", **kwargs):
+    """Delete a Mango index.
+
+    http://docs.couchdb.org/en/stable/api/database/find.html#delete--db-_index-designdoc-json-name
+
+    :param str ddoc: The design document of the index, with or without ``_design/``.
+    :param str name: The index name.
+    :param str index_type: (optional) The index type, ``'json'`` or ``'text'``.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    if ddoc.startswith("_design/"):
+        ddoc = ddoc[8:]
+
+    path = urljoin(
+        "_index",
+        utils.encode_uri_component(ddoc),
+        index_type,
+        utils.encode_uri_component(name),
+    )
+
+    return "DELETE", path, kwargs
+
+
 def destroy(**kwargs):
     """Delete the database.
 
@@ -135,6 +233,58 @@ def destroy(**kwargs):
     return "DELETE", "", kwargs
 
 
+# pylint: disable=too-many-arguments
+def explain(
+    selector, fields=None, sort=None, limit=None, skip=None, use_index=None, **kwargs
+):
+    """Return the index (and options) a Mango query would use.
+
+    http://docs.couchdb.org/en/stable/api/database/find.html#post--db-_explain
+
+    :param dict selector: The query selector.
+    :param list fields: (optional) The fields to return.
+    :param list sort: (optional) The sort order, e.g. ``[{'year': 'desc'}]``.
+    :param int limit: (optional) The maximum number of documents to return.
+    :param int skip: (optional) The number of documents to skip.
+    :param use_index: (optional) The design document (and index name) to use.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    _mango(selector, fields, sort, limit, skip, use_index, None, kwargs)
+
+    return "POST", "_explain", kwargs
+
+
+# pylint: disable=too-many-arguments
+def find(
+    selector,
+    fields=None,
+    sort=None,
+    limit=None,
+    skip=None,
+    use_index=None,
+    bookmark=None,
+    **kwargs,
+):
+    """Find documents with a Mango query.
+
+    http://docs.couchdb.org/en/stable/api/database/find.html#post--db-_find
+
+    :param dict selector: The query selector, e.g. ``{'year': {'$gt': 2010}}``.
+    :param list fields: (optional) The fields to return.
+    :param list sort: (optional) The sort order, e.g. ``[{'year': 'desc'}]``.
+    :param int limit: (optional) The maximum number of documents to return.
+    :param int skip: (optional) The number of documents to skip.
+    :param use_index: (optional) The design document (and index name) to use.
+    :param str bookmark: (optional) The ``bookmark`` of the previous page.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    _mango(selector, fields, sort, limit, skip, use_index, bookmark, kwargs)
+
+    return "POST", "_find", kwargs
+
+
 def get(doc_id, **kwargs):
     """Retrieve a document.
 
@@ -173,6 +323,28 @@ def get_att(doc_id, att_id, **kwargs):
     return "GET", path, kwargs
 
 
+def get_related(doc_id, **kwargs):
+    """Retrieve a document with its attachments, as ``multipart/related``.
+
+    http://docs.couchdb.org/en/stable/api/document/common.html#efficient-multiple-attachments-retrieving
+
+    :param str doc_id: The document to retrieve.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    if ("params" not in kwargs) or (not isinstance(kwargs["params"], dict)):
+        kwargs["params"] = {}
+
+    if ("headers" not in kwargs) or (not isinstance(kwargs["headers"], dict)):
+        kwargs["headers"] = {}
+
+    path = utils.encode_document_id(doc_id)
+    kwargs["params"]["attachments"] = True
+    kwargs["headers"]["Accept"] = "multipart/related"
+
+    return "GET", path, kwargs
+
+
 def info(**kwargs):
     """Get information about the database.
 
@@ -230,6 +402,40 @@ def insert_att(doc_id, doc_rev, att_id, att, att_type, **kwargs):
     return "PUT", path, kwargs
 
 
+def insert_related(doc, attachments, **kwargs):
+    """Create or update a document with its attachments, as ``multipart/related``.
+
+    http://docs.couchdb.org/en/stable/api/document/common.html#creating-multiple-attachments
+
+    :param dict doc: The document to insert, with an ``_id``.
+    :param dict attachments: The ``{name: (content_type, data)}`` to attach.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    if "_id" not in doc:
+        raise ValueError("A multipart/related document needs an '_id'")
+
+    if ("headers" not in kwargs) or (not isinstance(kwargs["headers"], dict)):
+        kwargs["headers"] = {}
+
+    body = mime.RelatedBody(doc, attachments)
+    kwargs["headers"]["Content-Type"] = body.content_type
+    kwargs["data"] = body
+
+    return "PUT", utils.encode_document_id(doc["_id"]), kwargs
+
+
+def list_indexes(**kwargs):
+    """List the Mango indexes of the database.
+
+    http://docs.couchdb.org/en/stable/api/database/find.html#get--db-_index
+
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, str, dict)
+    """
+    return "GET", "_index", kwargs
+
+
 def remove(doc_id, doc_rev, **kwargs):
     """Delete a document.
 
@@ -289,31 +495,66 @@ def replicate_to(source, target, **kwargs):
     return "POST", url, kwargs
 
 
-def request(session, base_path, method, path, **kwargs):
+def prepare_request(base_path, path, codec=None, **kwargs):
+    """Return the URL and arguments to send a request with.
+
+    :param str base_path: The URL to join the path with, e.g. :attr:`CouchDB.base_url`.
+    :param str path: (optional) The path to join with :attr:`CouchDB.url`.
+    :param codec: (optional) The JSON codec to pre-encode the ``json`` body with.
+    :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
+    :rtype: (str, dict)
+    """
+    if codec is not None:
+        kwargs = encode_body(codec, kwargs)
+
+    # Prepare the params dictionary, copy it only if it has titlecase booleans
+    params = kwargs.get("params")
+    if isinstance(params, dict) and any(isinstance(v, bool) for v in params.values()):
+        kwargs["params"] = {
+            key: (("true" if val else "false") if isinstance(val, bool) else val)
+            for key, val in params.items()
+        }
+
+    # Support absolute URLs, builder paths are relative (and never contain "://")
+    if ("://" in path) and compat.urlparse(path).scheme:
+        url = path
+    elif base_path.endswith("/") and not path.startswith("/"):
+        url = (base_path + path).rstrip("/")
+    else:
+        url = urljoin(base_path, path).strip("/")
+
+    return url, kwargs
+
+
+def request(
+    session, base_path, method, path, *, _codec=None, _hooks=None, _event=None, **kwargs
+):
     """Construct a :class:`requests.Request` object and send it.
 
     :param requests.Session session:
     :param str base_path:
     :param str method: Method for the :class:`requests.Request` object.
     :param str path: (optional) The path to join with :attr:`CouchDB.url`.
+    :param _codec: (optional) The JSON codec of the request and response bodies.
+    :param dict _hooks: (optional) The ``before_send`` and ``after_receive`` hooks.
+    :param metrics.RequestEvent _event: (optional) The event to record the request in.
     :param kwargs: (optional) Arguments that :meth:`requests.Session.request` takes.
     :rtype: requests.Response
     """
-    # Prepare the params dictionary
-    if ("params" in kwargs) and isinstance(kwargs["params"], dict):
-        params = kwargs["params"].copy()
-        for key, val in params.items():
-            # Handle titlecase booleans
-            if isinstance(val, bool):
-                params[key] = json.dumps(val)
-        kwargs["params"] = params
-
-    # Support absolute URLs
-    url = path if compat.urlparse(path).scheme else urljoin(base_path, path).strip("/")
-
-    r = session.request(method, url, **kwargs)
-    # Raise exception on a bad status code
-    if not (200 <= r.status_code < 300):
+    codec, hooks, event = _codec, _hooks, _event
+    if hooks and (event is None):
+        event = metrics.RequestEvent(method, metrics.path_template(path))
+
+    if event is None:
+        url, kwargs = prepare_request(base_path, path, codec, **kwargs)
+        r = session.request(method, url, **kwargs)
+    else:
+        r = _send(session, base_path, method, path, codec, hooks or {}, event, kwargs)
+
+    if codec is not None:
+        decode_response(codec, r)
+    # Raise exception on a bad status code, 304 answers a conditional request
+    if not ((200 <= r.status_code < 300) or (r.status_code == 304)):
         utils.raise_http_exception(r)
 
     return r
@@ -337,3 +578,74 @@ def _ddoc(method, ddoc_id, func_type, func_id, _path=None, **kwargs):
         path = urljoin(path, _path)
 
     return method, path, kwargs
+
+
+# pylint: disable=too-many-arguments
+def _mango(selector, fields, sort, limit, skip, use_index, bookmark, kwargs):
+    """Set the JSON body of a Mango query.
+
+    :param dict selector: The query selector.
+    :param list fields: The fields to return, or ``None``.
+    :param list sort: The sort order, or ``None``.
+    :param int limit: The maximum number of documents to return, or ``None``.
+    :param int skip: The number of documents to skip, or ``None``.
+    :param use_index: The design document (and index name) to use, or ``None``.
+    :param str bookmark: The ``bookmark`` of the previous page, or ``None``.
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    """
+    if ("json" not in kwargs) or (not isinstance(kwargs["json"], dict)):
+        kwargs["json"] = {}
+
+    kwargs["json"]["selector"] = selector
+    options = (
+        ("fields", fields),
+        ("sort", sort),
+        ("limit", limit),
+        ("skip", skip),
+        ("use_index", use_index),
+        ("bookmark", bookmark),
+    )
+    for key, val in options:
+        if val is not None:
+            kwargs["json"][key] = val
+
+
+# pylint: disable=too-many-arguments
+def _send(session, base_path, method, path, codec, hooks, event, kwargs):
+    """Send a request, and record its phases in an event.
+
+    :param requests.Session session:
+    :param str base_path:
+    :param str method: Method for the :class:`requests.Request` object.
+    :param str path: The path to join with :attr:`CouchDB.url`.
+    :param codec: The JSON codec of the request body, or ``None``.
+    :param dict hooks: The ``before_send`` and ``after_receive`` hooks.
+    :param metrics.RequestEvent event: The event to record the request in.
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :rtype: requests.Response
+    """
+    start = time.perf_counter()
+    if codec is not None:
+        kwargs = encode_body(codec, kwargs)
+    encoded = time.perf_counter()
+    url, kwargs = prepare_request(base_path, path, **kwargs)
+    prepared = time.perf_counter()
+
+    event.add_timing("encode", encoded - start)
+    event.add_timing("prepare", prepared - encoded)
+    metrics.dispatch_hook(hooks, "before_send", event)
+
+    # A retried request is recorded again
+    event.status = event.error = None
+    try:
+        r = session.request(method, url, **kwargs)
+        event.record(r, kwargs)
+    except Exception as ex:
+        event.error = ex
+        raise
+    finally:
+        event.add_timing("network", time.perf_counter() - prepared)
+        event.elapsed = time.perf_counter() - event.start
+        metrics.dispatch_hook(hooks, "after_receive", event)
+
+    return r
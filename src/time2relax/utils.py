@@ -1,7 +1,16 @@
 """Utility methods that are used in time2relax."""
 
+import codecs
+import contextlib
 import functools
+import itertools
 import json
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from posixpath import join as urljoin
 
 from requests import compat
@@ -19,6 +28,9 @@ HTTP_EXCEPTIONS = {
     500: exceptions.ServerError,
 }
 
+#: Encoded document and attachment ids to keep, by least recent use
+ID_CACHE_SIZE = 4096
+
 JSON_QUERY_ARGS = (
     "end_key",
     "endkey",
@@ -27,6 +39,29 @@ JSON_QUERY_ARGS = (
     "startkey",
 )
 
+# The whitespace, and commas, between the items of a JSON array
+_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+
+
+def chunked(iterable, size):
+    """Yield lists of (at most) ``size`` items of an iterable.
+
+    Example::
+
+        >>> list(chunked('abcde', 2))
+        [['a', 'b'], ['c', 'd'], ['e']]
+
+    :param iterable: The items to split.
+    :param int size: The number of items in a list.
+    :rtype: iterator
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 def encode_uri_component(part: str) -> str:
     """Return an encoded URI component.
@@ -44,6 +79,7 @@ def encode_uri_component(part: str) -> str:
     return compat.quote(part, "~()*!.'")
 
 
+@functools.lru_cache(maxsize=ID_CACHE_SIZE)
 def encode_attachment_id(_id):
     """Return an encoded attachment id.
 
@@ -59,6 +95,7 @@ def encode_attachment_id(_id):
     return urljoin(*paths)
 
 
+@functools.lru_cache(maxsize=ID_CACHE_SIZE)
 def encode_document_id(_id):
     """Return an encoded document id.
 
@@ -116,6 +153,264 @@ def get_database_name(url):
     return name
 
 
+def get_size(data):
+    """Return the size in bytes of a body, or ``None`` if it is unknown.
+
+    :param data: Bytes, a memory-map, a file path or object, or an iterable of bytes.
+    :rtype: int
+    """
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    if isinstance(data, os.PathLike):
+        return os.path.getsize(data)
+    if isinstance(data, (bytes, bytearray, mmap.mmap)):
+        return len(data)
+    if isinstance(data, memoryview):
+        return data.nbytes
+
+    try:
+        return os.fstat(data.fileno()).st_size - data.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def imap_concurrent(func, iterable, concurrency):
+    """Yield ``func(item)`` of every item, called from ``concurrency`` threads.
+
+    Results are yielded in the order of the items, and at most ``concurrency``
+    calls are in flight (or waiting to be yielded) at once.
+
+    Example::
+
+        >>> list(imap_concurrent(len, ['a', 'bb', 'ccc'], 2))
+        [1, 2, 3]
+
+    :param function func: The function to call.
+    :param iterable: The items to call it with.
+    :param int concurrency: The number of threads.
+    :rtype: iterator
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = deque()
+        try:
+            for item in iterable:
+                if len(futures) >= concurrency:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(func, item))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def is_missing_database(ex):
+    """Return ``True`` if a 404 error is about the database, not a document.
+
+    :param exceptions.ResourceNotFound ex: The HTTP error.
+    :rtype: bool
+    """
+    message = ex.args[0] if ex.args else None
+    if not isinstance(message, dict):
+        return False
+
+    # CouchDB 1.x sends 'no_db_file', 2.x and later 'Database does not exist.'
+    return message.get("reason") in ("no_db_file", "Database does not exist.")
+
+
+def is_missing_endpoint(ex):
+    """Return ``True`` if an HTTP error means the server has no such endpoint.
+
+    :param exceptions.HTTPError ex: The HTTP error.
+    :rtype: bool
+    """
+    if isinstance(ex, exceptions.MethodNotAllowed):
+        return True
+    if isinstance(ex, exceptions.ResourceNotFound):
+        return not is_missing_database(ex)
+
+    message = ex.args[0] if ex.args else None
+    if not isinstance(message, dict):
+        return False
+
+    # CouchDB 1.x takes an unknown endpoint for a document id
+    return (
+        message.get("reason") == "Only reserved document ids may start with underscore."
+    )
+
+
+def is_replayable(kwargs):
+    """Return ``True`` if the body of a request can be sent again.
+
+    :param dict kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :rtype: bool
+    """
+    # A body that is read as it is sent can not be sent again
+    data = kwargs.get("data")
+    return (data is None) or isinstance(data, (bytes, str, dict))
+
+
+def iter_array(chunks, start=r"\[", name="array", header=None, trailer=None):
+    """Yield the items of a JSON array, as its chunks of bytes are read.
+
+    Only the unparsed part of the text is buffered, so memory is bounded by the
+    largest item rather than by the size of the array.
+
+    Example::
+
+        >>> list(iter_array([b'[{"a": 1}, ', b'{"a": 2}]']))
+        [{'a': 1}, {'a': 2}]
+
+    :param chunks: The iterable of bytes.
+    :param str start: (optional) The regular expression that ends before the first item.
+    :param str name: (optional) The name of the array, in errors.
+    :param function header: (optional) Called with the text before the array.
+    :param function trailer: (optional) Called with the text after the array,
+        once it is all read.
+    :rtype: iterator
+    """
+    array = re.compile(start)
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    started = False
+    # Wait for this much text before retrying an item that did not parse
+    wait = 0
+
+    # A last None retries the buffered text, however short
+    chunks = iter(chunks)
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is not None:
+            buf += text.decode(chunk)
+            if len(buf) < wait:
+                continue
+
+        pos = 0
+        if not started:
+            match = array.search(buf)
+            if not match:
+                continue
+            pos = match.end()
+            started = True
+            if header is not None:
+                header(buf[: match.start()])
+
+        # Parse from an index, and trim the buffer once per chunk
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            if buf[pos] == "]":
+                if trailer is not None:
+                    rest = [buf[pos + 1 :]]
+                    rest.extend(text.decode(c) for c in chunks)
+                    rest.append(text.decode(b"", final=True))
+                    trailer("".join(rest))
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # The item is incomplete, read more of it
+                wait = 2 * (len(buf) - pos)
+                break
+            pos = end
+            wait = 0
+            yield item
+        buf = buf[pos:]
+
+    raise ValueError(f"Unexpected end of the {name} array")
+
+
+def iter_chunks(data, chunk_size=1024 * 1024):
+    """Yield the bytes of a body in chunks, without reading all of it.
+
+    Example::
+
+        >>> list(iter_chunks(b'abcde', 2))
+        [b'ab', b'cd', b'e']
+
+    :param data: Bytes, a memory-map, a file path or object, or an iterable of bytes.
+    :param int chunk_size: (optional) The number of bytes in a chunk.
+    :rtype: iterator
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    if isinstance(data, os.PathLike):
+        with open(data, "rb") as fp:
+            yield from iter_chunks(fp, chunk_size)
+    elif hasattr(data, "read"):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+    elif isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+        view = memoryview(data)
+        for i in range(0, len(view), chunk_size):
+            yield bytes(view[i : i + chunk_size])
+    else:
+        yield from data
+
+
+def iter_progress(chunks, progress, total=None):
+    """Yield chunks of bytes, and report the progress after each one.
+
+    :param chunks: The iterable of bytes.
+    :param function progress: Called with ``(done, total, elapsed)``, the bytes
+        transferred, the total bytes (or ``None``) and the seconds elapsed.
+    :param int total: (optional) The total number of bytes.
+    :rtype: iterator
+    """
+    done = 0
+    start = time.monotonic()
+
+    for chunk in chunks:
+        yield chunk
+        done += len(chunk)
+        progress(done, total, time.monotonic() - start)
+
+
+def iter_rows(response, chunk_size=65536, name="rows", header=None, trailer=None):
+    """Yield the rows of a view (or ``_changes``) response, as they are read.
+
+    Only the unparsed part of the body is buffered, so memory is bounded by the
+    largest row rather than by the size of the response.
+
+    Example::
+
+        >>> r = db.request('GET', '_all_docs', stream=True)
+        >>> next(iter_rows(r))
+        {'id': 'docid', 'key': 'docid', 'value': {'rev': '1-7b80fc50b'}}
+
+    :param requests.Response response: A response sent with ``stream=True``.
+    :param int chunk_size: (optional) The number of bytes to read at a time.
+    :param str name: (optional) The name of the rows array.
+    :param function header: (optional) Called with the text before the rows.
+    :param function trailer: (optional) Called with the text after the rows.
+    :rtype: iterator
+    """
+    yield from iter_array(
+        response.iter_content(chunk_size),
+        rf'"{name}"\s*:\s*\[',
+        name,
+        header,
+        trailer,
+    )
+
+
+def open_writable(dest):
+    """Return a context manager of a writable file.
+
+    :param dest: A file path, or a writable file-like object (left open).
+    :rtype: contextlib.AbstractContextManager
+    """
+    if isinstance(dest, (str, os.PathLike)):
+        return open(dest, "wb")
+
+    return contextlib.nullcontext(dest)
+
+
 def query_method_kwargs(params):
     """Return a method and kwargs to handle a query.
 
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def make_response(mocker):
+    """Return a function that makes a mock :class:`requests.Response`.
+
+    A ``bytes`` body is sent as is (e.g. the lines of a continuous feed), any
+    other body is encoded as JSON.
+    """
+
+    def _make_response(status_code=200, body=None, headers=None):
+        response = mocker.Mock(status_code=status_code)
+        response.headers = dict(headers or {})
+        response.request.body = None
+        if body is None or isinstance(body, bytes):
+            response.content = body or b""
+            response.json.side_effect = ValueError
+        else:
+            response.content = json.dumps(body, separators=(",", ":")).encode()
+            response.json.return_value = body
+        response.iter_content.return_value = [response.content]
+        response.iter_lines.return_value = response.content.splitlines()
+        return response
+
+    return _make_response
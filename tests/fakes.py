@@ -0,0 +1,34 @@
+"""Fake responses and databases, shared by the tests."""
+
+import json
+import threading
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+class FakeResponse:
+    """A response with a decoded JSON body."""
+
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.data).encode()
+
+    def close(self):
+        pass
+
+
+class BaseFakeDB:
+    """A database in memory, for the helpers that only call its API methods."""
+
+    url = TEST_URL
+    codec = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests import Request
+
+from time2relax.adapters import PoolAdapter
+from time2relax.models import CouchDB
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_adapter_prewarm(server_url):
+    adapter = PoolAdapter(pool_maxsize=4)
+    adapter.prewarm(server_url, 10)
+    assert adapter.pool_stats() == {
+        "in_use": 0,
+        "idle": 4,
+        "created": 4,
+        "discarded": 0,
+    }
+
+
+def test_pool_adapter_discarded(server_url):
+    adapter = PoolAdapter(pool_maxsize=1)
+    pool = adapter.get_connection_with_tls_context(
+        Request("GET", server_url).prepare(), True
+    )
+    conns = [pool._get_conn() for _ in range(3)]
+    assert adapter.pool_stats()["in_use"] == 3
+    for conn in conns:
+        pool._put_conn(conn)
+    assert adapter.pool_stats() == {
+        "in_use": 0,
+        "idle": 1,
+        "created": 3,
+        "discarded": 2,
+    }
+
+
+def test_couchdb_pool(server_url):
+    db = CouchDB(f"{server_url}/foobar", create_db=False, pool_maxsize=2, prewarm=2)
+    assert db.session.get_adapter(db.url) is db.adapter
+    assert db.pool_stats()["idle"] == 2
+
+    # Requests reuse the pre-warmed connections
+    for _ in range(3):
+        db.info()
+    assert db.pool_stats()["created"] == 2
+
+    db = CouchDB(f"{server_url}/foobar", keep_alive=False)
+    assert db.session.headers["Connection"] == "close"
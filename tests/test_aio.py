@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from time2relax import exceptions
+from time2relax.aio import AsyncCouchDB, httpx_kwargs, request
+from time2relax.models import DATABASES
+
+httpx = pytest.importorskip("httpx")
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+def make_client(handler, calls):
+    def _handler(r):
+        calls.append((r.method, str(r.url)))
+        return handler(r)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+
+
+def test_async_couchdb():
+    db = AsyncCouchDB(TEST_URL, create_db=False)
+    assert db.url == TEST_URL
+    assert repr(db) == f"<AsyncCouchDB [{TEST_URL}]>"
+
+
+def test_async_couchdb_shared_client():
+    calls = []
+
+    async def handler(r):
+        # A file body is streamed, not read into memory first
+        assert "Content-Length" not in r.headers
+        body = await r.aread()
+        return httpx.Response(
+            201, json={"accept": r.headers["Accept"], "body": len(body)}
+        )
+
+    async def main():
+        client = make_client(handler, calls)
+        db = AsyncCouchDB(TEST_URL, create_db=False, client=client)
+        r = await db.request("PUT", "docid/att", data=io.BytesIO(b"x" * 100000))
+        assert r.json() == {"accept": "application/json", "body": 100000}
+        r = await db.request("GET", "docid", headers={"accept": "multipart/related"})
+        assert r.json()["accept"] == "multipart/related"
+        # The headers of the caller's client are left alone
+        assert client.headers["Accept"] == "*/*"
+
+    asyncio.run(main())
+
+
+def test_async_couchdb_create_db():
+    calls = []
+
+    def handler(r):
+        if r.method == "HEAD":
+            return httpx.Response(404)
+        return httpx.Response(201, json={"ok": True})
+
+    DATABASES.discard(TEST_URL)
+
+    async def main():
+        db = AsyncCouchDB(TEST_URL, client=make_client(handler, calls))
+        async with db:
+            await asyncio.gather(*[db.info() for _ in range(5)])
+
+    asyncio.run(main())
+    assert calls[:2] == [("HEAD", TEST_URL), ("PUT", TEST_URL)]
+    assert calls[2:] == [("GET", TEST_URL)] * 5
+
+
+def test_async_couchdb_insert():
+    calls = []
+
+    def handler(r):
+        assert json.loads(r.content) == {"_id": "some+id"}
+        return httpx.Response(201, json={"ok": True})
+
+    async def main():
+        db = AsyncCouchDB(TEST_URL, create_db=False, client=make_client(handler, calls))
+        async with db:
+            return await db.insert({"_id": "some+id"})
+
+    r = asyncio.run(main())
+    assert r.json() == {"ok": True}
+    assert calls == [("PUT", f"{TEST_URL}/some%2Bid")]
+
+
+def test_request_raise_exception():
+    calls = []
+
+    async def main():
+        client = make_client(lambda r: httpx.Response(409, json={"error": "x"}), calls)
+        async with client:
+            await request(client, TEST_URL, "GET", "docid", params={"conflicts": True})
+
+    with pytest.raises(exceptions.ResourceConflict):
+        asyncio.run(main())
+    assert calls == [("GET", f"{TEST_URL}/docid?conflicts=true")]
+
+
+def test_httpx_kwargs():
+    assert httpx_kwargs({"json": {}, "stream": True}) == {"json": {}}
+    assert httpx_kwargs({"allow_redirects": False}) == {"follow_redirects": False}
+    assert httpx_kwargs({"params": {"a": 1, "b": None}}) == {"params": {"a": 1}}
+    assert httpx_kwargs({"data": {"a": "b"}}) == {"data": {"a": "b"}}
+    assert httpx_kwargs({"data": "Zm9v"}) == {"content": b"Zm9v"}
+
+
+def test_async_couchdb_codec():
+    calls = []
+
+    def handler(r):
+        assert r.content == b'{"_id":"a"}'
+        assert r.headers["Content-Type"] == "application/json"
+        return httpx.Response(201, content=b'{"ok":true}')
+
+    async def main():
+        client = make_client(handler, calls)
+        db = AsyncCouchDB(TEST_URL, create_db=False, client=client, codec="json")
+        async with db:
+            return await db.insert({"_id": "a"})
+
+    assert asyncio.run(main()).json() == {"ok": True}
@@ -0,0 +1,109 @@
+import pytest
+
+from time2relax import exceptions
+from time2relax.bulk import BulkWriter
+from time2relax.codec import JSONCodec
+from time2relax.models import CouchDB
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+def bulk_docs_ok(docs, **kwargs):
+    response = type("Response", (), {})()
+    response.json = lambda: [
+        {"ok": True, "id": doc["_id"], "rev": "1-abc"} for doc in docs
+    ]
+    return response
+
+
+def test_bulk_writer_max_docs(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    mock_bulk_docs = mocker.patch.object(db, "bulk_docs", side_effect=bulk_docs_ok)
+
+    with BulkWriter(db, max_docs=2, max_latency=60) as writer:
+        futures = [writer.insert({"_id": str(i)}) for i in range(4)]
+        assert futures[1].result(timeout=5) == {"ok": True, "id": "1", "rev": "1-abc"}
+        assert futures[3].result(timeout=5) == {"ok": True, "id": "3", "rev": "1-abc"}
+
+    assert mock_bulk_docs.call_count == 2
+    mock_bulk_docs.assert_called_with([{"_id": "2"}, {"_id": "3"}])
+
+
+def test_bulk_writer_max_latency(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    mocker.patch.object(db, "bulk_docs", side_effect=bulk_docs_ok)
+
+    with BulkWriter(db, max_latency=0.01) as writer:
+        future = writer.remove("foo", "1-xyz")
+        assert future.result(timeout=5)["id"] == "foo"
+
+
+def test_bulk_writer_flush(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    mock_bulk_docs = mocker.patch.object(db, "bulk_docs", side_effect=bulk_docs_ok)
+
+    writer = db.bulk_writer(max_latency=60, max_bytes=1024, json={"all": 1})
+    writer.insert({"_id": "a"})
+    writer.update({"_id": "b", "_rev": "1-abc"})
+    writer.flush()
+    mock_bulk_docs.assert_called_once_with(
+        [{"_id": "a"}, {"_id": "b", "_rev": "1-abc"}], json={"all": 1}
+    )
+
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.insert({})
+    with pytest.raises(ValueError):
+        writer.update({"_id": "a"})
+
+
+def test_bulk_writer_raise_exception(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    mocker.patch.object(db, "bulk_docs", side_effect=exceptions.ServerError())
+
+    with BulkWriter(db) as writer:
+        future = writer.insert({})
+    with pytest.raises(exceptions.ServerError):
+        future.result(timeout=5)
+
+
+def test_bulk_writer_new_edits(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    response = mocker.Mock()
+    response.json.return_value = [{"id": "b", "error": "forbidden", "reason": "x"}]
+    mocker.patch.object(db, "bulk_docs", return_value=response)
+
+    with BulkWriter(db, json={"new_edits": False}) as writer:
+        a = writer.insert({"_id": "a", "_rev": "1-a"})
+        b = writer.insert({"_id": "b", "_rev": "1-b"})
+
+    assert a.result() == {"ok": True, "id": "a", "rev": "1-a"}
+    assert b.result() == {"id": "b", "error": "forbidden", "reason": "x"}
+
+
+def test_bulk_writer_max_bytes(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    mock_bulk_docs = mocker.patch.object(db, "bulk_docs", side_effect=bulk_docs_ok)
+
+    # The encoded bytes (\u00e9 escapes), and a separator
+    doc = {"_id": "é" * 10}
+    size = len(JSONCodec().dumps(doc)) + 1
+    with BulkWriter(db, max_bytes=size * 2 + 1, max_latency=60) as writer:
+        for _ in range(5):
+            writer.insert(dict(doc))
+        writer.insert({"_id": "big", "title": "x" * size * 3})
+
+    batches = [len(c.args[0]) for c in mock_bulk_docs.call_args_list]
+    assert batches == [2, 2, 1, 1]
+
+
+def test_bulk_writer_bad_response(mocker):
+    db = CouchDB(TEST_URL, create_db=False)
+    response = mocker.Mock()
+    response.json.return_value = None
+    mocker.patch.object(db, "bulk_docs", return_value=response)
+
+    with BulkWriter(db) as writer:
+        future = writer.insert({"_id": "a"})
+    with pytest.raises(TypeError):
+        future.result(timeout=5)
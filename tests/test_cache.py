@@ -0,0 +1,113 @@
+from requests import Session
+
+from time2relax.cache import DocumentCache
+from time2relax.models import CouchDB
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+HEADERS = {"ETag": '"1-abc"'}
+
+
+def test_document_cache():
+    cache = DocumentCache(maxsize=3)
+    for key in ((TEST_URL, "a"), (TEST_URL, "b"), (TEST_URL, "c"), ("other", "a")):
+        cache.store(key, type("Response", (), {"headers": {"ETag": key[1]}})())
+    assert cache.lookup((TEST_URL, "a")) is None
+    assert cache.lookup((TEST_URL, "b"))[1:] == ("b", False)
+    cache.invalidate((TEST_URL, "b"), (TEST_URL, "x"))
+    assert len(cache) == 2
+    cache.clear(TEST_URL)
+    assert list(cache._entries) == [("other", "a")]
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 4, "revalidations": 0, "size": 0}
+
+
+def test_couchdb_get_cache(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    cached = make_response(headers=HEADERS)
+    mock_request.side_effect = [cached, make_response(304, headers=HEADERS)]
+
+    db = CouchDB(TEST_URL, create_db=False, cache=DocumentCache())
+    assert db.get("some+id") is cached
+    assert db.get("some+id") is cached
+    mock_request.assert_called_with(
+        db.session,
+        "GET",
+        f"{TEST_URL}/some%2Bid",
+        headers={"If-None-Match": '"1-abc"'},
+    )
+    assert db.cache.stats() == {"hits": 0, "misses": 1, "revalidations": 1, "size": 1}
+
+    # Reads with options are not cached
+    mock_request.side_effect = None
+    mock_request.return_value = make_response(headers=HEADERS)
+    db.get("some+id", params={"rev": "1-abc"})
+    assert db.cache.stats()["misses"] == 1
+
+
+def test_couchdb_get_cache_ttl(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = make_response(headers=HEADERS)
+
+    db = CouchDB(TEST_URL, create_db=False, cache=DocumentCache(ttl=60))
+    first = db.get("docid")
+    assert db.get("docid") is first
+    assert mock_request.call_count == 1
+    assert db.cache.stats()["hits"] == 1
+
+
+def test_couchdb_cache_invalidate(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = make_response(201, headers=HEADERS)
+
+    db = CouchDB(TEST_URL, create_db=False, cache=DocumentCache())
+    for doc_id in ("a", "b", "c", "d", "_design/e", "f"):
+        db.get(doc_id)
+    assert len(db.cache) == 6
+
+    db.insert({"_id": "a"})
+    db.remove("b", "1-abc")
+    db.bulk_docs([{"_id": "c"}, {"title": "new"}])
+    db.remove_att("_design/e", "1-abc", "att.txt")
+    db.compact()
+    assert sorted(db.cache._entries) == [(TEST_URL, "d"), (TEST_URL, "f")]
+
+    db.destroy()
+    assert len(db.cache) == 0
+
+
+def test_couchdb_cache_shared(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = [
+        make_response(headers=HEADERS),
+        make_response(headers=HEADERS),
+        make_response(201, headers=HEADERS),
+        make_response(201, headers=HEADERS),
+    ]
+
+    # The same document id in two databases is two documents
+    cache = DocumentCache(ttl=60)
+    db = CouchDB(TEST_URL, create_db=False, cache=cache)
+    other = CouchDB("http://couchdb:5984/other", create_db=False, cache=cache)
+    assert db.get("docid") is not other.get("docid")
+    assert mock_request.call_count == 2
+
+    other.insert({"_id": "docid"})
+    assert list(cache._entries) == [(TEST_URL, "docid")]
+    other.destroy()
+    assert len(cache) == 1
+
+
+def test_couchdb_cache_invalidate_after_write(mocker, make_response):
+    db = CouchDB(TEST_URL, create_db=False, cache=DocumentCache(ttl=60))
+    old = make_response(headers=HEADERS)
+
+    def request(session, method, url, **kwargs):
+        # A concurrent read caches the old body while the write is in flight
+        if method == "PUT":
+            db.cache.store((TEST_URL, "a"), old)
+        return make_response(201, headers={"ETag": '"2-abc"'})
+
+    mocker.patch.object(Session, "request", autospec=True, side_effect=request)
+    db.insert({"_id": "a"})
+    assert db.get("a") is not old
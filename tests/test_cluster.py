@@ -0,0 +1,119 @@
+import pytest
+from requests import ConnectionError, Session
+
+from time2relax import exceptions
+from time2relax.cluster import CouchCluster
+
+URLS = [
+    "http://node1:5984/foobar",
+    "http://node2:5984/foobar",
+    "http://node3:5984/foobar",
+]
+
+
+def make_cluster(**kwargs):
+    return CouchCluster(URLS, create_db=False, health_interval=None, **kwargs)
+
+
+def test_couch_cluster():
+    cluster = make_cluster()
+    assert [node.db.url for node in cluster.nodes] == URLS
+    assert len({id(node.db.session) for node in cluster.nodes}) == 3
+    assert repr(cluster) == "<CouchCluster [3 x foobar]>"
+
+
+def test_couch_cluster_raise_exception():
+    with pytest.raises(ValueError):
+        CouchCluster([])
+    with pytest.raises(ValueError):
+        make_cluster(balance="random")
+    with pytest.raises(ValueError):
+        CouchCluster([URLS[0], "http://node2:5984/other"], health_interval=None)
+
+
+@pytest.mark.parametrize("balance", ["least_outstanding", "latency"])
+def test_couch_cluster_reads(mocker, balance):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    cluster = make_cluster(balance=balance)
+
+    for _ in range(60):
+        cluster.get("docid")
+    cluster.find({"year": 2010})
+
+    hosts = {call.args[2].split("/")[2] for call in mock_request.call_args_list}
+    assert hosts == {"node1:5984", "node2:5984", "node3:5984"}
+    assert sum(s["requests"] for s in cluster.stats().values()) == 61
+
+
+def test_couch_cluster_writes(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 201
+    cluster = make_cluster()
+
+    cluster.insert({"title": "Heroes"})
+    cluster.bulk_docs([{"_id": "a"}])
+    urls = [call.args[2] for call in mock_request.call_args_list]
+    assert urls == [URLS[0], f"{URLS[0]}/_bulk_docs"]
+
+
+def test_couch_cluster_failover(mocker):
+    def request(session, method, url, **kwargs):
+        if "node1" in url:
+            raise ConnectionError("down")
+        return mocker.Mock(status_code=200)
+
+    mock_request = mocker.patch.object(
+        Session, "request", autospec=True, side_effect=request
+    )
+    cluster = make_cluster()
+
+    # An idempotent write fails over to the next node
+    cluster.insert({"_id": "a"})
+    assert [c.args[2] for c in mock_request.call_args_list] == [
+        f"{URLS[0]}/a",
+        f"{URLS[1]}/a",
+    ]
+    assert not cluster.nodes[0].healthy
+
+    # The node is skipped until it recovers
+    cluster.insert({"title": "Heroes"})
+    assert mock_request.call_args.args[2] == URLS[1]
+
+
+def test_couch_cluster_failover_not_idempotent(mocker):
+    mock_request = mocker.patch.object(
+        Session, "request", autospec=True, side_effect=ConnectionError("down")
+    )
+    cluster = make_cluster()
+
+    with pytest.raises(ConnectionError):
+        cluster.insert({"title": "Heroes"})
+    assert mock_request.call_count == 1
+
+
+def test_couch_cluster_failover_status(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = [
+        mocker.Mock(status_code=503),
+        mocker.Mock(status_code=404),
+    ]
+    cluster = make_cluster(balance="latency")
+
+    with pytest.raises(exceptions.ResourceNotFound):
+        cluster.get("docid")
+    assert mock_request.call_count == 2
+
+
+def test_couch_cluster_check_health(mocker):
+    def request(session, method, url, **kwargs):
+        assert url.endswith("/_up")
+        return mocker.Mock(status_code=503 if "node2" in url else 200)
+
+    mocker.patch.object(Session, "request", autospec=True, side_effect=request)
+    cluster = make_cluster()
+    cluster.nodes[0].mark_down(60)
+
+    assert cluster.check_health() == {URLS[0]: True, URLS[1]: False, URLS[2]: True}
+    assert [node.healthy for node in cluster.nodes] == [True, False, True]
+    cluster.close()
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from requests import Session
+
+from time2relax.codec import JSONCodec, OrjsonCodec, encode_body, get_codec
+from time2relax.models import CouchDB
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+def test_get_codec():
+    assert get_codec(None) is None
+    assert isinstance(get_codec("json"), JSONCodec)
+    assert isinstance(get_codec("orjson"), OrjsonCodec)
+    assert get_codec(json) is json
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+    with pytest.raises(TypeError):
+        get_codec(object())
+
+
+@pytest.mark.parametrize("codec", [JSONCodec(), OrjsonCodec()])
+def test_codec(codec):
+    data = codec.dumps({"_id": "a", "n": [1, 2.5, None, True]})
+    assert data == b'{"_id":"a","n":[1,2.5,null,true]}'
+    assert codec.loads(data) == {"_id": "a", "n": [1, 2.5, None, True]}
+
+
+def test_encode_body():
+    kwargs = {"json": {"a": 1}, "headers": {"X-Foo": "bar"}}
+    assert encode_body(json, kwargs) == {
+        "data": b'{"a": 1}',
+        "headers": {"X-Foo": "bar", "Content-Type": "application/json"},
+    }
+    assert kwargs == {"json": {"a": 1}, "headers": {"X-Foo": "bar"}}
+    assert encode_body(json, {"params": {"a": 1}}) == {"params": {"a": 1}}
+
+
+def test_couchdb_codec(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 201
+    mock_request.return_value.content = b'{"ok":true,"id":"a","rev":"1-abc"}'
+
+    db = CouchDB(TEST_URL, create_db=False, codec="orjson")
+    r = db.bulk_docs([{"_id": "a"}])
+    assert r.json() == {"ok": True, "id": "a", "rev": "1-abc"}
+    mock_request.assert_called_once_with(
+        db.session,
+        "POST",
+        f"{TEST_URL}/_bulk_docs",
+        data=b'{"docs":[{"_id":"a"}]}',
+        headers={"Content-Type": "application/json"},
+    )
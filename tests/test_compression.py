@@ -0,0 +1,110 @@
+import gzip
+import io
+import json
+
+import pytest
+import requests
+from requests import Response, Session
+from urllib3 import HTTPResponse
+
+from time2relax import CouchDB
+from time2relax.compression import GzipCompressor
+from time2relax.retry import RetryPolicy
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+DOCS = [{"_id": f"doc{i:04}", "title": "Heroes"} for i in range(100)]
+
+
+def test_gzip_compressor():
+    compressor = GzipCompressor(threshold=100)
+    kwargs = compressor.compress({"json": {"docs": DOCS}, "params": {"w": 2}})
+    assert kwargs["params"] == {"w": 2}
+    assert kwargs["headers"] == {
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+    }
+    assert json.loads(gzip.decompress(kwargs["data"])) == {"docs": DOCS}
+
+    stats = compressor.stats()
+    assert (stats["compressed"], stats["skipped"]) == (1, 0)
+    assert stats["bytes_out"] == len(kwargs["data"])
+    assert stats["ratio"] > 5
+    assert stats["cpu_time"] >= 0
+
+
+def test_gzip_compressor_skipped():
+    compressor = GzipCompressor(threshold=100)
+
+    kwargs = compressor.compress({"json": {"_id": "a"}})
+    assert kwargs["data"] == b'{"_id":"a"}'
+    assert "Content-Encoding" not in kwargs["headers"]
+
+    # Attachments, and encoded bodies, are sent as they are
+    data = b"x" * 1000
+    kwargs = {"data": data, "headers": {"Content-Type": "image/png"}}
+    assert compressor.compress(kwargs) is kwargs
+    kwargs = {"data": data, "headers": {"Content-Encoding": "br"}}
+    assert compressor.compress(kwargs) is kwargs
+
+    assert compressor.stats()["skipped"] == 1
+    assert compressor.stats()["ratio"] is None
+
+
+def test_gzip_compressor_raise_exception():
+    with pytest.raises(ValueError):
+        GzipCompressor(level=10)
+
+
+def test_gzip_compressor_record():
+    body = json.dumps({"rows": DOCS}).encode()
+    compressed = gzip.compress(body)
+    response = Response()
+    response.status_code = 200
+    response.headers["Content-Encoding"] = "gzip"
+    response.raw = HTTPResponse(
+        io.BytesIO(compressed),
+        headers={"Content-Encoding": "gzip"},
+        preload_content=False,
+    )
+
+    compressor = GzipCompressor()
+    compressor.record(response, {})
+    stats = compressor.stats()
+    assert stats["responses"] == 1
+    assert stats["response_bytes_in"] == len(compressed)
+    assert stats["response_bytes_out"] == len(body)
+    assert stats["response_ratio"] > 5
+
+
+def test_couchdb_compression(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = mocker.Mock(status_code=201, headers={})
+    db = CouchDB(TEST_URL, create_db=False, compression=True)
+
+    db.bulk_docs(DOCS)
+    kwargs = mock_request.call_args.kwargs
+    assert kwargs["headers"]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(kwargs["data"])) == {"docs": DOCS}
+    assert db.compression.stats()["compressed"] == 1
+
+
+def test_couchdb_compression_retry(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = requests.exceptions.ConnectionError()
+    policy = RetryPolicy(max_retries=3)
+    policy.sleep = lambda seconds: None
+    db = CouchDB(TEST_URL, create_db=False, compression=True, retry=policy)
+
+    # Documents without an '_id' are not retried, compressed or not
+    with pytest.raises(requests.exceptions.ConnectionError):
+        db.bulk_docs([{"title": "Heroes"}] * 100)
+    assert mock_request.call_count == 1
+    assert mock_request.call_args.kwargs["headers"]["Content-Encoding"] == "gzip"
+
+    # The body is compressed once, and sent again as is
+    mock_request.reset_mock()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        db.bulk_docs(DOCS)
+    assert mock_request.call_count == 4
+    assert db.compression.stats()["compressed"] == 2
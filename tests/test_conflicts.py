@@ -0,0 +1,144 @@
+import pytest
+
+from tests.fakes import BaseFakeDB, FakeResponse
+from time2relax import CouchDB
+from time2relax.conflicts import ConflictSweeper
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+class FakeDB(BaseFakeDB):
+    def __init__(self, count=10):
+        super().__init__()
+        # Every even document has a conflict, doc0000 has two
+        self.leaves = {}
+        for i in range(count):
+            doc_id = f"doc{i:04}"
+            revs = ["2-b", "2-a"] if i % 2 == 0 else ["1-a"]
+            if i == 0:
+                revs.append("1-c")
+            self.leaves[doc_id] = {
+                rev: {"_id": doc_id, "_rev": rev, "tags": [rev]} for rev in revs
+            }
+        self.written = []
+        self.fetched = []
+
+    def _row(self, doc_id):
+        revs = list(self.leaves[doc_id])
+        doc = dict(self.leaves[doc_id][revs[0]])
+        if len(revs) > 1:
+            doc["_conflicts"] = revs[1:]
+        return {"id": doc_id, "key": doc_id, "doc": doc}
+
+    def all_docs(self, params=None):
+        assert params["conflicts"] and params["include_docs"]
+        ids = sorted(i for i in self.leaves if i >= params.get("startkey", ""))
+        return FakeResponse({"rows": [self._row(i) for i in ids[: params["limit"]]]})
+
+    def ddoc_view(self, ddoc_id, func_id, params=None):
+        assert (ddoc_id, func_id) == ("conflicts", "all")
+        rows = [
+            {"id": i, "key": i, "value": list(revs)}
+            for i, revs in sorted(self.leaves.items())
+            if len(revs) > 1
+        ]
+        return FakeResponse({"rows": rows})
+
+    def request(self, method, path, **kwargs):
+        assert path == "_changes"
+        assert kwargs["params"]["conflicts"] is True
+        results = [
+            dict(self._row(i), seq=n, changes=[])
+            for n, i in enumerate(sorted(self.leaves))
+        ]
+        return FakeResponse({"results": results, "last_seq": len(results)})
+
+    def bulk_get(self, docs):
+        with self.lock:
+            self.fetched.extend(docs)
+        for doc in docs:
+            yield {
+                "id": doc["id"],
+                "docs": [{"ok": self.leaves[doc["id"]][doc["rev"]]}],
+            }
+
+    def bulk_docs(self, docs):
+        with self.lock:
+            self.written.append(docs)
+        results = []
+        for doc in docs:
+            if doc["_id"] == "doc0004":
+                results.append({"id": doc["_id"], "error": "conflict"})
+            else:
+                results.append({"id": doc["_id"], "ok": True, "rev": "3-x"})
+        return FakeResponse(results)
+
+
+def merge_tags(revs):
+    return dict(revs[0], tags=sorted({t for rev in revs for t in rev["tags"]}))
+
+
+@pytest.mark.parametrize("source", ["all_docs", "changes"])
+def test_conflict_sweeper(source):
+    db = FakeDB()
+    progress = []
+    sweeper = ConflictSweeper(
+        db,
+        merge_tags,
+        source=source,
+        batch_size=2,
+        page_size=3,
+        progress=progress.append,
+    )
+
+    stats = sweeper.run()
+    assert stats["conflicted"] == 5
+    assert (stats["resolved"], stats["errors"], stats["skipped"]) == (4, 1, 0)
+    assert stats["revisions_deleted"] == 5
+    assert progress[-1]["conflicted"] == 5
+
+    # The winners were read with the listing, only the losers are fetched
+    assert all(doc["rev"] != "2-b" for doc in db.fetched)
+    # One _bulk_docs request per batch
+    assert len(db.written) == 3
+    docs = [doc for batch in db.written for doc in batch if doc["_id"] == "doc0000"]
+    assert docs == [
+        {"_id": "doc0000", "_rev": "2-b", "tags": ["1-c", "2-a", "2-b"]},
+        {"_id": "doc0000", "_rev": "2-a", "_deleted": True},
+        {"_id": "doc0000", "_rev": "1-c", "_deleted": True},
+    ]
+
+
+def test_conflict_sweeper_view():
+    db = FakeDB()
+    stats = ConflictSweeper(db, source="view", ddoc_id="conflicts", func_id="all").run()
+    assert (stats["conflicted"], stats["resolved"]) == (5, 4)
+
+    # Every leaf is fetched, and the default merge keeps the winner
+    assert {"id": "doc0002", "rev": "2-b"} in db.fetched
+    written = [doc for batch in db.written for doc in batch]
+    assert all(doc["_deleted"] for doc in written)
+
+
+def test_conflict_sweeper_skipped():
+    db = FakeDB()
+    stats = ConflictSweeper(db, lambda revs: None).run()
+    assert (stats["conflicted"], stats["resolved"], stats["skipped"]) == (5, 0, 5)
+    assert db.written == []
+
+
+def test_conflict_sweeper_raise_exception():
+    with pytest.raises(ValueError):
+        ConflictSweeper(FakeDB(), source="_conflicts")
+    with pytest.raises(ValueError):
+        ConflictSweeper(FakeDB(), source="view")
+    with pytest.raises(ValueError):
+        ConflictSweeper(FakeDB(), concurrency=0)
+    assert repr(ConflictSweeper(FakeDB())) == f"<ConflictSweeper [{TEST_URL}]>"
+
+
+def test_couchdb_sweep_conflicts(mocker):
+    run = mocker.patch.object(ConflictSweeper, "run", return_value={"resolved": 1})
+    db = CouchDB(TEST_URL, create_db=False)
+    assert db.sweep_conflicts(merge_tags, concurrency=8) == {"resolved": 1}
+    run.assert_called_once_with()
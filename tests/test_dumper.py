@@ -0,0 +1,117 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from tests.fakes import BaseFakeDB, FakeResponse
+from time2relax import __main__ as cli
+from time2relax.dumper import dump, sample_split_points
+
+DOCS = [{"_id": f"doc{i:04}", "_rev": "1-a", "n": i} for i in range(50)]
+
+
+class FakeDB(BaseFakeDB):
+    def __init__(self, docs=DOCS):
+        super().__init__()
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.requests = []
+
+    def info(self):
+        return FakeResponse({"doc_count": len(self.docs)})
+
+    def all_docs(self, params=None):
+        params = dict(params or {})
+        with self.lock:
+            self.requests.append(params)
+
+        ids = sorted(self.docs)
+        if "startkey" in params:
+            ids = [i for i in ids if i >= params["startkey"]]
+        if "endkey" in params:
+            assert params["inclusive_end"] is False
+            ids = [i for i in ids if i < params["endkey"]]
+        ids = ids[params.get("skip", 0) :][: params.get("limit")]
+
+        rows = [{"id": i, "key": i, "value": {"rev": "1-a"}} for i in ids]
+        if params.get("include_docs"):
+            for row in rows:
+                row["doc"] = self.docs[row["id"]]
+        return FakeResponse({"rows": rows})
+
+
+def test_sample_split_points():
+    db = FakeDB()
+    assert sample_split_points(db, 4) == ["doc0012", "doc0025", "doc0037"]
+    assert [r["limit"] for r in db.requests] == [1, 1, 1]
+
+    assert sample_split_points(db, 1) == []
+    assert sample_split_points(FakeDB(DOCS[:2]), 4) == []
+
+
+@pytest.mark.parametrize("partitions", [1, 3, 8])
+def test_dump(partitions):
+    db = FakeDB()
+    out = io.BytesIO()
+    progress = []
+
+    stats = dump(db, out, partitions, page_size=4, progress=progress.append)
+
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == DOCS
+    assert (stats["docs"], stats["partitions"]) == (50, partitions)
+    assert stats["bytes"] == len(out.getvalue())
+    assert progress[-1]["docs"] == 50
+    # Every page asks for one more document, and never for a whole range
+    assert {r["limit"] for r in db.requests if r.get("include_docs")} == {5}
+
+
+def test_dump_split_points(tmp_path):
+    db = FakeDB()
+    stats = dump(
+        db,
+        tmp_path / "dump-{partition}.ndjson.gz",
+        split_points=["doc0030", "doc0010"],
+        attachments=True,
+    )
+    assert (stats["docs"], stats["partitions"]) == (50, 3)
+    assert not any(r.get("skip") for r in db.requests)
+    assert all(r["attachments"] for r in db.requests)
+
+    parts = [
+        [json.loads(line) for line in gzip.decompress(path.read_bytes()).splitlines()]
+        for path in sorted(tmp_path.iterdir())
+    ]
+    assert [len(docs) for docs in parts] == [10, 20, 20]
+    assert sum(parts, []) == DOCS
+
+
+def test_dump_gzip(tmp_path):
+    path = tmp_path / "dump.ndjson.gz"
+    dump(FakeDB(), path, partitions=4)
+    assert [json.loads(line) for line in gzip.open(path)] == DOCS
+    # The partitions were spooled next to it, and removed
+    assert list(tmp_path.iterdir()) == [path]
+
+    out = io.BytesIO()
+    dump(FakeDB(), out, partitions=2, compress=True)
+    assert [
+        json.loads(line) for line in gzip.decompress(out.getvalue()).splitlines()
+    ] == DOCS
+
+
+def test_dump_raise_exception():
+    with pytest.raises(ValueError):
+        dump(FakeDB(), io.BytesIO(), partitions=0)
+
+
+def test_cli_dump(mocker, tmp_path, capsys):
+    path = tmp_path / "dump.ndjson"
+    db = FakeDB()
+    db.session = mocker.MagicMock()
+    mocker.patch.object(cli, "CouchDB", return_value=db)
+
+    argv = ["dump", db.url, str(path), "--split-point", "doc0025", "--gzip"]
+    assert cli.main(argv) == 0
+    cli.CouchDB.assert_called_once_with(db.url, create_db=False, codec=None)
+    assert [json.loads(line) for line in gzip.open(path)] == DOCS
+    assert json.loads(capsys.readouterr().out)["partitions"] == 2
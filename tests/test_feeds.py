@@ -0,0 +1,108 @@
+import json
+
+import pytest
+import requests
+
+from time2relax import exceptions
+from time2relax.feeds import ChangesFeed
+
+
+def test_changes_feed_normal(mocker, make_response):
+    db = mocker.Mock(codec=None)
+    body = {"results": [{"seq": "1-a", "id": "a"}, {"seq": "2-b", "id": "b"}]}
+    db.request.return_value = make_response(body=body)
+
+    feed = ChangesFeed(db, since="0", include_docs=True, params={"selector": {}})
+    assert [c["id"] for c in feed] == ["a", "b"]
+    assert feed.last_seq == "2-b"
+    db.request.assert_called_once_with(
+        "POST",
+        "_changes",
+        params={
+            "feed": "normal",
+            "since": "0",
+            "include_docs": True,
+            "filter": "_selector",
+        },
+        json={"selector": {}},
+        stream=True,
+    )
+
+
+def test_changes_feed_last_seq(mocker, make_response):
+    db = mocker.Mock(codec=None)
+    # The server filtered out the changes after 2-b
+    body = {"results": [{"seq": "1-a", "id": "a"}, {"seq": "2-b", "id": "b"}]}
+    body.update(last_seq="9-z", pending=0)
+    db.request.return_value = make_response(body=body)
+
+    feed = ChangesFeed(db, params={"filter": "app/important"})
+    assert [c["id"] for c in feed] == ["a", "b"]
+    assert feed.last_seq == "9-z"
+
+
+def test_changes_feed_codec(mocker, make_response):
+    db = mocker.Mock(codec=mocker.Mock())
+    db.codec.loads.side_effect = json.loads
+    db.request.return_value = make_response(body=b'{"seq":"1-a"}')
+
+    feed = ChangesFeed(db, feed="continuous", reconnect=False)
+    assert [c["seq"] for c in feed] == ["1-a"]
+    db.codec.loads.assert_called_once_with(b'{"seq":"1-a"}')
+
+
+def test_changes_feed_continuous(mocker, make_response):
+    db = mocker.Mock(codec=None)
+    db.request.side_effect = [
+        make_response(body=b'{"seq":"1-a","id":"a"}\n\n{"last_seq":"3"}'),
+        requests.exceptions.ConnectionError(),
+        make_response(body=b'{"seq":"4-c","id":"c"}\n{"seq":"5-d"}'),
+    ]
+    mocker.patch("time.sleep")
+
+    feed = ChangesFeed(db, feed="continuous", limit=2, heartbeat=1000)
+    assert [c["seq"] for c in feed] == ["1-a", "4-c"]
+
+    params = [call.kwargs["params"] for call in db.request.call_args_list]
+    assert params[0] == {"feed": "continuous", "limit": 2, "heartbeat": 1000}
+    assert params[1]["since"] == "3"
+    assert params[2] == {
+        "feed": "continuous",
+        "since": "3",
+        "limit": 1,
+        "heartbeat": 1000,
+    }
+
+
+def test_changes_feed_checkpoint(mocker, make_response):
+    db = mocker.Mock(codec=None)
+    db.get.return_value.json.return_value = {
+        "_id": "_local/x",
+        "_rev": "0-1",
+        "seq": "7",
+    }
+    db.insert.return_value.json.return_value = {"ok": True, "rev": "0-2"}
+    body = {"results": [{"seq": "8"}, {"seq": "9"}, {"seq": "10"}]}
+    db.request.return_value = make_response(body=body)
+
+    feed = ChangesFeed(db, checkpoint_id="x", checkpoint_every=2)
+    assert len(list(feed)) == 3
+    db.get.assert_called_once_with("_local/x")
+    assert db.request.call_args.kwargs["params"]["since"] == "7"
+    assert [call.args[0] for call in db.insert.call_args_list] == [
+        {"_id": "_local/x", "seq": "9", "_rev": "0-1"},
+        {"_id": "_local/x", "seq": "10", "_rev": "0-2"},
+    ]
+
+    db.get.side_effect = exceptions.ResourceNotFound()
+    assert ChangesFeed(db, checkpoint_id="_local/y").load_checkpoint() is None
+
+
+def test_changes_feed_raise_exception(mocker):
+    with pytest.raises(ValueError):
+        ChangesFeed(mocker.Mock(), feed="eventsource")
+
+    db = mocker.Mock(codec=None)
+    db.request.side_effect = requests.exceptions.ConnectionError()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        list(ChangesFeed(db, feed="longpoll", reconnect=False))
@@ -0,0 +1,199 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from tests.fakes import BaseFakeDB, FakeResponse
+from time2relax import __main__ as cli
+from time2relax import exceptions
+from time2relax.loader import BulkLoader, iter_docs, load
+
+DOCS = [{"_id": f"doc{i:04}", "title": "Heroes"} for i in range(25)]
+
+NDJSON = b"".join(json.dumps(doc).encode() + b"\n" for doc in DOCS)
+
+
+class FakeDB(BaseFakeDB):
+    def __init__(self, conflicts=(), fail_at=None):
+        super().__init__()
+        self.conflicts = set(conflicts)
+        self.fail_at = fail_at
+        self.batches = []
+
+    def bulk_docs(self, docs, **kwargs):
+        with self.lock:
+            self.batches.append([doc["_id"] for doc in docs])
+        if self.fail_at is not None and docs[0]["_id"] == self.fail_at:
+            raise exceptions.ServerError({"error": "unknown"}, None)
+        return FakeResponse(
+            [
+                {
+                    "id": doc["_id"],
+                    "error": "conflict",
+                    "reason": "Document update conflict.",
+                }
+                if doc["_id"] in self.conflicts
+                else {"id": doc["_id"], "ok": True, "rev": "1-a"}
+                for doc in docs
+            ]
+        )
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        NDJSON,
+        b"\n\n" + NDJSON.rstrip(b"\n"),
+        json.dumps(DOCS).encode(),
+        b"  \n" + json.dumps(DOCS, indent=2).encode(),
+    ],
+)
+def test_iter_docs(data):
+    assert list(iter_docs(io.BytesIO(data), chunk_size=7)) == DOCS
+
+
+def test_iter_docs_path(tmp_path):
+    path = tmp_path / "docs.ndjson.gz"
+    path.write_bytes(gzip.compress(NDJSON))
+    assert list(iter_docs(path)) == DOCS
+    assert list(iter_docs(str(path), "ndjson")) == DOCS
+
+    with pytest.raises(ValueError):
+        list(iter_docs(path, "csv"))
+
+
+def test_load():
+    db = FakeDB(conflicts=["doc0003", "doc0021"])
+    rejects = io.BytesIO()
+    progress = []
+
+    stats = load(
+        db,
+        io.BytesIO(NDJSON),
+        batch_size=10,
+        concurrency=2,
+        rejects=rejects,
+        progress=progress.append,
+    )
+
+    assert sorted(sum(db.batches, [])) == [doc["_id"] for doc in DOCS]
+    assert sorted(len(b) for b in db.batches) == [5, 10, 10]
+    assert (stats["docs"], stats["rejected"], stats["batches"]) == (23, 2, 3)
+    assert stats["bytes"] > 0
+    assert (stats["docs_per_sec"] > 0) and (stats["mb_per_sec"] > 0)
+    assert progress[-1]["batches"] == 3
+
+    lines = [json.loads(line) for line in rejects.getvalue().splitlines()]
+    assert [line["id"] for line in lines] == ["doc0003", "doc0021"]
+    assert lines[0]["error"] == "conflict"
+    assert lines[0]["doc"] == DOCS[3]
+
+
+def test_load_max_bytes():
+    db = FakeDB()
+    size = len(json.dumps(DOCS[0], separators=(",", ":"))) + 1
+
+    load(db, DOCS, batch_size=100, max_bytes=size * 4, concurrency=1)
+    assert [len(b) for b in db.batches] == [4, 4, 4, 4, 4, 4, 1]
+
+
+def test_load_rejected_batch():
+    class TooLargeDB(FakeDB):
+        def bulk_docs(self, docs, **kwargs):
+            response = FakeResponse(None)
+            response.status_code = 413
+            raise exceptions.HTTPError({"error": "too_large"}, response)
+
+    rejects = io.BytesIO()
+    stats = load(TooLargeDB(), DOCS[:3], rejects=rejects)
+    assert (stats["docs"], stats["rejected"]) == (0, 3)
+    assert json.loads(rejects.getvalue().splitlines()[0])["error"] == "too_large"
+
+
+@pytest.mark.parametrize(
+    ("status", "error"),
+    [
+        (401, exceptions.Unauthorized),
+        (403, exceptions.Forbidden),
+        (404, exceptions.ResourceNotFound),
+    ],
+)
+def test_load_raise_exception(status, error):
+    class FailingDB(FakeDB):
+        def bulk_docs(self, docs, **kwargs):
+            response = FakeResponse(None)
+            response.status_code = status
+            raise error({"error": "unknown"}, response)
+
+    rejects = io.BytesIO()
+    with pytest.raises(error):
+        load(FailingDB(), DOCS[:3], rejects=rejects)
+    assert rejects.getvalue() == b""
+
+
+def test_load_new_edits():
+    class ReplicatorDB(FakeDB):
+        def bulk_docs(self, docs, **kwargs):
+            assert kwargs == {"json": {"new_edits": False}}
+            kwargs["json"]["docs"] = docs
+            # Only the errors are listed
+            return FakeResponse([{"id": "doc0001", "error": "forbidden"}])
+
+    stats = load(ReplicatorDB(), DOCS[:3], json={"new_edits": False})
+    assert (stats["docs"], stats["rejected"]) == (2, 1)
+
+
+def test_load_checkpoint(tmp_path):
+    checkpoint = tmp_path / "load.checkpoint"
+    rejects = tmp_path / "rejects.ndjson"
+
+    db = FakeDB(conflicts=["doc0001"], fail_at="doc0010")
+    with pytest.raises(exceptions.ServerError):
+        load(
+            db,
+            DOCS,
+            batch_size=5,
+            concurrency=1,
+            rejects=rejects,
+            checkpoint=checkpoint,
+        )
+    assert json.loads(checkpoint.read_text()) == {
+        "next": 2,
+        "done": [],
+        "batch_size": 5,
+        "max_bytes": 4 * 1024 * 1024,
+    }
+
+    # Resume, without sending the batches again
+    db = FakeDB()
+    stats = load(
+        db, DOCS, batch_size=5, concurrency=1, rejects=rejects, checkpoint=checkpoint
+    )
+    assert db.batches[0][0] == "doc0010"
+    assert (stats["docs"], stats["skipped"], stats["batches"]) == (15, 10, 3)
+    assert json.loads(checkpoint.read_text())["next"] == 5
+    assert len(rejects.read_bytes().splitlines()) == 1
+
+    with pytest.raises(ValueError):
+        load(db, DOCS, batch_size=10, checkpoint=checkpoint)
+
+
+def test_bulk_loader_raise_exception():
+    with pytest.raises(ValueError):
+        BulkLoader(FakeDB(), batch_size=0)
+    assert repr(BulkLoader(FakeDB())) == "<BulkLoader [http://couchdb:5984/foobar]>"
+
+
+def test_cli_load(mocker, tmp_path, capsys):
+    path = tmp_path / "docs.json"
+    path.write_text(json.dumps(DOCS))
+    db = FakeDB()
+    db.session = mocker.MagicMock()
+    mocker.patch.object(cli, "CouchDB", return_value=db)
+    mocker.patch.object(cli, "load", wraps=load)
+
+    assert cli.main(["load", db.url, str(path), "--batch-size", "10"]) == 0
+    cli.CouchDB.assert_called_once_with(db.url, create_db=True, codec=None)
+    assert cli.load.call_args[1]["batch_size"] == 10
+    assert json.loads(capsys.readouterr().out)["docs"] == 25
@@ -0,0 +1,78 @@
+import pytest
+
+from tests.fakes import BaseFakeDB, FakeResponse
+from time2relax.mango import FindPaginator, QueryPlan
+
+DOCS = [{"_id": f"doc{i:02}", "year": 2000 + i} for i in range(10)]
+
+
+class FakeDB(BaseFakeDB):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def find(self, selector, limit=None, skip=None, bookmark=None, **kwargs):
+        self.calls.append({"limit": limit, "skip": skip, "bookmark": bookmark})
+        start = int(bookmark) if bookmark else (skip or 0)
+        docs = DOCS[start : start + limit]
+        return FakeResponse(
+            {
+                "docs": docs,
+                "bookmark": str(start + len(docs)),
+                "warning": "No matching index found, create an index to optimize query time.",
+            }
+        )
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_find_paginator(prefetch):
+    db = FakeDB()
+    pages = FindPaginator(db, {"year": {"$gt": 0}}, page_size=4, prefetch=prefetch)
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert list(pages.docs()) == DOCS
+    assert pages.bookmark is None
+    assert pages.warning.startswith("No matching index")
+    assert db.calls[1] == {"limit": 4, "skip": None, "bookmark": "4"}
+
+
+def test_find_paginator_limit_skip():
+    db = FakeDB()
+    pages = FindPaginator(db, {}, page_size=4, limit=5, skip=2)
+    assert [d["_id"] for d in pages.docs()] == [f"doc{i:02}" for i in range(2, 7)]
+    assert db.calls == [
+        {"limit": 4, "skip": 2, "bookmark": None},
+        {"limit": 1, "skip": None, "bookmark": "6"},
+    ]
+
+
+def test_find_paginator_bookmark():
+    db = FakeDB()
+    pages = FindPaginator(db, {}, page_size=4, prefetch=False, skip=1, bookmark="8")
+    assert list(pages.docs()) == DOCS[8:]
+    assert db.calls == [{"limit": 4, "skip": None, "bookmark": "8"}]
+
+
+def test_find_paginator_raise_exception():
+    with pytest.raises(ValueError):
+        FindPaginator(FakeDB(), {}, page_size=0)
+
+
+def test_query_plan():
+    plan = QueryPlan(
+        {
+            "index": {"ddoc": None, "name": "_all_docs", "type": "special"},
+            "opts": {"use_index": []},
+        }
+    )
+    assert plan.full_scan
+    assert plan.warnings == ["No usable index, the query scans every document"]
+
+
+def test_query_plan_use_index():
+    index = {"ddoc": "_design/films", "name": "by-year", "type": "json"}
+    plan = QueryPlan({"index": index, "opts": {"use_index": ["films", "by-year"]}})
+    assert not plan.full_scan
+    assert plan.warnings == []
+
+    plan = QueryPlan({"index": index, "opts": {"use_index": ["films", "by-title"]}})
+    assert plan.warnings == ["The index films/by-title is not used"]
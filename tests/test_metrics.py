@@ -0,0 +1,147 @@
+import pytest
+import requests
+from requests import Session
+
+from time2relax import exceptions, time2relax
+from time2relax.metrics import (
+    Histogram,
+    MetricsCollector,
+    RequestEvent,
+    path_template,
+)
+from time2relax.models import CouchDB
+from time2relax.retry import RetryPolicy
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+OK = {"ok": True}
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("", "/"),
+        ("_all_docs", "_all_docs"),
+        ("some%2Bid", "{docid}"),
+        ("docid/some/att.txt", "{docid}/{attname}"),
+        ("_local/checkpoint", "_local/{docid}"),
+        ("_design/app", "_design/{ddoc}"),
+        ("_design/app/_view/by_date", "_design/{ddoc}/_view/{func}"),
+        ("_design/app/_show/page/docid", "_design/{ddoc}/_show/{func}/{attname}"),
+        ("http://couchdb:5984/_replicate", "_replicate"),
+    ],
+)
+def test_path_template(path, expected):
+    assert path_template(path) == expected
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 0.2, 0.4))
+    assert histogram.quantile(0.5) is None
+    for value in [0.05] * 50 + [0.15] * 45 + [0.3] * 4 + [1.0]:
+        histogram.observe(value)
+    assert histogram.counts == [50, 45, 4, 1]
+    assert histogram.quantile(0.5) == pytest.approx(0.1)
+    assert histogram.quantile(0.95) == pytest.approx(0.2)
+    assert histogram.quantile(0.99) == pytest.approx(0.4)
+    assert histogram.quantile(1.0) == pytest.approx(0.4)
+
+
+def test_request_hooks(mocker, make_response):
+    session = Session()
+    mock_request = mocker.patch.object(session, "request")
+    mock_request.return_value = make_response(201, OK)
+    events = []
+    hooks = {
+        "before_send": [lambda e: events.append(("before", e.status))],
+        "after_receive": [lambda e: events.append(("after", e.status))],
+    }
+
+    time2relax.request(session, TEST_URL, "PUT", "a", _hooks=hooks, json={"_id": "a"})
+    assert events == [("before", None), ("after", 201)]
+
+
+def test_couchdb_hooks(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    response = make_response(201, OK)
+    response.request.body = b'{"_id":"a"}'
+    mock_request.side_effect = [requests.exceptions.ConnectionError(), response]
+    events = []
+
+    policy = RetryPolicy()
+    policy.sleep = lambda seconds: None
+    db = CouchDB(TEST_URL, create_db=False, retry=policy)
+    db.hooks["after_receive"].append(events.append)
+    db.insert({"_id": "a"})
+
+    (event,) = events
+    assert isinstance(event, RequestEvent)
+    assert (event.method, event.path, event.status) == ("PUT", "{docid}", 201)
+    assert (event.bytes_out, event.bytes_in, event.retries) == (11, 11, 1)
+    assert set(event.timings) == {"encode", "prepare", "network"}
+    assert event.elapsed >= sum(event.timings.values())
+    assert event.error is None
+
+
+@pytest.mark.parametrize("with_hooks", [False, True])
+def test_couchdb_requests_hooks(mocker, with_hooks, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = make_response(body=OK)
+    response_hooks = {"response": [lambda r, **kwargs: r]}
+
+    db = CouchDB(TEST_URL, create_db=False)
+    if with_hooks:
+        db.hooks["after_receive"].append(lambda e: None)
+    # The requests hooks are passed through, not taken as request hooks
+    db.get("a", hooks=response_hooks)
+    assert mock_request.call_args[1]["hooks"] is response_hooks
+
+
+def test_metrics_collector(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = [
+        make_response(body=OK),
+        make_response(body=OK),
+        make_response(404, OK),
+        make_response(body=OK),
+    ]
+
+    collector = MetricsCollector()
+    db = CouchDB(TEST_URL, create_db=False, hooks={"after_receive": [collector]})
+    db.get("a")
+    db.get("b")
+    with pytest.raises(exceptions.ResourceNotFound):
+        db.get("c")
+
+    metrics = collector.to_dict()
+    assert list(metrics) == ["GET {docid}"]
+    endpoint = metrics["GET {docid}"]
+    assert endpoint["count"] == 3
+    assert endpoint["statuses"] == {"200": 2, "404": 1}
+    assert endpoint["bytes_in"] == 33
+    assert 0 <= endpoint["p50"] <= endpoint["p95"] <= endpoint["p99"]
+
+    text = collector.to_prometheus()
+    labels = 'method="GET",path="{docid}"'
+    assert f'time2relax_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in text
+    assert f"time2relax_request_duration_seconds_count{{{labels}}} 3" in text
+    assert f'time2relax_requests_total{{{labels},status="404"}} 1' in text
+
+    # Every metric is a TYPE line, followed by all of its samples
+    db.get("_design/app")
+    names = []
+    for line in collector.to_prometheus().splitlines():
+        if line.startswith("# TYPE "):
+            names.append(line.split()[2])
+        else:
+            assert line.startswith(names[-1])
+    assert names == [
+        "time2relax_request_duration_seconds",
+        "time2relax_requests_total",
+        "time2relax_request_retries_total",
+        "time2relax_request_bytes_total",
+        "time2relax_response_bytes_total",
+    ]
+
+    collector.reset()
+    assert collector.to_dict() == {}
@@ -0,0 +1,91 @@
+import pytest
+
+from time2relax import mime
+
+RELATED = (
+    b"--inner\r\n"
+    b"Content-Type: application/json\r\n\r\n"
+    b'{"_id":"a","_attachments":{"x.bin":{"follows":true},"y.txt":{"follows":true}}}'
+    b"\r\n--inner\r\n"
+    b'Content-Disposition: attachment; filename="y.txt"\r\n\r\n'
+    b"why"
+    b"\r\n--inner\r\n\r\n"
+    b"\x00\r\n--\x01"
+    b"\r\n--inner--"
+)
+
+BODY = (
+    b"preamble\r\n--outer\r\n"
+    b"Content-Type: multipart/related; boundary=inner\r\n\r\n" + RELATED + b"\r\n"
+    b"--outer  \r\n"
+    b'Content-Type: application/json; error="true"\r\n\r\n'
+    b'{"id":"b","rev":"1-b","error":"not_found","reason":"missing"}'
+    b"\r\n--outer--\r\n"
+)
+
+
+def test_get_boundary():
+    assert mime.get_boundary('multipart/mixed; boundary="abc123"') == "abc123"
+    with pytest.raises(ValueError):
+        mime.get_boundary("application/json")
+
+
+@pytest.mark.parametrize("size", [1, 3, len(BODY)])
+def test_iter_parts(size):
+    chunks = (BODY[i : i + size] for i in range(0, len(BODY), size))
+    parts = list(mime.iter_parts(chunks, "outer"))
+    assert parts == [
+        ({"content-type": "multipart/related; boundary=inner"}, RELATED),
+        (
+            {"content-type": 'application/json; error="true"'},
+            b'{"id":"b","rev":"1-b","error":"not_found","reason":"missing"}',
+        ),
+    ]
+
+
+def test_iter_parts_raise_exception():
+    with pytest.raises(ValueError):
+        list(mime.iter_parts([b"--outer\r\n\r\nfoo"], "outer"))
+
+
+def test_parse_related():
+    doc = mime.parse_related(RELATED, "multipart/related; boundary=inner")
+    assert doc == {
+        "_id": "a",
+        "_attachments": {
+            "x.bin": {"data": b"\x00\r\n--\x01"},
+            "y.txt": {"data": b"why"},
+        },
+    }
+
+
+def test_related_body(tmp_path):
+    path = tmp_path / "b.bin"
+    path.write_bytes(b"\x00" * 10)
+    doc = {"_id": "a", "_attachments": {"old.txt": {"stub": True}}}
+    attachments = {
+        "a.txt": ("text/plain", "hello"),
+        "b.bin": ("application/octet-stream", path),
+        "c.bin": ("application/octet-stream", iter([b"\x01", b"\x02"])),
+    }
+
+    body = mime.RelatedBody(doc, attachments, chunk_size=3)
+    data = b"".join(body)
+    assert len(body) == len(data)
+    assert mime.get_boundary(body.content_type) == body.boundary
+
+    parsed = mime.parse_related(data, body.content_type)
+    assert parsed["_attachments"] == {
+        "old.txt": {"stub": True},
+        "a.txt": {"content_type": "text/plain", "length": 5, "data": b"hello"},
+        "b.bin": {
+            "content_type": "application/octet-stream",
+            "length": 10,
+            "data": b"\x00" * 10,
+        },
+        "c.bin": {
+            "content_type": "application/octet-stream",
+            "length": 2,
+            "data": b"\x01\x02",
+        },
+    }
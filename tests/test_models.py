@@ -1,7 +1,10 @@
+import io
+
 import pytest
-from requests import RequestException
+from requests import RequestException, Session
 
-from time2relax.models import CouchDB
+from time2relax import exceptions
+from time2relax.models import DATABASES, CouchDB
 
 
 def test_couchdb():
@@ -22,3 +25,324 @@ def test_couchdb_raise_exception():
     for url in ["", "http://", "http://user:pass"]:
         with pytest.raises(RequestException):
             CouchDB(url)
+
+
+def test_couchdb_create_db(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = [
+        make_response(404),
+        make_response(201),
+        make_response(),
+        make_response(),
+        make_response(),
+    ]
+    DATABASES.discard("http://couchdb:5984/foobar")
+
+    # The database is checked once, for every object in the process
+    CouchDB("http://couchdb:5984/foobar").info()
+    CouchDB("http://couchdb:5984/foobar").info()
+    calls = [c.args[1:] for c in mock_request.call_args_list]
+    assert calls == [
+        ("HEAD", "http://couchdb:5984/foobar"),
+        ("PUT", "http://couchdb:5984/foobar"),
+        ("GET", "http://couchdb:5984/foobar"),
+        ("GET", "http://couchdb:5984/foobar"),
+    ]
+    assert "http://couchdb:5984/foobar" in DATABASES
+
+    # Until it is deleted
+    CouchDB("http://couchdb:5984/foobar").destroy()
+    assert "http://couchdb:5984/foobar" not in DATABASES
+
+
+def test_couchdb_create_db_lazy(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    missing = {"error": "not_found", "reason": "Database does not exist."}
+    mock_request.side_effect = [
+        make_response(404, missing),
+        make_response(412),
+        make_response(201),
+        make_response(404, {"error": "not_found", "reason": "missing"}),
+    ]
+    DATABASES.discard("http://couchdb:5984/foobar")
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db="lazy")
+    assert db.insert({"_id": "a"}).status_code == 201
+    with pytest.raises(exceptions.ResourceNotFound):
+        db.get("b")
+    calls = [c.args[1:] for c in mock_request.call_args_list]
+    assert calls == [
+        ("PUT", "http://couchdb:5984/foobar/a"),
+        ("PUT", "http://couchdb:5984/foobar"),
+        ("PUT", "http://couchdb:5984/foobar/a"),
+        ("GET", "http://couchdb:5984/foobar/b"),
+    ]
+    DATABASES.discard("http://couchdb:5984/foobar")
+
+
+def test_couchdb_iter_all_docs(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.iter_content.return_value = [b'{"rows":[{"id":"a"}]}']
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    assert list(db.iter_all_docs(params={"keys": ["a"]})) == [{"id": "a"}]
+    mock_request.assert_called_once_with(
+        db.session,
+        "POST",
+        "http://couchdb:5984/foobar/_all_docs",
+        json={"keys": ["a"]},
+        stream=True,
+    )
+    mock_request.return_value.close.assert_called_once_with()
+
+
+def test_couchdb_iter_view(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.iter_content.return_value = [b'{"rows":[]}']
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    assert list(db.iter_view("ddoc", "view", params={"key": "x"})) == []
+    mock_request.assert_called_once_with(
+        db.session,
+        "GET",
+        "http://couchdb:5984/foobar/_design/ddoc/_view/view",
+        params={"key": '"x"'},
+        stream=True,
+    )
+
+
+def test_couchdb_get_many(mocker):
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+
+    def all_docs(params):
+        response = mocker.Mock()
+        response.json.return_value = {
+            "rows": [{"key": key, "error": "not_found"} for key in params["keys"]]
+        }
+        return response
+
+    mock_all_docs = mocker.patch.object(db, "all_docs", side_effect=all_docs)
+    rows = list(db.get_many(map(str, range(5)), chunk_size=2, params={"conflicts": 1}))
+    assert [row["key"] for row in rows] == ["0", "1", "2", "3", "4"]
+    assert mock_all_docs.call_count == 3
+    mock_all_docs.assert_any_call(
+        params={"conflicts": 1, "include_docs": True, "keys": ["4"]}
+    )
+
+
+def test_couchdb_query_plan(mocker):
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    response = mocker.Mock()
+    response.json.return_value = {"index": {"name": "_all_docs", "type": "special"}}
+    mock_explain = mocker.patch.object(db, "explain", return_value=response)
+
+    plan = db.query_plan({"year": 2010}, fields=["_id"])
+    assert plan.full_scan
+    mock_explain.assert_called_with({"year": 2010}, fields=["_id"])
+
+
+def test_couchdb_bulk_get(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.headers = {"Content-Type": "application/json"}
+    mock_request.return_value.iter_content.return_value = [
+        b'{"results":[{"id":"a","docs":[{"ok":{"_id":"a"}}]}]}'
+    ]
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    results = list(db.bulk_get([{"id": "a"}], params={"revs": True}))
+    assert results == [{"id": "a", "docs": [{"ok": {"_id": "a"}}]}]
+    mock_request.assert_called_once_with(
+        db.session,
+        "POST",
+        "http://couchdb:5984/foobar/_bulk_get",
+        json={"docs": [{"id": "a"}]},
+        params={"revs": "true"},
+        stream=True,
+    )
+
+
+def test_couchdb_bulk_get_multipart(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.headers = {"Content-Type": "multipart/mixed; boundary=b"}
+    mock_request.return_value.iter_content.return_value = [
+        b"--b\r\nContent-Type: application/json\r\n\r\n"
+        b'{"_id":"a","_rev":"1-a"}\r\n'
+        b'--b\r\nContent-Type: application/json; error="true"\r\n\r\n'
+        b'{"id":"c","rev":"1-c","error":"not_found"}\r\n--b--'
+    ]
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    results = list(db.bulk_get([{"id": "a"}, {"id": "c"}], multipart=True))
+    assert results == [
+        {"id": "a", "docs": [{"ok": {"_id": "a", "_rev": "1-a"}}]},
+        {
+            "id": "c",
+            "docs": [{"error": {"id": "c", "rev": "1-c", "error": "not_found"}}],
+        },
+    ]
+    assert mock_request.call_args.kwargs["headers"] == {"Accept": "multipart/mixed"}
+
+
+def test_couchdb_bulk_get_fallback(mocker):
+    reserved = {
+        "error": "bad_request",
+        "reason": "Only reserved document ids may start with underscore.",
+    }
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    mock_request = mocker.patch.object(
+        db, "request", side_effect=exceptions.BadRequest(reserved, None)
+    )
+
+    def get(doc_id, params):
+        if doc_id == "missing":
+            raise exceptions.ResourceNotFound({"error": "not_found"}, None)
+        response = mocker.Mock()
+        response.json.return_value = {"_id": doc_id, "_rev": params["rev"]}
+        return response
+
+    mock_get = mocker.patch.object(db, "get", side_effect=get)
+    docs = [{"id": "a", "rev": "1-a"}, {"id": "missing", "rev": "1-m"}]
+    assert list(db.bulk_get(docs)) == [
+        {"id": "a", "docs": [{"ok": {"_id": "a", "_rev": "1-a"}}]},
+        {
+            "id": "missing",
+            "docs": [{"error": {"error": "not_found", "id": "missing", "rev": "1-m"}}],
+        },
+    ]
+    # Only a 405 is remembered, a 400 or 404 may come from a proxy
+    assert db._has_bulk_get is None
+    assert mock_get.call_count == 2
+
+    mock_request.side_effect = exceptions.MethodNotAllowed({}, None)
+    assert len(list(db.bulk_get(docs))) == 2
+    assert db._has_bulk_get is False
+    list(db.bulk_get(docs))
+    assert mock_request.call_count == 2
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    mocker.patch.object(
+        db, "request", side_effect=exceptions.BadRequest(reserved, None)
+    )
+    with pytest.raises(exceptions.BadRequest):
+        list(db.bulk_get(docs, fallback=False))
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.BadRequest({"error": "bad_request", "reason": "Missing JSON"}, None),
+        exceptions.ResourceNotFound(
+            {"error": "not_found", "reason": "Database does not exist."}, None
+        ),
+    ],
+)
+def test_couchdb_bulk_get_raise_exception(mocker, error):
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    mocker.patch.object(db, "request", side_effect=error)
+    mock_get = mocker.patch.object(db, "get")
+    with pytest.raises(type(error)):
+        list(db.bulk_get([{"id": "a"}]))
+    assert db._has_bulk_get is None
+    mock_get.assert_not_called()
+
+
+def test_couchdb_download_att(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.headers = {"Content-Length": "6"}
+    mock_request.return_value.iter_content.return_value = [b"abc", b"def"]
+    progress = mocker.Mock()
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    fp = io.BytesIO()
+    assert db.download_att("doc", "att.bin", fp, progress=progress) == 6
+    assert fp.getvalue() == b"abcdef"
+    assert [call.args[:2] for call in progress.call_args_list] == [(3, 6), (6, 6)]
+
+    # The server ignored the range, and sent the whole attachment
+    fp = io.BytesIO()
+    with pytest.raises(exceptions.HTTPError):
+        db.download_att("doc", "att.bin", fp, byte_range=(2, 5))
+    assert mock_request.call_args.kwargs["headers"] == {
+        "Accept-Encoding": "identity",
+        "Range": "bytes=2-5",
+    }
+    assert fp.getvalue() == b""
+
+    mock_request.return_value.status_code = 206
+    mock_request.return_value.iter_content.return_value = [b"cdef"]
+    db.download_att("doc", "att.bin", fp, byte_range=(2, 5))
+    assert fp.getvalue() == b"cdef"
+
+
+def test_couchdb_download_att_segments(mocker, tmp_path):
+    content = bytes(range(256)) * 5
+
+    def request(session, method, url, headers, **kwargs):
+        response = mocker.Mock(status_code=200)
+        response.headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(len(content)),
+        }
+        if method == "GET":
+            first, last = map(int, headers["Range"][6:].split("-"))
+            response.status_code = 206
+            response.iter_content.return_value = [content[first : last + 1]]
+        return response
+
+    mocker.patch.object(Session, "request", autospec=True, side_effect=request)
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    dest = tmp_path / "att.bin"
+    assert db.download_att("doc", "att.bin", dest, segments=3) == len(content)
+    assert dest.read_bytes() == content
+
+
+def test_couchdb_upload_att(mocker, tmp_path):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 201
+    progress = mocker.Mock()
+    path = tmp_path / "att.bin"
+    path.write_bytes(b"x" * 10)
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    db.upload_att(
+        "doc", "1-a", "att.bin", path, "image/png", chunk_size=4, progress=progress
+    )
+    kwargs = mock_request.call_args.kwargs
+    assert list(kwargs["data"]) == [b"xxxx", b"xxxx", b"xx"]
+    assert kwargs["headers"] == {"Content-Type": "image/png"}
+    assert kwargs["params"] == {"rev": "1-a"}
+    assert progress.call_args.args[:2] == (10, 10)
+
+
+def test_couchdb_read_related(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    mock_request.return_value.headers = {
+        "Content-Type": "multipart/related; boundary=b"
+    }
+    mock_request.return_value.iter_content.return_value = [
+        b"--b\r\nContent-Type: application/json\r\n\r\n"
+        b'{"_id":"a","_attachments":{"x":{"follows":true}}}\r\n'
+        b"--b\r\n\r\n\xff\xfe\r\n--b--"
+    ]
+
+    db = CouchDB("http://couchdb:5984/foobar", create_db=False)
+    doc = db.read_related("a")
+    assert doc == {"_id": "a", "_attachments": {"x": {"data": b"\xff\xfe"}}}
+    mock_request.assert_called_once_with(
+        db.session,
+        "GET",
+        "http://couchdb:5984/foobar/a",
+        params={"attachments": "true"},
+        headers={"Accept": "multipart/related"},
+        stream=True,
+    )
+
+    mock_request.return_value.headers = {"Content-Type": "application/json"}
+    mock_request.return_value.json.return_value = {"_id": "a"}
+    assert db.read_related("a") == {"_id": "a"}
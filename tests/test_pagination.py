@@ -0,0 +1,102 @@
+import pytest
+
+from tests.fakes import BaseFakeDB, FakeResponse
+from time2relax.pagination import Paginator, decode_cursor, encode_cursor
+
+# A view with duplicate keys, sorted by (key, id)
+ROWS = [{"id": f"doc{i:02}", "key": i // 3, "value": None} for i in range(20)]
+
+
+class FakeDB(BaseFakeDB):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def ddoc_view(self, ddoc_id, func_id, params):
+        self.calls.append(params)
+        descending = params.get("descending", False)
+        rows = list(reversed(ROWS)) if descending else ROWS
+        if "startkey" in params:
+            start = (params["startkey"], params.get("startkey_docid", ""))
+            if descending:
+                rows = [r for r in rows if (r["key"], r["id"]) <= start]
+            else:
+                rows = [r for r in rows if (r["key"], r["id"]) >= start]
+        rows = rows[params.get("skip", 0) :]
+        return FakeResponse(
+            {"total_rows": len(ROWS), "offset": 0, "rows": rows[: params["limit"]]}
+        )
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_paginator(prefetch):
+    db = FakeDB()
+    pages = list(Paginator(db, "ddoc", "view", page_size=4, prefetch=prefetch))
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4]
+    assert [row for page in pages for row in page] == ROWS
+    assert db.calls[1] == {"startkey": 1, "startkey_docid": "doc04", "limit": 5}
+    assert len(db.calls) == 5
+
+
+def test_paginator_descending():
+    db = FakeDB()
+    paginator = Paginator(db, "ddoc", "view", page_size=6, params={"descending": True})
+    assert list(paginator.rows()) == list(reversed(ROWS))
+    assert paginator.cursor is None
+
+
+def test_paginator_limit():
+    db = FakeDB()
+    paginator = Paginator(db, "ddoc", "view", page_size=4, params={"limit": 6})
+    assert [len(page) for page in paginator] == [4, 2]
+    assert db.calls[-1]["limit"] == 3
+
+
+def test_paginator_skip():
+    db = FakeDB()
+    paginator = Paginator(db, "ddoc", "view", page_size=4, params={"skip": 2})
+    assert list(paginator.rows()) == ROWS[2:]
+    assert db.calls[0]["skip"] == 2
+    assert not any("skip" in call for call in db.calls[1:])
+
+
+def test_paginator_cursor_limit():
+    db = FakeDB()
+    params = {"limit": 10, "skip": 1}
+    paginator = Paginator(db, "ddoc", "view", page_size=4, params=params)
+    pages = iter(paginator)
+    assert next(pages) == ROWS[1:5]
+
+    # The cursor resumes after the skipped rows, with the rows left of the limit
+    resumed = Paginator(db, "ddoc", "view", page_size=4, cursor=paginator.cursor)
+    assert list(resumed.rows()) == ROWS[5:11]
+    resumed = Paginator(
+        db, "ddoc", "view", page_size=4, params=params, cursor=paginator.cursor
+    )
+    assert list(resumed.rows()) == ROWS[5:11]
+
+
+def test_paginator_cursor():
+    db = FakeDB()
+    paginator = Paginator(db, "ddoc", "view", page_size=7, params={"start_key": 2})
+    pages = iter(paginator)
+    assert next(pages) == ROWS[6:13]
+
+    resumed = Paginator(db, "ddoc", "view", page_size=7, cursor=paginator.cursor)
+    assert list(resumed.rows()) == ROWS[13:]
+
+
+def test_paginator_raise_exception():
+    with pytest.raises(ValueError):
+        Paginator(FakeDB(), page_size=0)
+    with pytest.raises(ValueError):
+        Paginator(FakeDB(), params={"keys": ["a"]})
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(["a", "b"], "many"))
+
+
+def test_encode_cursor():
+    cursor = encode_cursor([["x", 1], "docid"])
+    assert decode_cursor(cursor) == (["x", 1], "docid")
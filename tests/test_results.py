@@ -0,0 +1,105 @@
+import tracemalloc
+
+from requests import Session
+
+from time2relax.models import CouchDB
+from time2relax.results import Document, Row, ViewResult, WriteResult
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+def test_results_get(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    body = {"_id": "a", "_rev": "1-a"}
+    mock_request.return_value = make_response(body=body, headers={"ETag": '"1-a"'})
+
+    db = CouchDB(TEST_URL, create_db=False)
+    doc = db.results.get("a")
+    assert isinstance(doc, Document)
+    assert doc == body
+    assert (doc.etag, doc.status) == ('"1-a"', 200)
+    assert not hasattr(doc, "__dict__")
+
+
+def test_results_insert(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    body = {"ok": True, "id": "a", "rev": "1-a"}
+    mock_request.return_value = make_response(201, body, {"ETag": '"1-a"'})
+
+    db = CouchDB(TEST_URL, create_db=False, codec="orjson")
+    result = db.results.insert({"_id": "a"})
+    assert (result.id, result.rev, result.ok) == ("a", "1-a", True)
+    assert (result.etag, result.status) == ('"1-a"', 201)
+    assert repr(result) == "<WriteResult [a 1-a]>"
+
+
+def test_results_bulk_docs(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    body = [
+        {"ok": True, "id": "a", "rev": "1-a"},
+        {"id": "b", "error": "conflict", "reason": "Document update conflict."},
+    ]
+    mock_request.return_value = make_response(201, body)
+
+    db = CouchDB(TEST_URL, create_db=False)
+    a, b = db.results.bulk_docs([{"_id": "a"}, {"_id": "b"}])
+    assert isinstance(a, WriteResult)
+    assert (a.id, a.rev, a.ok, a.error) == ("a", "1-a", True, None)
+    assert (b.id, b.rev, b.ok, b.error) == ("b", None, False, "conflict")
+
+
+def test_results_view(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    body = {
+        "total_rows": 2,
+        "offset": 0,
+        "rows": [
+            {"id": "a", "key": "a", "value": {"rev": "1-a"}, "doc": {"_id": "a"}},
+            {"key": "x", "error": "not_found"},
+        ],
+    }
+    mock_request.return_value = make_response(body=body)
+
+    db = CouchDB(TEST_URL, create_db=False)
+    for result in (db.results.all_docs(), db.results.ddoc_view("ddoc", "view")):
+        assert isinstance(result, ViewResult)
+        assert (result.total_rows, result.offset, len(result)) == (2, 0, 2)
+        assert list(result) == [
+            Row("a", "a", {"rev": "1-a"}, {"_id": "a"}),
+            Row(key="x", error="not_found"),
+        ]
+
+
+def test_results_view_memory(mocker, make_response):
+    size = 5000
+    rows = [{"id": f"doc{i}", "key": i, "value": {"rev": "1-a"}} for i in range(size)]
+    response = make_response(body={"total_rows": size, "offset": 0, "rows": rows})
+    content = response.content
+    response.iter_content.return_value = [
+        content[i : i + 4096] for i in range(0, len(content), 4096)
+    ]
+    del rows
+    blocks = []
+
+    class CountingRow(Row):
+        __slots__ = ()
+
+        def __init__(self, *args):
+            super().__init__(*args)
+            if self.key == size - 1:
+                blocks.append(len(tracemalloc.take_snapshot().traces))
+
+    db = CouchDB(TEST_URL, create_db=False)
+    mocker.patch.object(db, "all_docs", return_value=response)
+    mocker.patch("time2relax.results.Row", CountingRow)
+    tracemalloc.start()
+    try:
+        result = db.results.all_docs()
+        blocks.append(len(tracemalloc.take_snapshot().traces))
+    finally:
+        tracemalloc.stop()
+
+    assert (len(result), result.total_rows) == (size, size)
+    # Only the rows are allocated: no decoded body is kept while they are built
+    peak, kept = blocks
+    assert peak - kept < size // 10
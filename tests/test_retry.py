@@ -0,0 +1,156 @@
+import pytest
+import requests
+from requests import Session
+
+from time2relax import exceptions
+from time2relax.models import CouchDB
+from time2relax.retry import CircuitBreaker, RetryPolicy, get_retry_after, is_idempotent
+
+TEST_URL = "http://couchdb:5984/foobar"
+
+
+def make_db(policy):
+    policy.sleep = lambda seconds: policy.slept.append(seconds)
+    policy.slept = []
+    return CouchDB(TEST_URL, create_db=False, retry=policy)
+
+
+def test_is_idempotent():
+    assert is_idempotent("GET", "docid", {})
+    assert is_idempotent("PUT", "docid", {"json": {}})
+    assert is_idempotent("DELETE", "docid", {"params": {"rev": "1-abc"}})
+    assert is_idempotent("POST", "_all_docs", {"json": {"keys": []}})
+    assert is_idempotent("POST", "_design/foo/_view/bar", {"json": {}})
+    assert is_idempotent("POST", "_bulk_docs", {"json": {"docs": [{"_id": "a"}]}})
+    assert not is_idempotent("POST", "_bulk_docs", {"json": {"docs": [{}]}})
+    assert not is_idempotent("POST", "_bulk_docs", {"data": b"{}"})
+    assert not is_idempotent("POST", "_bulk_docs", {"json": {}})
+    assert not is_idempotent("POST", "", {"json": {"title": "Heroes"}})
+    assert not is_idempotent("PATCH", "docid", {})
+
+
+def test_get_retry_after(mocker, make_response):
+    assert get_retry_after(make_response()) is None
+    assert get_retry_after(make_response(headers={"Retry-After": "2"})) == 2
+    past = make_response(
+        mocker, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    )
+    assert get_retry_after(past) == 0
+    bad = make_response(headers={"Retry-After": "soon"})
+    assert get_retry_after(bad) is None
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    # Half open at once, a single trial request is let through
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    breaker.recovery_time = 60
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_couchdb_retry(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    ok = make_response()
+    mock_request.side_effect = [
+        requests.exceptions.ConnectionError(),
+        make_response(503),
+        make_response(429, headers={"Retry-After": "5"}),
+        ok,
+    ]
+
+    policy = RetryPolicy(max_retries=3, base=0.1, cap=10)
+    db = make_db(policy)
+    assert db.get("docid") is ok
+    assert mock_request.call_count == 4
+    assert len(policy.slept) == 3
+    assert all(0.1 <= s <= 10 for s in policy.slept)
+    assert policy.slept[2] >= 5
+    assert policy.stats() == {
+        "requests": 4,
+        "retries": 3,
+        "failures": 3,
+        "rejected": 0,
+        "breakers": {"http://couchdb:5984": "closed"},
+    }
+
+
+def test_couchdb_retry_exhausted(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = make_response(500)
+
+    db = make_db(RetryPolicy(max_retries=2))
+    with pytest.raises(exceptions.ServerError):
+        db.get("docid")
+    assert mock_request.call_count == 3
+
+
+def test_couchdb_retry_not_idempotent(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = requests.exceptions.ConnectionError()
+
+    db = make_db(RetryPolicy())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        db.insert({"title": "Heroes"})
+    with pytest.raises(requests.exceptions.ConnectionError):
+        db.request("PUT", "docid", data=iter([b"{}"]))
+    assert mock_request.call_count == 2
+
+
+def test_couchdb_retry_client_error(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value = make_response(404)
+
+    db = make_db(RetryPolicy())
+    with pytest.raises(exceptions.ResourceNotFound):
+        db.get("docid")
+    assert mock_request.call_count == 1
+
+
+def test_couchdb_circuit_open(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.side_effect = requests.exceptions.ConnectionError()
+
+    policy = RetryPolicy(max_retries=5, failure_threshold=2, recovery_time=60)
+    db = make_db(policy)
+    with pytest.raises(exceptions.CircuitOpenError):
+        db.get("docid")
+    with pytest.raises(exceptions.CircuitOpenError):
+        db.get("docid")
+    assert mock_request.call_count == 2
+    assert policy.stats()["rejected"] == 2
+    assert policy.stats()["breakers"] == {"http://couchdb:5984": "open"}
+
+
+def test_couchdb_circuit_trial_error(mocker, make_response):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    ok = make_response()
+    mock_request.side_effect = [
+        requests.exceptions.ReadTimeout(),
+        requests.exceptions.ReadTimeout(),
+        ValueError(),
+        ok,
+    ]
+
+    policy = RetryPolicy(max_retries=1, failure_threshold=2, recovery_time=0)
+    db = make_db(policy)
+    # Timeouts are retried, and open the circuit
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        db.get("docid")
+    assert mock_request.call_count == 2
+
+    # A trial that fails with any error lets another trial through later
+    with pytest.raises(ValueError):
+        db.get("docid")
+    assert db.get("docid") is ok
+    assert policy.stats()["breakers"] == {"http://couchdb:5984": "closed"}
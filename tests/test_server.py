@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from requests import Session
+
+from time2relax import exceptions
+from time2relax.models import DATABASES
+from time2relax.server import CouchServer
+
+TEST_URL = "http://couchdb:5984"
+
+
+def test_couch_server():
+    server = CouchServer(f"{TEST_URL}/", auth=("admin", "secret"), codec="json")
+    assert server.url == TEST_URL
+    assert server.session.auth == ("admin", "secret")
+    assert repr(server) == "<CouchServer [http://couchdb:5984]>"
+
+    db = server.db("tenant+1", create_db=False)
+    assert db.url == f"{TEST_URL}/tenant%2B1"
+    assert db.session is server.session
+    assert db.adapter is server.adapter
+    assert db.codec is server.codec
+    assert db.hooks is server.hooks
+
+
+def test_couch_server_raise_exception():
+    with pytest.raises(Exception):
+        CouchServer("foobar")
+
+
+def test_couch_server_db_request(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 200
+    server = CouchServer(TEST_URL)
+
+    server.db("tenant", create_db=False).get("docid")
+    server.info()
+    assert [c.args[1:] for c in mock_request.call_args_list] == [
+        ("GET", f"{TEST_URL}/tenant/docid"),
+        ("GET", TEST_URL),
+    ]
+
+
+def test_couch_server_iter_all_dbs(mocker):
+    names = [f"db{i:02}" for i in range(10)]
+
+    def request(session, method, url, params):
+        start = json.loads(params.get("startkey", '""'))
+        return mocker.Mock(
+            status_code=200,
+            json=lambda: [n for n in names if n >= start][: params["limit"]],
+        )
+
+    mock_request = mocker.patch.object(
+        Session, "request", autospec=True, side_effect=request
+    )
+    server = CouchServer(TEST_URL)
+
+    assert list(server.iter_all_dbs(page_size=4)) == names
+    assert mock_request.call_args_list[1].kwargs["params"] == {
+        "limit": 5,
+        "startkey": '"db04"',
+    }
+    assert list(server.iter_all_dbs(page_size=4, params={"limit": 6})) == names[:6]
+
+
+def test_couch_server_dbs_info(mocker):
+    def request(session, method, url, json):
+        rows = [{"key": key, "info": {"db_name": key}} for key in json["keys"]]
+        return mocker.Mock(status_code=200, json=lambda: rows)
+
+    mock_request = mocker.patch.object(
+        Session, "request", autospec=True, side_effect=request
+    )
+    server = CouchServer(TEST_URL)
+
+    rows = list(server.dbs_info(["a", "b", "c"], chunk_size=2))
+    assert [row["key"] for row in rows] == ["a", "b", "c"]
+    assert mock_request.call_count == 2
+
+
+def test_couch_server_create_delete_dbs(mocker):
+    statuses = {"a": 201, "b": 412, "c": 401}
+
+    def request(session, method, url):
+        name = url.rsplit("/", 1)[-1]
+        return mocker.Mock(status_code=statuses[name] if method == "PUT" else 404)
+
+    mocker.patch.object(Session, "request", autospec=True, side_effect=request)
+    server = CouchServer(TEST_URL)
+
+    errors = server.create_dbs(["a", "b", "c"])
+    assert list(errors) == ["c"]
+    assert isinstance(errors["c"], exceptions.Unauthorized)
+    assert f"{TEST_URL}/a" in DATABASES
+    assert list(server.create_dbs(["b"], exist_ok=False)) == ["b"]
+
+    assert server.delete_dbs(["a"]) == {}
+    assert f"{TEST_URL}/a" not in DATABASES
+    assert list(server.delete_dbs(["a"], missing_ok=False)) == ["a"]
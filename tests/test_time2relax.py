@@ -66,6 +66,39 @@ def test_bulk_docs_with_json_none():
     )
 
 
+def test_bulk_get():
+    docs = [{"id": "a"}, {"id": "b", "rev": "1-b"}]
+    result = time2relax.bulk_get(docs, json={"foo": "bar"})
+    assert result == (
+        "POST",
+        "_bulk_get",
+        {
+            "json": {
+                "foo": "bar",
+                "docs": docs,
+            },
+        },
+    )
+
+
+def test_changes():
+    result = time2relax.changes(params={"since": "now"})
+    assert result == ("GET", "_changes", {"params": {"since": "now"}})
+
+
+def test_changes_with_params_selector():
+    params = {"selector": {"type": "x"}, "doc_ids": ["a"], "filter": "_doc_ids"}
+    result = time2relax.changes(params=params, json=None)
+    assert result == (
+        "POST",
+        "_changes",
+        {
+            "json": {"selector": {"type": "x"}, "doc_ids": ["a"]},
+            "params": {"filter": "_doc_ids"},
+        },
+    )
+
+
 def test_compact():
     result = time2relax.compact()
     assert result == (
@@ -126,6 +159,21 @@ def test_ddoc_show_with_doc_id():
     assert result == ("GET", "_design/test/_show/myshow/doc_id", {})
 
 
+def test_create_index():
+    result = time2relax.create_index(["year", {"title": "desc"}], ddoc="films")
+    assert result == (
+        "POST",
+        "_index",
+        {
+            "json": {
+                "index": {"fields": ["year", {"title": "desc"}]},
+                "type": "json",
+                "ddoc": "films",
+            },
+        },
+    )
+
+
 def test_ddoc_view():
     result = time2relax.ddoc_view("test", "myview")
     assert result == ("GET", "_design/test/_view/myview", {})
@@ -143,11 +191,50 @@ def test_ddoc_view_with_params():
     )
 
 
+def test_delete_index():
+    result = time2relax.delete_index("_design/films", "by year")
+    assert result == ("DELETE", "_index/films/json/by%20year", {})
+
+
 def test_destroy():
     result = time2relax.destroy()
     assert result == ("DELETE", "", {})
 
 
+def test_explain():
+    result = time2relax.explain({"year": 2010}, use_index="films")
+    assert result == (
+        "POST",
+        "_explain",
+        {"json": {"selector": {"year": 2010}, "use_index": "films"}},
+    )
+
+
+def test_find():
+    result = time2relax.find(
+        {"year": {"$gt": 2010}},
+        fields=["_id"],
+        sort=[{"year": "asc"}],
+        limit=10,
+        bookmark="g1AAAA",
+        json={"execution_stats": True},
+    )
+    assert result == (
+        "POST",
+        "_find",
+        {
+            "json": {
+                "execution_stats": True,
+                "selector": {"year": {"$gt": 2010}},
+                "fields": ["_id"],
+                "sort": [{"year": "asc"}],
+                "limit": 10,
+                "bookmark": "g1AAAA",
+            },
+        },
+    )
+
+
 def test_get():
     result = time2relax.get("_design/someid")
     assert result == ("GET", "_design/someid", {})
@@ -194,6 +281,23 @@ def test_get_att():
     assert result == ("GET", "doc/att.txt", {})
 
 
+def test_get_related():
+    result = time2relax.get_related("doc", params={"rev": "1-a"}, headers=None)
+    assert result == (
+        "GET",
+        "doc",
+        {
+            "params": {
+                "rev": "1-a",
+                "attachments": True,
+            },
+            "headers": {
+                "Accept": "multipart/related",
+            },
+        },
+    )
+
+
 def test_info():
     result = time2relax.info()
     assert result == ("GET", "", {})
@@ -337,6 +441,25 @@ def test_insert_att_with_headers_none():
     )
 
 
+def test_insert_related():
+    method, path, kwargs = time2relax.insert_related(
+        {"_id": "some+id"}, {"att.txt": ("text/plain", b"foo")}
+    )
+    assert (method, path) == ("PUT", "some%2Bid")
+    assert kwargs["headers"]["Content-Type"] == kwargs["data"].content_type
+    assert b"".join(kwargs["data"]).count(b"foo") == 1
+
+
+def test_insert_related_raise_exception():
+    with pytest.raises(ValueError):
+        time2relax.insert_related({}, {})
+
+
+def test_list_indexes():
+    result = time2relax.list_indexes()
+    assert result == ("GET", "_index", {})
+
+
 def test_remove():
     result = time2relax.remove("someid", "1-5bfa2c9")
     assert result == (
@@ -530,6 +653,18 @@ def test_request_with_params(mocker):
     )
 
 
+def test_prepare_request():
+    base = f"{TEST_URL}/"
+    assert time2relax.prepare_request(base, "") == (TEST_URL, {})
+    assert time2relax.prepare_request(base, "a/b") == (f"{TEST_URL}/a/b", {})
+    assert time2relax.prepare_request(TEST_URL, "a/b") == (f"{TEST_URL}/a/b", {})
+    assert time2relax.prepare_request(base, "a%3A1") == (f"{TEST_URL}/a%3A1", {})
+
+    params = {"limit": 1}
+    _, kwargs = time2relax.prepare_request(base, "", params=params)
+    assert kwargs["params"] is params
+
+
 def test_request_with_params_int(mocker):
     mock_request = mocker.patch.object(Session, "request", autospec=True)
     mock_request.return_value.status_code = 200
@@ -548,3 +683,12 @@ def test_request_raise_exception(mocker):
     with pytest.raises(exceptions.PreconditionFailed):
         time2relax.request(session, TEST_URL, "HEAD", "")
     mock_request.assert_called_with(session, "HEAD", TEST_URL)
+
+
+def test_request_not_modified(mocker):
+    mock_request = mocker.patch.object(Session, "request", autospec=True)
+    mock_request.return_value.status_code = 304
+    session = Session()
+
+    result = time2relax.request(session, TEST_URL, "GET", "docid")
+    assert result == mock_request.return_value
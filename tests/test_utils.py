@@ -1,8 +1,24 @@
+import io
+import time
+
 import pytest
 
 from time2relax import exceptions, utils
 
 
+def test_chunked():
+    assert list(utils.chunked("abcde", 2)) == [["a", "b"], ["c", "d"], ["e"]]
+    assert list(utils.chunked([], 2)) == []
+
+
+def test_imap_concurrent():
+    def slow_square(i):
+        time.sleep(0.01 * (5 - i))
+        return i * i
+
+    assert list(utils.imap_concurrent(slow_square, range(5), 3)) == [0, 1, 4, 9, 16]
+
+
 def test_encode_uri_component():
     assert utils.encode_uri_component("escaped%2F1") == "escaped%252F1"
     assert utils.encode_uri_component("a/b/c") == "a%2Fb%2Fc"
@@ -20,6 +36,14 @@ def test_encode_document_id():
     assert utils.encode_document_id("_local/az09_$()+-") == "_local/az09_%24()%2B-"
 
 
+def test_encode_id_cached():
+    utils.encode_document_id.cache_clear()
+    utils.encode_document_id("some+id")
+    assert utils.encode_document_id("some+id") == "some%2Bid"
+    assert utils.encode_document_id.cache_info().hits == 1
+    assert utils.encode_document_id.__wrapped__("some+id") == "some%2Bid"
+
+
 def test_get_database_host():
     assert (
         utils.get_database_host("https://foobar.com:5984/testdb")
@@ -84,3 +108,73 @@ def test_raise_http_exception(mocker):
             mock_response.json.return_value,
             mock_response,
         )
+
+
+def test_iter_rows(mocker):
+    body = (
+        b'{"total_rows":3,"offset":0,"rows":[\r\n'
+        b'{"id":"a","key":"a","value":{"rev":"1-a"}},\r\n'
+        b'{"id":"b\\u00e9","key":["\xc3\xa9",1],"value":"]"},\r\n'
+        b'{"key":"c","error":"not_found"}\r\n'
+        b'],"update_seq":"3-g1"}\n'
+    )
+    rows = [
+        {"id": "a", "key": "a", "value": {"rev": "1-a"}},
+        {"id": "bé", "key": ["é", 1], "value": "]"},
+        {"key": "c", "error": "not_found"},
+    ]
+
+    for size in (1, 7, len(body)):
+        response = mocker.Mock()
+        response.iter_content.side_effect = lambda n: (
+            body[i : i + n] for i in range(0, len(body), n)
+        )
+        assert list(utils.iter_rows(response, size)) == rows
+
+
+def test_iter_rows_short_last_chunk(mocker):
+    # The end of a row, in a chunk shorter than the text buffered
+    response = mocker.Mock()
+    response.iter_content.return_value = [
+        b'{"rows":[{"id":"' + b"a" * 20,
+        b'"}',
+        b"]}",
+    ]
+    assert list(utils.iter_rows(response)) == [{"id": "a" * 20}]
+
+
+def test_iter_rows_raise_exception(mocker):
+    response = mocker.Mock()
+    response.iter_content.return_value = [b'{"rows":[{"id":"a"},{"id"']
+    with pytest.raises(ValueError):
+        list(utils.iter_rows(response))
+
+
+def test_iter_array():
+    assert list(utils.iter_array([b'[{"a": 1}, ', b'{"a": 2}]'])) == [
+        {"a": 1},
+        {"a": 2},
+    ]
+    with pytest.raises(ValueError):
+        list(utils.iter_array([b'[{"a": 1}']))
+
+
+def test_iter_chunks(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(b"abcde")
+    assert list(utils.iter_chunks(b"abcde", 2)) == [b"ab", b"cd", b"e"]
+    assert list(utils.iter_chunks("é", 2)) == [b"\xc3\xa9"]
+    assert list(utils.iter_chunks(path, 3)) == [b"abc", b"de"]
+    assert list(utils.iter_chunks(io.StringIO("abc"), 2)) == [b"ab", b"c"]
+    assert list(utils.iter_chunks(iter([b"a", b"b"]), 2)) == [b"a", b"b"]
+
+
+def test_get_size(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(b"abcde")
+    assert utils.get_size(b"abc") == 3
+    assert utils.get_size(path) == 5
+    with open(path, "rb") as fp:
+        fp.read(1)
+        assert utils.get_size(fp) == 4
+    assert utils.get_size(iter([])) is None